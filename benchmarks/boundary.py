@@ -0,0 +1,49 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+"""
+Compares the 'split' and 'boundary' refinement methods on the phase diagrams used in the tests.
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import phasemap as pm
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../tests"))
+from phases import phase1, phase2, phase3  # pylint: disable=wrong-import-position
+
+CASES = [
+    ("phase1", phase1, [(-1, 1), (-1, 1)]),
+    ("phase2", phase2, [(0, 1), (0, 1)]),
+    ("phase3", phase3, [(0, 1), (0, 1)]),
+    ("phase1 (3D)", phase1, [(-1, 1), (-1, 1), (-1, 1)]),
+]
+
+
+def run_calc(phase, limits, num_steps, method):
+    start = time.perf_counter()
+    res = pm.run(phase, limits=limits, num_steps=num_steps, mesh=3, method=method)
+    return res, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--num-steps", type=int, default=6)
+    parser.add_argument(
+        "--num-steps-3d",
+        type=int,
+        default=4,
+        help="Number of steps for the three-dimensional phase diagram.",
+    )
+    args = parser.parse_args()
+
+    print(f"{'phase':>12} {'method':>9} {'points':>8} {'boxes':>8} {'time [s]':>9}")
+    for name, phase, limits in CASES:
+        num_steps = args.num_steps if len(limits) == 2 else args.num_steps_3d
+        for method in ["split", "boundary"]:
+            res, duration = run_calc(phase, limits, num_steps, method)
+            print(
+                f"{name:>12} {method:>9} {len(res.points):>8} {len(res.boxes):>8} {duration:>9.2f}"
+            )
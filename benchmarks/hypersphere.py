@@ -0,0 +1,55 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+"""
+Compares the isotropic and anisotropic splitting for hyperspheres and hypercylinders in 4 to 6 dimensions.
+"""
+
+import time
+import argparse
+
+import phasemap as pm
+
+
+def hypersphere(pos):
+    """
+    Defines an n-dimensional hypersphere.
+    """
+    return int(sum(x ** 2 for x in pos) <= 1)
+
+
+def hypercylinder(pos):
+    """
+    Defines a hypercylinder, which depends only on the first two coordinates.
+    """
+    return int(pos[0] ** 2 + pos[1] ** 2 <= 1)
+
+
+def run_calc(phase, dim, num_steps, anisotropic):
+    start = time.perf_counter()
+    res = pm.run(
+        phase,
+        limits=[(-1.1, 1.1)] * dim,
+        num_steps=num_steps,
+        mesh=3,
+        anisotropic=anisotropic,
+    )
+    return res, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dims", type=int, nargs="+", default=[4, 5, 6])
+    parser.add_argument("--num-steps", type=int, default=1)
+    args = parser.parse_args()
+
+    print(
+        f"{'phase':>14} {'dim':>4} {'mode':>12} {'points':>8} {'boxes':>8} {'time [s]':>9}"
+    )
+    for phase in [hypersphere, hypercylinder]:
+        for dim in args.dims:
+            for anisotropic in [False, True]:
+                res, duration = run_calc(phase, dim, args.num_steps, anisotropic)
+                mode = "anisotropic" if anisotropic else "isotropic"
+                print(
+                    f"{phase.__name__:>14} {dim:>4} {mode:>12} {len(res.points):>8} {len(res.boxes):>8} {duration:>9.2f}"
+                )
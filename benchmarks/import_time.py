@@ -0,0 +1,38 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+"""
+Measures the time needed to import PhaseMap in a new process, which is paid by every worker process.
+"""
+
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+
+STATEMENTS = [
+    ("python", "pass"),
+    ("numpy", "import numpy"),
+    ("phasemap", "import phasemap"),
+    ("phasemap.io", "import phasemap; phasemap.io.load"),
+    ("phasemap.plot", "import phasemap; phasemap.plot.boxes"),
+]
+
+
+def measure(statement, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", statement], check=True)
+        durations.append(time.perf_counter() - start)
+    return statistics.median(durations)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"{'import':>14} {'time [ms]':>10}")
+    for name, statement in STATEMENTS:
+        print(f"{name:>14} {1e3 * measure(statement, args.repeat):>10.1f}")
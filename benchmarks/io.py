@@ -0,0 +1,67 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+"""
+Compares the throughput of saving and loading a result with the bulk codec and with the per-object encoding hooks, and with the compact msgpack extension types.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+
+import msgpack
+
+import phasemap as pm
+from phasemap.io import msgpack_ext
+from phasemap.io._save_load import IO_HANDLER
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "../tests"))
+from phases import phase1  # pylint: disable=wrong-import-position
+
+CODECS = [
+    (json, "hooks", IO_HANDLER.save, IO_HANDLER.load),
+    (json, "bulk", pm.io.save, pm.io.load),
+    (msgpack, "hooks", IO_HANDLER.save, IO_HANDLER.load),
+    (msgpack, "bulk", pm.io.save, pm.io.load),
+    (msgpack_ext, "ext", pm.io.save, pm.io.load),
+]
+
+
+def measure(func, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--num-steps", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    res = pm.run(phase1, [(-1, 1), (-1, 1)], num_steps=args.num_steps, mesh=3)
+    print(f"{len(res.points)} points, {len(res.boxes)} boxes")
+    print(
+        f"{'serializer':>11} {'codec':>6} {'size [MB]':>10} "
+        f"{'save [s]':>9} {'load [s]':>9} {'load [MB/s]':>12}"
+    )
+    with tempfile.TemporaryDirectory() as tmpdir:
+        file_path = os.path.join(tmpdir, "res")
+        for serializer, name, save, load in CODECS:
+            save_time = measure(
+                lambda: save(res, file_path, serializer=serializer), args.repeat
+            )
+            load_time = measure(
+                lambda: load(file_path, serializer=serializer), args.repeat
+            )
+            size = os.path.getsize(file_path) / 1e6
+            serializer_name = serializer.__name__.split(".")[-1]
+            print(
+                f"{serializer_name:>11} {name:>6} {size:>10.2f} "
+                f"{save_time:>9.3f} {load_time:>9.3f} {size / load_time:>12.1f}"
+            )
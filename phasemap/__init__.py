@@ -3,8 +3,28 @@
 
 __version__ = "1.0.0"
 
+import importlib
+
 from ._run import *
-from . import plot
+from ._refine import *
+from ._shard import *
+from ._merge import *
+from ._pool import *
 from . import io
 
-__all__ = ["plot", "io"] + _run.__all__  # type: ignore  # pylint: disable=undefined-variable
+# Submodules which are imported only when they are first accessed, because
+# their dependencies are slow to import.
+_LAZY_SUBMODULES = ("plot",)
+
+
+def __getattr__(name):
+    if name in _LAZY_SUBMODULES:
+        return importlib.import_module("." + name, __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_SUBMODULES))
+
+
+__all__ = ["plot", "io"] + _run.__all__ + _refine.__all__ + _shard.__all__ + _merge.__all__ + _pool.__all__  # type: ignore  # pylint: disable=undefined-variable
@@ -0,0 +1,6 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+
+from ._cli import main
+
+main()
@@ -0,0 +1,215 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+
+import asyncio
+import itertools
+from fractions import Fraction
+
+from ._box import Box, PHASE_UNDEFINED
+from ._coordinate import Coordinate
+
+
+class BoundaryTracker:
+    """
+    Finds the boxes containing a phase boundary by following the boundary across the grid of boxes which are one step larger than the smallest boxes, in the style of the marching squares / cubes algorithm. Each box on this grid is evaluated at its corners and center, as when it is split in the ``"split"`` method, and the boxes containing a boundary are then split into the smallest boxes.
+
+    Vertices and cells of the grids are identified by tuples of integers. The boundary is first located by bisecting the edges of the initial mesh, and the diagonals from the center of each initial box to its corners. Starting from the cells found in this way, all cells are visited which can be reached through faces whose corners do not have the same phase.
+
+    Parameters
+    ----------
+    func:
+        Coroutine function which evaluates the phase at a given (relative) coordinate.
+    mesh: list(int)
+        Size of the initial grid in each dimension.
+    num_steps: int
+        Number of times the initial boxes are split to reach the smallest boxes.
+    """
+
+    def __init__(self, func, mesh, num_steps):
+        self._func = func
+        self._num_steps = num_steps
+        self._dim = len(mesh)
+        self._step = 2 ** num_steps
+        # number of smallest boxes in each dimension
+        self._num_vertices = [(m - 1) * self._step for m in mesh]
+        # size of the cells on which the boundary is followed, in units of
+        # the smallest boxes
+        self._cell_size = 2 if num_steps > 0 else 1
+        self._num_cells = [n // self._cell_size for n in self._num_vertices]
+        self._cell_stencil = list(itertools.product([0, 1], repeat=self._dim))
+
+    async def get_boxes(self, on_split=None):
+        """
+        Returns the boxes which partition the unit cube such that each cell containing a phase boundary is split into the smallest boxes, and the remaining boxes are as large as possible.
+
+        Parameters
+        ----------
+        on_split:
+            Function which is called with each box that is split and the list of boxes created from it, starting from the boxes of the initial mesh.
+        """
+        seeds = await self._find_seeds()
+        boundary_cells = await self._follow_boundary(seeds)
+        return self._create_boxes(boundary_cells, on_split=on_split)
+
+    def _coordinate(self, vertex):
+        return Coordinate([Fraction(v, n) for v, n in zip(vertex, self._num_vertices)])
+
+    async def _phases(self, vertices):
+        vertices = list(dict.fromkeys(vertices))
+        phases = await asyncio.gather(
+            *[self._func(self._coordinate(v)) for v in vertices]
+        )
+        return dict(zip(vertices, phases))
+
+    def _cell_corners(self, cell):
+        return [
+            tuple((c + o) * self._cell_size for c, o in zip(cell, offset))
+            for offset in self._cell_stencil
+        ]
+
+    def _cell_points(self, cell):
+        """
+        Returns the corners of a cell, followed by its center if the cell is larger than the smallest boxes.
+        """
+        corners = self._cell_corners(cell)
+        if self._cell_size == 1:
+            return corners
+        return corners + [tuple(c * self._cell_size + 1 for c in cell)]
+
+    def _cells_at_edge(self, start, end):
+        """
+        Returns the cells which contain the line between two vertices, where the vertices lie either on the same edge or on the diagonal of a cell.
+        """
+        ranges = []
+        for s, e, n in zip(start, end, self._num_cells):
+            if s != e:
+                ranges.append([min(s, e) // self._cell_size])
+            else:
+                pos = s // self._cell_size
+                ranges.append([c for c in (pos - 1, pos) if 0 <= c < n])
+        return set(itertools.product(*ranges))
+
+    async def _find_seeds(self):
+        initial_corners = list(
+            itertools.product(*[range(0, n, self._step) for n in self._num_vertices])
+        )
+        mesh_vertices = itertools.product(
+            *[range(0, n + 1, self._step) for n in self._num_vertices]
+        )
+        if self._num_steps > 0:
+            centers = {
+                corner: tuple(c + self._step // 2 for c in corner)
+                for corner in initial_corners
+            }
+        else:
+            centers = dict()
+        phases = await self._phases(itertools.chain(mesh_vertices, centers.values()))
+        center_vertices = set(centers.values())
+
+        segments = []
+        for vertex, phase in phases.items():
+            if vertex in center_vertices:
+                continue
+            for i in range(self._dim):
+                other = vertex[:i] + (vertex[i] + self._step,) + vertex[i + 1 :]
+                if other in phases and phases[other] != phase:
+                    segments.append((vertex, other))
+        for corner, center in centers.items():
+            for offset in self._cell_stencil:
+                other = tuple(c + o * self._step for c, o in zip(corner, offset))
+                if phases[other] != phases[center]:
+                    segments.append((center, other))
+                    break
+        edges = await asyncio.gather(
+            *[self._bisect(start, end, phases) for start, end in segments]
+        )
+        return set().union(*[self._cells_at_edge(start, end) for start, end in edges])
+
+    async def _bisect(self, start, end, phases):
+        """
+        Finds a pair of vertices with different phases on the line between two vertices of different phase, which are at most one cell apart.
+        """
+        start_phase = phases[start]
+        while max(abs(e - s) for s, e in zip(start, end)) > self._cell_size:
+            middle = tuple((s + e) // 2 for s, e in zip(start, end))
+            if await self._func(self._coordinate(middle)) == start_phase:
+                start = middle
+            else:
+                end = middle
+        return start, end
+
+    async def _follow_boundary(self, seeds):
+        visited = set(seeds)
+        boundary_cells = set()
+        front = set(seeds)
+        while front:
+            vertex_phases = await self._phases(
+                itertools.chain.from_iterable(self._cell_points(c) for c in front)
+            )
+            new_front = set()
+            for cell in front:
+                phases = [vertex_phases[v] for v in self._cell_points(cell)]
+                if all(p == phases[0] for p in phases):
+                    continue
+                boundary_cells.add(cell)
+                for i, side in itertools.product(range(self._dim), [0, 1]):
+                    face_phases = [
+                        p
+                        for offset, p in zip(self._cell_stencil, phases)
+                        if offset[i] == side
+                    ]
+                    if all(p == face_phases[0] for p in face_phases):
+                        continue
+                    pos = cell[i] + 2 * side - 1
+                    if not 0 <= pos < self._num_cells[i]:
+                        continue
+                    neighbour = cell[:i] + (pos,) + cell[i + 1 :]
+                    if neighbour not in visited:
+                        visited.add(neighbour)
+                        new_front.add(neighbour)
+            front = new_front
+        return boundary_cells
+
+    def _create_boxes(self, boundary_cells, on_split=None):
+        # 'refined[k]' contains the boxes after k splits which contain at
+        # least one of the boundary cells, and are therefore split further.
+        refined = [
+            {
+                tuple(c >> (self._num_steps - 1 - k) for c in cell)
+                for cell in boundary_cells
+            }
+            for k in range(self._num_steps)
+        ]
+        boxes = []
+        cells = [
+            (cell, self._create_box(cell, level=0))
+            for cell in itertools.product(
+                *[range(n // self._step) for n in self._num_vertices]
+            )
+        ]
+        for level in range(self._num_steps + 1):
+            next_cells = []
+            for cell, box in cells:
+                if level < self._num_steps and cell in refined[level]:
+                    children = [
+                        tuple(2 * c + o for c, o in zip(cell, offset))
+                        for offset in self._cell_stencil
+                    ]
+                    child_boxes = [
+                        self._create_box(child, level=level + 1) for child in children
+                    ]
+                    if on_split is not None:
+                        box.phase = PHASE_UNDEFINED
+                        on_split(box, child_boxes)
+                    next_cells.extend(zip(children, child_boxes))
+                else:
+                    boxes.append(box)
+            cells = next_cells
+        return boxes
+
+    def _create_box(self, cell, level):
+        size = 2 ** (self._num_steps - level)
+        return Box(
+            corner=self._coordinate([c * size for c in cell]),
+            size=self._coordinate([size] * self._dim),
+        )
@@ -22,6 +22,9 @@ class Sentinel:
     def __repr__(self):
         return f"Sentinel({self._value!r})"  # pylint: disable=no-member
 
+    def __reduce__(self):
+        return (Sentinel, (self._value,))  # pylint: disable=no-member
+
 
 PHASE_UNDEFINED = Sentinel("undefined phase")
 
@@ -46,13 +49,24 @@ class Box:
         self.size = Coordinate(size)
         self._neighbours = set()
         self._points = dict()
+        # 'corner' and 'size' are immutable, so the hash can be cached.
+        self._hash = hash((self.corner, self.size))
 
     def __hash__(self):
-        return hash((self.corner, self.size))
+        return self._hash
 
     def __eq__(self, other):
         return np.all(self.corner == other.corner) and np.all(self.size == other.size)
 
+    def __reduce__(self):
+        # The neighbour relations are not pickled, because they would lead
+        # to a deep recursion through the whole set of boxes.
+        return (
+            _restore_box,
+            (self.corner, self.size),
+            dict(phase=self.phase, _points=self._points),
+        )
+
     def __repr__(self):
         return "Box(corner={0.corner}, size={0.size}, phase={0.phase})".format(self)
 
@@ -66,13 +80,21 @@ class Box:
 
     def add_point(self, coord, phase):
         if self.contains_coord(coord):
-            self._points[coord] = phase
-            if self.phase is None:
-                self.phase = phase
-            elif self.phase == phase:
-                return
-            else:
-                self.phase = PHASE_UNDEFINED
+            self.add_contained_point(coord, phase)
+
+    def add_contained_point(self, coord, phase):
+        """
+        Adds a point without checking that it is contained in the box.
+        """
+        self._points[coord] = phase
+        if self.phase is None:
+            self.phase = phase
+        # Phases of a calculation are interned, such that the identity check
+        # usually avoids the comparison.
+        elif self.phase is phase or self.phase == phase:
+            return
+        else:
+            self.phase = PHASE_UNDEFINED
 
     def is_neighbour(self, other):
         return all(
@@ -94,3 +116,7 @@ class Box:
 
     def delete_neighbour(self, box):
         self._neighbours.discard(box)
+
+
+def _restore_box(corner, size):
+    return Box(corner=corner, size=size)
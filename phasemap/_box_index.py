@@ -0,0 +1,400 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+
+import math
+import itertools
+from fractions import Fraction
+from collections import defaultdict
+
+import numpy as np
+
+from ._box import Box, PHASE_UNDEFINED
+from ._coordinate import Coordinate
+
+# Tolerance of the floating-point coordinates when selecting candidate boxes,
+# which are then checked exactly.
+_TOLERANCE = 1e-9
+
+# Number of cells up to which the cells of a box size are looked up by their
+# flat index, which must fit into an int64.
+_MAX_NUM_CELLS = 2 ** 63
+
+
+class BoxIndex:
+    """
+    Spatial index for boxes which are aligned to the dyadic lattice, i.e. whose corner is an integer multiple of their size. The boxes are grouped by their size, and each group maps the integer cell index of a box to the box itself.
+    """
+
+    def __init__(self, boxes=()):
+        self._cells = defaultdict(dict)
+        for box in boxes:
+            self.add(box)
+
+    def __iter__(self):
+        for cells in self._cells.values():
+            yield from cells.values()
+
+    def __len__(self):
+        return sum(len(cells) for cells in self._cells.values())
+
+    @property
+    def sizes(self):
+        return list(self._cells.keys())
+
+    def boxes_of_size(self, size):
+        return list(self._cells.get(tuple(size), {}).values())
+
+    def add(self, box):
+        self._cells[tuple(box.size)][_cell_index(box.corner, box.size)] = box
+
+    def discard(self, box):
+        size = tuple(box.size)
+        cells = self._cells.get(size, {})
+        cells.pop(_cell_index(box.corner, box.size), None)
+        if not cells:
+            self._cells.pop(size, None)
+
+    def get(self, corner, size):
+        """
+        Returns the box with the given corner and size, or ``None`` if no such box exists.
+        """
+        return self._cells.get(tuple(size), {}).get(_cell_index(corner, size))
+
+    def intersecting(self, corner, size, sizes=None):
+        """
+        Returns the boxes whose closed region intersects the closed region spanned by ``corner`` and ``size``. The ``size`` may be zero, in which case the boxes containing the point ``corner`` are returned.
+
+        Parameters
+        ----------
+        corner:
+            Corner of the region.
+        size:
+            Size of the region.
+        sizes:
+            If given, only boxes of these sizes are considered.
+        """
+        if sizes is None:
+            sizes = self._cells.keys()
+        for box_size in sizes:
+            cells = self._cells.get(tuple(box_size))
+            if not cells:
+                continue
+            ranges = [
+                range(-_floor_div(-c, bs) - 1, _floor_div(c + s, bs) + 1)
+                for c, s, bs in zip(corner, size, box_size)
+            ]
+            for idx in itertools.product(*ranges):
+                box = cells.get(idx)
+                if box is not None:
+                    yield box
+
+
+class ArrayBoxIndex:
+    """
+    Vectorized lookup of the boxes containing given (relative) positions. Positions are assigned to boxes by half-open intervals, except at the upper boundary of the unit cube.
+    """
+
+    def __init__(self, boxes):
+        boxes = list(boxes)
+        self._boxes = boxes
+        dim = len(boxes[0].size) if boxes else 0
+        shape = (len(boxes), dim)
+        self._corner_array = np.array(
+            [box.corner for box in boxes], dtype=float
+        ).reshape(shape)
+        self._size_array = np.array([box.size for box in boxes], dtype=float).reshape(
+            shape
+        )
+        self.phases = np.empty(len(boxes) + 1, dtype=object)
+        self.phases[-1] = PHASE_UNDEFINED
+        self.update_phases()
+        self._groups = []
+        grouped = defaultdict(list)
+        for i, box in enumerate(boxes):
+            grouped[tuple(box.size)].append(i)
+        self._box_sizes = list(grouped)
+        for size, box_indices in grouped.items():
+            shape = tuple(math.ceil(1 / s) for s in size)
+            cells = [_cell_index(boxes[i].corner, size) for i in box_indices]
+            if np.prod(shape, dtype=object) < _MAX_NUM_CELLS:
+                keys = np.ravel_multi_index(np.array(cells, dtype=np.int64).T, shape)
+                order = np.argsort(keys)
+                keys = keys[order]
+                box_indices = np.array(box_indices, dtype=np.int64)[order]
+            else:
+                # The flat cell index does not fit into an int64, so the cells
+                # are looked up in a dictionary instead.
+                keys = None
+                box_indices = dict(zip(cells, box_indices))
+            self._groups.append(
+                (
+                    np.array(size, dtype=float),
+                    np.array(shape, dtype=np.int64),
+                    keys,
+                    box_indices,
+                )
+            )
+
+    @property
+    def sizes(self):
+        return list(self._box_sizes)
+
+    def update_phases(self):
+        """
+        Reads the phases of the boxes again, to reflect changes since the index was created.
+        """
+        self.phases[:-1] = [_resolved_phase(b.phase) for b in self._boxes]
+
+    def box_indices(self, positions):
+        """
+        Returns the index of the box containing each of the given positions, or ``-1`` if there is no such box.
+        """
+        positions = np.asarray(positions, dtype=float)
+        res = np.full(len(positions), -1, dtype=np.int64)
+        inside = np.all((positions >= 0) & (positions <= 1), axis=1)
+        for size, shape, keys, box_indices in self._groups:
+            cells = np.floor(positions / size).astype(np.int64)
+            # the upper boundary belongs to the last box
+            cells = np.where(positions == 1, np.minimum(cells, shape - 1), cells)
+            valid = inside & np.all((cells >= 0) & (cells < shape), axis=1)
+            valid_idx = np.flatnonzero(valid)
+            if keys is None:
+                found_indices = np.array(
+                    [
+                        box_indices.get(tuple(cell), -1)
+                        for cell in cells[valid_idx].tolist()
+                    ],
+                    dtype=np.int64,
+                )
+                found = found_indices >= 0
+                res[valid_idx[found]] = found_indices[found]
+                continue
+            query = np.ravel_multi_index(cells[valid_idx].T, shape)
+            pos = np.minimum(np.searchsorted(keys, query), len(keys) - 1)
+            found = keys[pos] == query
+            res[valid_idx[found]] = box_indices[pos[found]]
+        return res
+
+    def phase_at(self, positions):
+        """
+        Returns the phases of the boxes containing the given positions.
+        """
+        return self.phases[self.box_indices(positions)]
+
+    def intersecting(self, bounds):
+        """
+        Returns the boxes whose closed region intersects the closed region given by a list of ``(low, high)`` boundaries for each dimension. The candidates are selected with floating-point coordinates, and then checked exactly.
+        """
+        if not self._boxes:
+            return []
+        low, high = np.array(bounds, dtype=float).T
+        candidates = np.flatnonzero(
+            np.all(
+                (self._corner_array <= high + _TOLERANCE)
+                & (self._corner_array + self._size_array >= low - _TOLERANCE),
+                axis=1,
+            )
+        )
+        return [
+            self._boxes[i]
+            for i in candidates.tolist()
+            if box_intersects(self._boxes[i], bounds)
+        ]
+
+
+def _resolved_phase(phase):
+    return PHASE_UNDEFINED if phase is None else phase
+
+
+def box_intersects(box, bounds):
+    """
+    Checks whether the closed region of the box intersects the closed region given by a list of ``(low, high)`` boundaries for each dimension.
+    """
+    return all(
+        low <= c + s and c <= high
+        for c, s, (low, high) in zip(box.corner, box.size, bounds)
+    )
+
+
+def link_neighbours(index):
+    """
+    Sets up the neighbour relations between all boxes in the given index.
+
+    For each pair of box sizes, the lookup is done only from the side of the smaller box, such that the number of cells which are checked for each box stays small.
+    """
+    sizes = sorted(index.sizes, key=_size_order)
+    for i, size in enumerate(sizes):
+        larger_sizes = sizes[i:]
+        for box in index.boxes_of_size(size):
+            for other in index.intersecting(
+                corner=box.corner, size=box.size, sizes=larger_sizes
+            ):
+                if other is not box:
+                    box.process_certain_neighbour(other)
+
+
+def restore_boxes(boxes, points):
+    """
+    Creates a copy of the given boxes, with the neighbour relations and the points contained in each box restored.
+
+    Parameters
+    ----------
+    boxes:
+        The boxes which are restored.
+    points:
+        Mapping of coordinates to phases. Each point is added to all boxes which contain it.
+    """
+    new_boxes = [Box(corner=b.corner, size=b.size) for b in boxes]
+    index = BoxIndex(new_boxes)
+    link_neighbours(index)
+    zero = (0,) * len(new_boxes[0].size) if new_boxes else ()
+    for coord, phase in points.items():
+        for box in index.intersecting(corner=coord, size=zero):
+            box.add_contained_point(coord=coord, phase=phase)
+    return new_boxes
+
+
+def compact_boxes(boxes):
+    """
+    Returns a list of boxes where neighbouring boxes with the same defined phase are merged, repeatedly until no more boxes can be merged. Two boxes are merged if they have the same size and together form a box which is aligned to the dyadic lattice, i.e. if they are the two halves of a box split along one dimension. In this way, complete groups of ``2 ** dim`` sibling boxes are merged back into their parent box, and incomplete groups into non-cubic boxes. The merged boxes contain the points of the boxes they replace.
+    """
+    boxes = list(boxes)
+    if not boxes:
+        return boxes
+    dim = len(boxes[0].size)
+    num_unchanged = 0
+    axis = 0
+    # Merge along each axis in turn, until no merge happened for any axis.
+    while num_unchanged < dim:
+        merged = _merge_pairs(boxes, axis)
+        if merged:
+            boxes = [b for b in boxes if b not in merged] + list(
+                dict.fromkeys(merged.values())
+            )
+            num_unchanged = 0
+        else:
+            num_unchanged += 1
+        axis = (axis + 1) % dim
+    return boxes
+
+
+def _merge_pairs(boxes, axis):
+    """
+    Returns a mapping from boxes to the boxes they are merged into, when merging along the given axis.
+    """
+    pairs = defaultdict(list)
+    for box in boxes:
+        if box.phase is None or box.phase is PHASE_UNDEFINED:
+            continue
+        parent_size = tuple(s * 2 if i == axis else s for i, s in enumerate(box.size))
+        if parent_size[axis] > 1:
+            continue
+        pairs[(parent_size, _cell_index(box.corner, parent_size))].append(box)
+    merged = dict()
+    for (parent_size, parent_cell), pair in pairs.items():
+        if len(pair) != 2 or pair[0].phase != pair[1].phase:
+            continue
+        parent = Box(
+            corner=[c * s for c, s in zip(parent_cell, parent_size)],
+            size=parent_size,
+        )
+        for box in pair:
+            for coord, phase in box._points.items():  # pylint: disable=protected-access
+                parent.add_contained_point(coord, phase)
+        # Boxes without points, such as boxes in known regions, still have a
+        # phase which needs to be kept.
+        parent.phase = pair[0].phase
+        for box in pair:
+            merged[box] = parent
+    return merged
+
+
+def is_dyadic_partition(boxes, max_size, min_size, points=()):
+    """
+    Checks if the given boxes partition the unit cube, and are compatible with the lattice defined by the given maximum and minimum box sizes. Boxes which are larger than the maximum size, such as those merged by :meth:`.Result.compact`, must consist of complete boxes of the initial mesh. Because a new calculation splits every initial box at least once, the corners and centers of all initial boxes must be contained in ``points``. This excludes partitions which were created with a different mesh.
+    """
+    if not boxes:
+        return False
+    volume = 0
+    for box in boxes:
+        for corner, size, max_s, min_s in zip(box.corner, box.size, max_size, min_size):
+            if size < min_s or corner < 0 or corner + size > 1:
+                return False
+            if (corner / size).denominator != 1:
+                return False
+            if size <= max_s:
+                ratio = max_s / size
+            else:
+                ratio = size / max_s
+                if (corner / max_s).denominator != 1:
+                    return False
+            if ratio.denominator != 1 or not _is_power_of_two(ratio.numerator):
+                return False
+        volume += np.prod(box.size)
+    if volume != 1:
+        return False
+    if not all(Coordinate(coord) in points for coord in _initial_points(max_size)):
+        return False
+    return not _has_overlap(boxes)
+
+
+def _initial_points(max_size):
+    """
+    Returns the corners and centers of the initial boxes, which have the given maximum size.
+    """
+    num_boxes = [_floor_div(1, max_s) for max_s in max_size]
+    yield from itertools.product(
+        *[[i * max_s for i in range(n + 1)] for n, max_s in zip(num_boxes, max_size)]
+    )
+    yield from itertools.product(
+        *[
+            [(i + Fraction(1, 2)) * max_s for i in range(n)]
+            for n, max_s in zip(num_boxes, max_size)
+        ]
+    )
+
+
+def _has_overlap(boxes):
+    """
+    Checks if any two of the given boxes overlap in more than their boundary. As in :func:`link_neighbours`, each pair of boxes is checked from the side of the smaller box.
+    """
+    index = BoxIndex()
+    for box in boxes:
+        if index.get(box.corner, box.size) is not None:
+            return True
+        index.add(box)
+    sizes = sorted(index.sizes, key=_size_order)
+    for i, size in enumerate(sizes):
+        larger_sizes = sizes[i:]
+        for box in index.boxes_of_size(size):
+            for other in index.intersecting(
+                corner=box.corner, size=box.size, sizes=larger_sizes
+            ):
+                if other is not box and all(
+                    c1 < c2 + s2 and c2 < c1 + s1
+                    for c1, s1, c2, s2 in zip(
+                        box.corner, box.size, other.corner, other.size
+                    )
+                ):
+                    return True
+    return False
+
+
+def _is_power_of_two(value):
+    return value & (value - 1) == 0
+
+
+def _size_order(size):
+    return (np.prod(size), size)
+
+
+def _cell_index(corner, size):
+    return tuple(_floor_div(c, s) for c, s in zip(corner, size))
+
+
+def _floor_div(value, divisor):
+    # Equivalent to 'math.floor(value / divisor)' for rational numbers, but
+    # avoids creating intermediate 'Fraction' instances.
+    return (value.numerator * divisor.denominator) // (
+        value.denominator * divisor.numerator
+    )
@@ -2,6 +2,7 @@
 # Author: Dominik Gresch <greschd@gmx.ch>
 
 import asyncio
+import functools
 from collections.abc import Awaitable
 
 NOT_FOUND = object()
@@ -10,30 +11,155 @@ NOT_FOUND = object()
 class FuncCache:
     """
     Caches calls to a function or coroutine.
+
+    If a ``canonicalize`` function is given, inputs which have the same canonical representative share a single function call, which is evaluated at the canonical representative. The ``data`` contains only the inputs which were requested.
+
+    If a ``known`` function is given, it is called first for each new input, and its return value is used instead of calling the function unless it is ``NOT_FOUND``. The inputs for which this is the case are added to ``inferred``.
+
+    If an ``indicators`` dictionary is given, the function must return a tuple ``(result, indicator)``. Only the result is returned and stored in ``data``, while the indicator is stored in ``indicators``.
+
+    If a ``batch_size`` is given, the function is "listable", i.e. it is called with a list of inputs and must return the list of results. Calls which arrive within ``batch_timeout`` seconds of each other are collected into batches of at most ``batch_size`` inputs. Each input is still evaluated only once, also when it is requested again while its batch is running.
+
+    If an ``intern`` function is given, it is applied to each new result before it is stored and returned. This can be used to represent equal results by the same object.
     """
 
-    def __init__(self, func, data=None):
-        self.func = _wrap_to_coroutine(func)
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        func,
+        data=None,
+        canonicalize=None,
+        known=None,
+        inferred=None,
+        indicators=None,
+        intern=None,
+        batch_size=None,
+        batch_timeout=0.1,
+    ):
+        if batch_size is None:
+            self.func = _wrap_to_coroutine(func)
+        else:
+            self.func = BatchSubmitter(
+                func, timeout=batch_timeout, max_batch_size=batch_size
+            )
         self.data = data if data is not None else dict()
+        self.known = known
+        self.inferred = inferred if inferred is not None else set()
+        self.indicators = indicators
+        self.intern = intern
         self.needs_saving = False
         self.awaitables = dict()
+        self.canonicalize = canonicalize
+        self.canonical_data = dict()
+        if canonicalize is not None:
+            for inp, result in self.data.items():
+                if indicators is not None:
+                    result = (result, indicators.get(inp))
+                self.canonical_data.setdefault(canonicalize(inp), result)
 
     async def __call__(self, inp):
         if inp in self.data:
             return self.data[inp]
 
-        if inp in self.awaitables:
-            result = await asyncio.wait_for(self.awaitables[inp], timeout=None)
+        if self.known is not None:
+            result = self.known(inp)
+            if result is not NOT_FOUND:
+                if self.intern is not None:
+                    result = self.intern(result)
+                self.data[inp] = result
+                self.inferred.add(inp)
+                self.needs_saving = True
+                return result
+
+        if self.canonicalize is None:
+            key = inp
+        else:
+            key = self.canonicalize(inp)
+        if key in self.canonical_data:
+            result = self.canonical_data[key]
+        elif key in self.awaitables:
+            result = await asyncio.wait_for(self.awaitables[key], timeout=None)
         else:
-            fut = asyncio.ensure_future(self.func(inp))
-            self.awaitables[inp] = fut
+            fut = asyncio.ensure_future(self.func(key))
+            self.awaitables[key] = fut
             result = await fut
-            self.awaitables.pop(inp)
+            self.awaitables.pop(key)
+            if self.canonicalize is not None:
+                self.canonical_data[key] = result
+        if self.indicators is not None:
+            result, indicator = result
+            if indicator is not None:
+                self.indicators[inp] = indicator
+        if self.intern is not None:
+            result = self.intern(result)
         self.data[inp] = result
         self.needs_saving = True
         return result
 
 
+class BatchSubmitter:
+    """
+    Collects calls to a "listable" function or coroutine into batches.
+
+    A batch is submitted when it contains ``max_batch_size`` inputs, or when no new input arrived for ``timeout`` seconds. Exceptions raised by the function are passed on to all calls of the batch.
+    """
+
+    def __init__(self, func, *, timeout=0.1, max_batch_size=1000):
+        self._func = _wrap_to_coroutine(func)
+        self._timeout = timeout
+        self._max_batch_size = max_batch_size
+        self._pending = []
+        self._timer = None
+
+    async def __call__(self, inp):
+        loop = asyncio.get_event_loop()
+        fut = loop.create_future()
+        self._pending.append((inp, fut))
+        if len(self._pending) >= self._max_batch_size:
+            self._submit()
+        else:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = loop.call_later(self._timeout, self._submit)
+        return await fut
+
+    def _submit(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        inputs, futures = zip(*pending)
+        task = asyncio.ensure_future(self._func(list(inputs)))
+        task.add_done_callback(functools.partial(_set_batch_results, futures))
+
+
+def _set_batch_results(futures, task):
+    if task.cancelled():
+        for fut in futures:
+            fut.cancel()
+        return
+    exc = task.exception()
+    if exc is None:
+        results = list(task.result())
+        if len(results) != len(futures):
+            exc = ValueError(
+                "The batch function returned {} results for {} inputs.".format(
+                    len(results), len(futures)
+                )
+            )
+    if exc is not None:
+        results = [None] * len(futures)
+    for fut, result in zip(futures, results):
+        # The call may have been cancelled while its batch was running.
+        if fut.done():
+            continue
+        if exc is None:
+            fut.set_result(result)
+        else:
+            fut.set_exception(exc)
+
+
 def _wrap_to_coroutine(func):
     async def inner(inp):
         res = func(inp)
@@ -0,0 +1,120 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from ._result import Result
+from ._point_store import PointStore
+from .io._bulk import make_box
+from ._logging_setup import LOGGER
+
+
+class BackgroundSaver:
+    """
+    Asynchronous context manager which periodically saves checkpoints in a background thread, such that the event loop is not blocked while the checkpoint is written. At most one checkpoint is written at a time. The time between checkpoints is increased if needed, such that writing checkpoints takes at most the fraction ``max_fraction`` of the wall time. When the context manager exits, a final checkpoint is written.
+
+    Parameters
+    ----------
+    snapshot:
+        Function which is called in the event loop, and returns either ``None`` if no checkpoint is needed, or a function which writes the checkpoint and is called in the background thread.
+    interval: float
+        The minimum time in seconds between two checkpoints.
+    max_fraction: float
+        The maximum fraction of the wall time spent writing checkpoints.
+    """
+
+    def __init__(self, snapshot, *, interval, max_fraction=0.1):
+        if not 0 < max_fraction <= 1:
+            raise ValueError(
+                "The fraction of time spent saving must be in (0, 1], got {}.".format(
+                    max_fraction
+                )
+            )
+        self._snapshot = snapshot
+        self._interval = float(interval)
+        self._max_fraction = max_fraction
+        self._delay = self._interval
+        self._executor = None
+        self._running = None
+        self._task = None
+
+    async def __aenter__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._task = asyncio.ensure_future(self._save_loop())
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self._task.cancel()
+        try:
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            await self._wait_running()
+            self._start_save()
+            await self._wait_running()
+        finally:
+            self._executor.shutdown(wait=True)
+
+    async def _save_loop(self):
+        while True:
+            self._start_save()
+            await self._wait_running()
+            await asyncio.sleep(self._delay)
+
+    def _start_save(self):
+        write = self._snapshot()
+        if write is not None:
+            self._running = asyncio.get_event_loop().run_in_executor(
+                self._executor, _timed, write
+            )
+
+    async def _wait_running(self):
+        """
+        Waits until the running checkpoint is written, and adapts the delay to the time it took. Errors while writing the checkpoint are raised.
+        """
+        if self._running is None:
+            return
+        running, self._running = self._running, None
+        duration = await running
+        self._delay = max(
+            self._interval, duration * (1 - self._max_fraction) / self._max_fraction
+        )
+        if self._delay > self._interval:
+            LOGGER.debug(
+                f"Writing the checkpoint took {duration:.3g} s, "
+                f"increasing the save interval to {self._delay:.3g} s."
+            )
+
+
+def _timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def snapshot_result(result):
+    """
+    Takes a snapshot of the result, and returns a function which creates a copy of the result from it. The function can be called in a background thread while the calculation continues.
+
+    Taking the snapshot still takes time proportional to the number of boxes and points, but only the arrays of the points and the corner, size and phase of each box are copied. The boxes, without their neighbours and points which are not saved, and the index of the points are created by the returned function. The refinement tree is not included.
+    """
+    points = result.points.snapshot()
+    # The corner and size are immutable, so they can be shared.
+    boxes = [(box.corner, box.size, box.phase) for box in result.boxes]
+    limits = result.limits
+    inferred_points = set(getattr(result, "inferred_points", ()))
+    indicators = dict(getattr(result, "indicators", ()))
+
+    def create():
+        return Result(
+            points=PointStore.from_snapshot(points),
+            boxes=[make_box(*box) for box in boxes],
+            limits=limits,
+            inferred_points=inferred_points,
+            indicators=indicators,
+        )
+
+    return create
@@ -0,0 +1,208 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+"""
+Defines the ``phasemap`` command, which runs a phase function given as ``module:function``.
+"""
+
+import os
+import sys
+import time
+import argparse
+import importlib
+import contextlib
+
+from ._run import run
+from ._pool import WorkerPool
+
+__all__ = ["main"]
+
+
+def main(argv=None):
+    """
+    Runs the ``phasemap`` command with the given command-line arguments.
+    """
+    args = _get_parser().parse_args(argv)
+    fct = _load_function(args.function)
+    stats = EvaluationStats(workers=max(args.workers, 1))
+    with _get_pool(args.workers) as pool:
+        start = time.perf_counter()
+        res = run(
+            _get_evaluate(fct, pool, stats),
+            args.limits,
+            mesh=args.mesh if len(args.mesh) > 1 else args.mesh[0],
+            num_steps=args.num_steps,
+            method=args.method,
+            save_file=args.save_file,
+            load=args.save_file is not None and not args.no_resume,
+            save_interval=args.save_interval,
+        )
+        stats.wall_time = time.perf_counter() - start
+    print(stats.summary(res))
+
+
+def _get_parser():
+    parser = argparse.ArgumentParser(
+        prog="phasemap",
+        description="Calculates the phase diagram of the given phase function.",
+    )
+    parser.add_argument(
+        "function",
+        help="The phase function, given as 'module:function'. The module is imported from the current directory or the Python path.",
+    )
+    parser.add_argument(
+        "-l",
+        "--limits",
+        type=float,
+        nargs=2,
+        action="append",
+        required=True,
+        metavar=("LOW", "HIGH"),
+        help="Limits of the phase diagram in one dimension. Given once for each dimension.",
+    )
+    parser.add_argument(
+        "-m",
+        "--mesh",
+        type=int,
+        nargs="+",
+        default=[5],
+        help="Size of the initial grid, either for all dimensions or for each dimension.",
+    )
+    parser.add_argument(
+        "-n",
+        "--num-steps",
+        type=int,
+        default=5,
+        help="The maximum number of times each box is split.",
+    )
+    parser.add_argument(
+        "--method",
+        choices=["split", "boundary"],
+        default="split",
+        help="The method used to refine the boxes.",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="Number of worker processes which evaluate the phase function. With 0, the function is evaluated in the main process. By default, the number of processors is used.",
+    )
+    parser.add_argument(
+        "-o",
+        "--save-file",
+        help="File where the result is saved periodically. If the file exists, the calculation is resumed from it.",
+    )
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="Start a new calculation even if the save file exists.",
+    )
+    parser.add_argument(
+        "--save-interval",
+        type=float,
+        default=5.0,
+        help="The minimum time in seconds between saving the result.",
+    )
+    return parser
+
+
+def _load_function(spec):
+    """
+    Imports the function given as ``module:function``.
+    """
+    module_name, sep, function_name = spec.partition(":")
+    if not sep or not module_name or not function_name:
+        raise SystemExit(
+            "Invalid function '{}', must be given as 'module:function'.".format(spec)
+        )
+    # Like the 'python' command, modules in the current directory can be used.
+    if "" not in sys.path and os.getcwd() not in sys.path:
+        sys.path.insert(0, os.getcwd())
+    module = importlib.import_module(module_name)
+    fct = module
+    for name in function_name.split("."):
+        fct = getattr(fct, name)
+    return fct
+
+
+@contextlib.contextmanager
+def _get_pool(workers):
+    if workers <= 0:
+        yield None
+        return
+    with WorkerPool(max_workers=workers) as pool:
+        yield pool
+
+
+def _get_evaluate(fct, pool, stats):
+    """
+    Returns the function passed to :func:`.run`, which evaluates the phase function in the worker processes and records the evaluation times.
+    """
+    if pool is None:
+
+        def evaluate(pos):
+            result, duration = _timed_call(fct, pos)
+            stats.add(duration)
+            return result
+
+        return evaluate
+
+    async def evaluate_async(pos):
+        result, duration = await pool.evaluate(_timed_call, fct, pos)
+        stats.add(duration)
+        return result
+
+    return evaluate_async
+
+
+def _timed_call(fct, pos):
+    start = time.perf_counter()
+    result = fct(pos)
+    return result, time.perf_counter() - start
+
+
+class EvaluationStats:
+    """
+    Records the number and duration of the evaluations of the phase function.
+
+    Parameters
+    ----------
+    workers: int
+        Number of processes which evaluate the phase function.
+    """
+
+    def __init__(self, *, workers):
+        self.workers = workers
+        self.num_evaluations = 0
+        self.evaluation_time = 0.0
+        self.wall_time = 0.0
+
+    def add(self, duration):
+        """
+        Records an evaluation which took the given time.
+        """
+        self.num_evaluations += 1
+        self.evaluation_time += duration
+
+    def summary(self, result):
+        """
+        Returns a summary of the throughput of the calculation which created the given result.
+        """
+        wall_time = max(self.wall_time, 1e-9)
+        mean_time = self.evaluation_time / max(self.num_evaluations, 1)
+        utilization = self.evaluation_time / (wall_time * self.workers)
+        lines = [
+            ("Points", f"{len(result.points)}"),
+            ("Boxes", f"{len(result.boxes)}"),
+            (
+                "Evaluations",
+                f"{self.num_evaluations} "
+                f"({len(result.points) - self.num_evaluations} re-used)",
+            ),
+            ("Wall time", f"{self.wall_time:.2f} s"),
+            ("Throughput", f"{self.num_evaluations / wall_time:.1f} evaluations / s"),
+            ("Mean evaluation time", f"{mean_time:.3g} s"),
+            ("Worker utilization", f"{100 * utilization:.0f} %"),
+        ]
+        width = max(len(name) for name, _ in lines)
+        return "\n".join(f"{name + ':':<{width + 1}} {value}" for name, value in lines)
@@ -0,0 +1,132 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+
+import asyncio
+from collections import deque
+
+import numpy as np
+from fsc.async_tools import wrap_to_coroutine
+
+from ._logging_setup import LOGGER
+
+ERROR_POLICIES = ("raise", "retry", "mark")
+
+# Number of completed evaluations needed before stragglers are detected,
+# and number of recent durations used to detect them.
+_MIN_DURATIONS = 10
+_MAX_DURATIONS = 1000
+
+
+def guard_evaluation(  # pylint: disable=too-many-arguments
+    func,
+    *,
+    timeout=None,
+    on_error="raise",
+    max_retries=3,
+    retry_delay=1.0,
+    error_result=None,
+    straggler_quantile=None,
+):
+    """
+    Wraps a function or coroutine such that each evaluation is limited by a timeout, failed evaluations are retried, and stragglers are evaluated a second time. Timeouts and stragglers can be handled only for coroutines, because synchronous functions block the event loop.
+
+    Parameters
+    ----------
+    func:
+        The function or coroutine which is wrapped.
+    timeout: float
+        Maximum time in seconds for a single attempt of an evaluation. An attempt which takes longer is cancelled and counts as failed.
+    on_error: str
+        Determines what happens if an evaluation fails. With ``"raise"``, the exception is raised immediately. With ``"retry"``, the evaluation is retried up to ``max_retries`` times before the exception is raised. With ``"mark"``, the evaluation is also retried, but the result of ``error_result`` is returned instead of raising the exception.
+    max_retries: int
+        Maximum number of times a failed evaluation is retried.
+    retry_delay: float
+        Time in seconds before the first retry. The delay is doubled for each further retry.
+    error_result:
+        Function which is passed the input of an evaluation that failed with ``on_error="mark"``, and returns the result used instead.
+    straggler_quantile: float
+        If given, an evaluation which runs longer than this quantile of the durations of previous evaluations is started a second time, and the result of the attempt which finishes first is used.
+    """
+    if on_error not in ERROR_POLICIES:
+        raise ValueError(
+            "Invalid error policy '{}', must be one of {}.".format(
+                on_error, ", ".join(repr(p) for p in ERROR_POLICIES)
+            )
+        )
+    if on_error == "mark" and error_result is None:
+        raise ValueError("The 'error_result' must be given for the 'mark' policy.")
+    if straggler_quantile is not None and not 0 < straggler_quantile < 1:
+        raise ValueError(
+            "The 'straggler_quantile' must be between 0 and 1, got {}.".format(
+                straggler_quantile
+            )
+        )
+    func = wrap_to_coroutine(func)
+    if timeout is None and on_error == "raise" and straggler_quantile is None:
+        return func
+
+    durations = deque(maxlen=_MAX_DURATIONS)
+    num_attempts = 1 if on_error == "raise" else max_retries + 1
+
+    async def evaluate(inp):
+        loop = asyncio.get_event_loop()
+        start = loop.time()
+        if straggler_quantile is None or len(durations) < _MIN_DURATIONS:
+            result = await func(inp)
+        else:
+            result = await _evaluate_hedged(
+                func, inp, delay=np.quantile(durations, straggler_quantile)
+            )
+        durations.append(loop.time() - start)
+        return result
+
+    async def inner(inp):
+        delay = retry_delay
+        for attempt in range(num_attempts):
+            try:
+                return await asyncio.wait_for(evaluate(inp), timeout=timeout)
+            except Exception as exc:  # pylint: disable=broad-except
+                # Before Python 3.8, 'CancelledError' is an 'Exception', and
+                # cancelled evaluations must not be retried or marked.
+                if isinstance(exc, asyncio.CancelledError):
+                    raise
+                if attempt < num_attempts - 1:
+                    LOGGER.warning(
+                        f"Evaluation at {inp} failed with {exc!r}, retrying in {delay} s."
+                    )
+                    await asyncio.sleep(delay)
+                    delay *= 2
+                elif on_error == "mark":
+                    LOGGER.warning(
+                        f"Evaluation at {inp} failed with {exc!r}, marking it as an error."
+                    )
+                    return error_result(inp)
+                else:
+                    raise
+
+    return inner
+
+
+async def _evaluate_hedged(func, inp, delay):
+    """
+    Evaluates the function, and starts a second evaluation if the first one does not finish within the given delay. The result of the first successful evaluation is returned.
+    """
+    tasks = [asyncio.ensure_future(func(inp))]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done:
+            LOGGER.debug(f"Evaluation at {inp} is a straggler, starting it again.")
+            tasks.append(asyncio.ensure_future(func(inp)))
+        pending = tasks
+        while True:
+            done, pending = await asyncio.wait(
+                pending, return_when=asyncio.FIRST_COMPLETED
+            )
+            successful = [task for task in done if task.exception() is None]
+            if successful:
+                return successful[0].result()
+            if not pending:
+                return done.pop().result()
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,91 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+
+import math
+from fractions import Fraction
+
+import numpy as np
+
+from ._box import PHASE_UNDEFINED
+
+#: Grid value of cells which are not covered by a box of defined phase.
+CODE_UNDEFINED = -1
+
+
+def grid_phases(boxes):
+    """
+    Returns the list of distinct defined phases of the given boxes. The position in the list is the integer code of the phase.
+    """
+    phases = list(
+        dict.fromkeys(b.phase for b in boxes if b.phase not in (None, PHASE_UNDEFINED))
+    )
+    try:
+        return sorted(phases)
+    except TypeError:
+        return phases
+
+
+def grid_dtype(phases):
+    """
+    Returns the smallest signed integer type which can hold the codes for the given phases.
+    """
+    return np.promote_types(np.int8, np.min_scalar_type(len(phases)))
+
+
+def paint_boxes(boxes, phases, out, chunk_size=None):
+    """
+    Writes the codes of the box phases into the grid ``out``. Each grid cell is assigned the phase of the box containing its center, where boxes are treated as half-open intervals.
+
+    Parameters
+    ----------
+    boxes:
+        The boxes which are painted into the grid.
+    phases: list
+        List of phases, the index of each phase is used as its code.
+    out: numpy.ndarray
+        The grid into which the codes are written.
+    chunk_size: int
+        Number of grid slices along the first axis which are painted at once. The slices are first painted in memory and then written to ``out`` in one operation, which is efficient for memory-mapped arrays.
+    """
+    shape = out.shape
+    if len(shape) == 0:
+        raise ValueError("The grid must have at least one dimension.")
+    codes = {phase: i for i, phase in enumerate(phases)}
+    painted = [
+        (b, codes[b.phase]) for b in boxes if b.phase not in (None, PHASE_UNDEFINED)
+    ]
+    if painted:
+        bounds = np.array([_index_bounds(b, shape) for b, _ in painted], dtype=np.int64)
+    else:
+        bounds = np.zeros((0, len(shape), 2), dtype=np.int64)
+    box_codes = np.array([code for _, code in painted], dtype=out.dtype)
+
+    chunk_size = shape[0] if chunk_size is None else max(int(chunk_size), 1)
+    for start in range(0, shape[0], chunk_size):
+        stop = min(start + chunk_size, shape[0])
+        chunk = np.full((stop - start,) + shape[1:], CODE_UNDEFINED, dtype=out.dtype)
+        selected = np.flatnonzero((bounds[:, 0, 0] < stop) & (bounds[:, 0, 1] > start))
+        for i in selected:
+            (low, high), *rest = bounds[i]
+            slices = (slice(max(low, start) - start, min(high, stop) - start),) + tuple(
+                slice(lo, hi) for lo, hi in rest
+            )
+            chunk[slices] = box_codes[i]
+        out[start:stop] = chunk
+    if hasattr(out, "flush"):
+        out.flush()
+    return out
+
+
+def _index_bounds(box, shape):
+    """
+    Returns the half-open range of grid indices whose cell centers lie in the given box.
+    """
+    half = Fraction(1, 2)
+    return [
+        (
+            min(max(math.ceil(c * n - half), 0), n),
+            min(max(math.ceil((c + s) * n - half), 0), n),
+        )
+        for c, s, n in zip(box.corner, box.size, shape)
+    ]
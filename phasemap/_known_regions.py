@@ -0,0 +1,86 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+
+from fractions import Fraction
+
+from ._cache import NOT_FOUND
+
+
+class KnownRegions:
+    """
+    Regions of the phase diagram where the phase is known in advance.
+
+    Parameters
+    ----------
+    regions:
+        List of ``(region, phase)`` tuples. The region is either a list of ``(low, high)`` boundaries for each dimension (in the same coordinates as the ``limits``), or a callable which is passed a position and returns whether the position is inside the region. Regions given as boundaries are closed. If regions overlap, regions given as boundaries take precedence over callables, and otherwise the first matching region is used.
+    limits:
+        Boundaries of the region where the phase diagram is evaluated.
+    coordinate_to_position:
+        Function converting relative coordinates to positions.
+    """
+
+    def __init__(self, regions, limits, coordinate_to_position):
+        self._coordinate_to_position = coordinate_to_position
+        self._boxes = []
+        self._predicates = []
+        for region, phase in regions:
+            if callable(region):
+                self._predicates.append((region, phase))
+                continue
+            self._boxes.append((relative_bounds(region, limits), phase))
+
+    def __bool__(self):
+        return bool(self._boxes or self._predicates)
+
+    def phase_at(self, coord):
+        """
+        Returns the known phase at the given relative coordinate, or ``NOT_FOUND`` if the coordinate is not in a known region.
+        """
+        for bounds, phase in self._boxes:
+            if all(low <= c <= high for c, (low, high) in zip(coord, bounds)):
+                return phase
+        if self._predicates:
+            position = self._coordinate_to_position(coord)
+            for predicate, phase in self._predicates:
+                if predicate(position):
+                    return phase
+        return NOT_FOUND
+
+    def box_phase(self, box):
+        """
+        Returns the phase of the known region which contains the whole box, or ``NOT_FOUND`` if there is no such region. Only regions given as boundaries are considered.
+        """
+        for bounds, phase in self._boxes:
+            if all(
+                low <= c and c + s <= high
+                for c, s, (low, high) in zip(box.corner, box.size, bounds)
+            ):
+                return phase
+        return NOT_FOUND
+
+
+def relative_bounds(region, limits):
+    """
+    Converts a region given as a list of ``(low, high)`` boundaries for each dimension into exact boundaries in relative coordinates.
+    """
+    if len(region) != len(limits):
+        raise ValueError(
+            "Dimension {} of the region {} does not match the dimension {} of the 'limits'.".format(
+                len(region), region, len(limits)
+            )
+        )
+    bounds = []
+    for (low, high), (lim_low, lim_high) in zip(region, limits):
+        if low > high:
+            raise ValueError(
+                "Invalid boundaries ({}, {}) of the region.".format(low, high)
+            )
+        size = Fraction(lim_high) - Fraction(lim_low)
+        bounds.append(
+            (
+                (Fraction(low) - Fraction(lim_low)) / size,
+                (Fraction(high) - Fraction(lim_low)) / size,
+            )
+        )
+    return bounds
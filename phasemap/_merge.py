@@ -0,0 +1,147 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+
+import numpy as np
+from fsc.export import export
+
+from ._box import PHASE_UNDEFINED
+from ._box_index import BoxIndex, restore_boxes
+from ._result import Result
+from ._logging_setup import LOGGER
+
+
+@export
+def merge(results):
+    """Merge multiple results which were calculated with the same limits.
+
+    The points of all results are combined, and the boxes are reduced to the finest partition: A box is dropped if any of the results contains a smaller box inside it. The phases of the remaining boxes are then determined from the combined points.
+
+    If the same point has different phases in different results, the phase from the first result containing it is kept, and all boxes containing the point are marked as having undefined phase. These points can be listed with :func:`.find_conflicts`. A point is marked as inferred from a known region only if it is inferred in all results containing it.
+
+    Parameters
+    ----------
+    results: list(Result)
+        The results which are merged.
+
+    Returns
+    -------
+    Result:
+        The merged result.
+    """
+    results = _checked_results(results)
+    limits = results[0].limits
+    points, conflicts, inferred, indicators = _combine_points(results)
+    if conflicts:
+        LOGGER.warning(f"Found {len(conflicts)} points with conflicting phases.")
+
+    index = BoxIndex()
+    for res in results:
+        for box in res.boxes:
+            if index.get(box.corner, box.size) is None:
+                index.add(box)
+    for box in _refined_boxes(index):
+        index.discard(box)
+
+    boxes = restore_boxes(index, points=points)
+    if conflicts:
+        zero = (0,) * len(limits)
+        box_index = BoxIndex(boxes)
+        for coord in conflicts:
+            for box in box_index.intersecting(corner=coord, size=zero):
+                box.phase = PHASE_UNDEFINED
+
+    return Result(
+        points=points,
+        boxes=boxes,
+        limits=limits,
+        inferred_points=inferred,
+        indicators=indicators,
+    )
+
+
+@export
+def find_conflicts(results):
+    """Find the points which have different phases in the given results.
+
+    Parameters
+    ----------
+    results: list(Result)
+        The results which are compared, as passed to :func:`.merge`.
+
+    Returns
+    -------
+    dict:
+        Mapping of the conflicting coordinates to the list of their different phases, in the order of the results.
+    """
+    return _combine_points(_checked_results(results))[1]
+
+
+def _checked_results(results):
+    """
+    Returns the results as a list, after checking that they can be merged.
+    """
+    results = list(results)
+    if not results:
+        raise ValueError("At least one result is needed for merging.")
+    limits = results[0].limits
+    for res in results[1:]:
+        if not np.allclose(res.limits, limits):
+            raise ValueError(
+                "Limits {} and {} of the results to merge do not match.".format(
+                    limits, res.limits
+                )
+            )
+    return results
+
+
+def _combine_points(results):
+    """
+    Combines the points of the results, keeping the phase of the first result containing a point.
+
+    Returns
+    -------
+    tuple:
+        The combined points, the conflicting points with their phases, the points inferred in all results containing them, and the indicators.
+    """
+    points = dict()
+    conflicts = dict()
+    inferred = set()
+    computed = set()
+    indicators = dict()
+    for res in results:
+        for coord, indicator in getattr(res, "indicators", dict()).items():
+            indicators.setdefault(coord, indicator)
+        res_inferred = getattr(res, "inferred_points", set())
+        for coord, phase in res.points.items():
+            if coord in res_inferred:
+                inferred.add(coord)
+            else:
+                computed.add(coord)
+            existing = points.setdefault(coord, phase)
+            if existing != phase:
+                conflict_phases = conflicts.setdefault(coord, [existing])
+                if phase not in conflict_phases:
+                    conflict_phases.append(phase)
+    return points, conflicts, inferred - computed, indicators
+
+
+def _refined_boxes(index):
+    """
+    Returns the boxes which contain a smaller box in the given index.
+    """
+    sizes = index.sizes
+    refined = []
+    for size in sizes:
+        larger_sizes = [
+            other
+            for other in sizes
+            if other != size and all(o >= s for o, s in zip(other, size))
+        ]
+        if not larger_sizes:
+            continue
+        for box in index.boxes_of_size(size):
+            for larger_size in larger_sizes:
+                parent = index.get(box.corner, larger_size)
+                if parent is not None:
+                    refined.append(parent)
+    return refined
@@ -0,0 +1,79 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+
+import numpy as np
+
+
+class PhaseTable:
+    """
+    Table of the distinct phases of a calculation, which assigns each phase a small integer code. Phases are distinct if they are of a different type or compare unequal, such that for example ``1`` and ``True`` get different codes. The code of a phase is its index in the table.
+
+    Parameters
+    ----------
+    phases:
+        Phases which are added to the table, in the order of their codes.
+    """
+
+    def __init__(self, phases=()):
+        self._phases = []
+        self._codes = dict()
+        for phase in phases:
+            self.code(phase)
+
+    def __len__(self):
+        return len(self._phases)
+
+    def __iter__(self):
+        return iter(self._phases)
+
+    def __getitem__(self, code):
+        return self._phases[code]
+
+    def __repr__(self):
+        return "PhaseTable({})".format(self._phases)
+
+    def code(self, phase):
+        """
+        Returns the code of the given phase, adding it to the table if it is not yet contained.
+        """
+        try:
+            key = (type(phase), phase)
+            code = self._codes.get(key)
+        except TypeError:
+            # unhashable phases are compared one by one
+            key = None
+            code = next(
+                (
+                    i
+                    for i, p in enumerate(self._phases)
+                    if type(p) is type(phase) and p == phase
+                ),
+                None,
+            )
+        if code is None:
+            code = len(self._phases)
+            self._phases.append(phase)
+            if key is not None:
+                self._codes[key] = code
+        return code
+
+    def codes(self, phases):
+        """
+        Returns the codes of the given phases as an integer array.
+        """
+        return np.array([self.code(phase) for phase in phases], dtype=np.int64)
+
+    def intern(self, phase):
+        """
+        Returns the instance of the given phase which is stored in the table. In this way, equal phases are represented by the same object, and can be compared by identity.
+        """
+        return self._phases[self.code(phase)]
+
+    def copy(self):
+        """
+        Returns a copy of the table, with the same codes.
+        """
+        res = PhaseTable()
+        res._phases = list(self._phases)  # pylint: disable=protected-access
+        res._codes = dict(self._codes)  # pylint: disable=protected-access
+        return res
@@ -0,0 +1,366 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+
+import math
+import typing as ty
+from fractions import Fraction
+
+import numpy as np
+
+from ._coordinate import Coordinate
+from ._phase_table import PhaseTable
+
+# Coordinates which would need a larger denominator are stored separately,
+# to avoid overflowing the integer array.
+_MAX_SCALE = 2 ** 62
+
+
+class PointStore(ty.MutableMapping[Coordinate, ty.Any]):
+    """
+    Mapping of relative coordinates to phases, which stores the points in columns. The coordinates are stored as a matrix of integers, which are the numerators with respect to a common denominator for each dimension, and the phases as an array of integer codes into a :class:`.PhaseTable`. A hash index maps the integer coordinates to the rows, for lookups in constant time. The arrays grow by doubling their capacity, and the common denominators are increased when a point on a finer lattice is added.
+
+    Coordinates which are not inside the unit cube, or which would need a denominator which does not fit into 64-bit integers, are stored in a separate dictionary.
+
+    Parameters
+    ----------
+    dim: int
+        Dimension of the coordinates.
+    points:
+        Mapping or iterable of ``(coordinate, phase)`` pairs which are added to the store.
+    phase_table: PhaseTable
+        The table of phase codes, which can be shared with other objects. By default, a new table is created.
+    """
+
+    def __init__(self, dim, points=(), phase_table=None):
+        self._dim = dim
+        self._scale = [1] * dim
+        self._coords = np.zeros((0, dim), dtype=np.int64)
+        self._codes = np.zeros(0, dtype=np.int64)
+        self._size = 0
+        self._index = dict()
+        self._phase_table = PhaseTable() if phase_table is None else phase_table
+        self._extra = dict()
+        if isinstance(points, PointStore) and phase_table is None:
+            self._copy_from(points)
+        else:
+            self.update(points)
+
+    def __getstate__(self):
+        # The index is re-created when loading, to avoid storing it.
+        state = dict(self.__dict__)
+        state["_coords"] = self._coords[: self._size].copy()
+        state["_codes"] = self._codes[: self._size].copy()
+        del state["_index"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._rebuild_index()
+
+    def __repr__(self):
+        return "PointStore(dim={}, {} points)".format(self._dim, len(self))
+
+    def __len__(self):
+        return self._size + len(self._extra)
+
+    def __iter__(self):
+        for row in self._coords[: self._size].tolist():
+            yield self._to_coordinate(row)
+        yield from self._extra
+
+    def __contains__(self, coord):
+        return self._find_row(coord) is not None or coord in self._extra
+
+    def __getitem__(self, coord):
+        row = self._find_row(coord)
+        if row is None:
+            return self._extra[coord]
+        return self._phase_table[self._codes[row]]
+
+    def __setitem__(self, coord, phase):
+        if len(coord) != self._dim:
+            raise ValueError(
+                "Dimension {} of the coordinate {} does not match the dimension {} of the store.".format(
+                    len(coord), coord, self._dim
+                )
+            )
+        if self._extra and coord in self._extra:
+            self._extra[coord] = phase
+            return
+        key = self._to_key(coord)
+        if key is None:
+            key = self._rescale_for(coord)
+        if key is None:
+            self._extra[Coordinate(coord)] = phase
+            return
+        code = self._phase_table.code(phase)
+        row = self._index.get(key)
+        if row is None:
+            row = self._size
+            self._reserve(row + 1)
+            self._coords[row] = key
+            self._index[key] = row
+            self._size += 1
+        self._codes[row] = code
+
+    def __delitem__(self, coord):
+        row = self._find_row(coord)
+        if row is None:
+            del self._extra[coord]
+            return
+        del self._index[tuple(self._coords[row].tolist())]
+        last = self._size - 1
+        if row != last:
+            self._coords[row] = self._coords[last]
+            self._codes[row] = self._codes[last]
+            self._index[tuple(self._coords[row].tolist())] = row
+        self._size = last
+
+    @classmethod
+    def from_fractions(cls, numerators, denominators, phases, phase_table=None):
+        """
+        Creates a store from the exact coordinates of the points, given as arrays of their numerators and denominators. This avoids creating a :class:`.Coordinate` for each point.
+
+        Parameters
+        ----------
+        numerators: array_like
+            Integer array of shape ``(N, dim)`` containing the numerators of the coordinates.
+        denominators: array_like
+            Integer array of shape ``(N, dim)`` containing the denominators of the coordinates.
+        phases: list
+            The phase of each point.
+        phase_table: PhaseTable
+            The table of phase codes. By default, a new table is created.
+        """
+        numerators = np.asarray(numerators, dtype=np.int64)
+        denominators = np.asarray(denominators, dtype=np.int64)
+        dim = numerators.shape[1]
+        res = cls(dim, phase_table=phase_table)
+        if len(numerators) == 0:
+            return res
+        scale = np.lcm.reduce(denominators, axis=0)
+        inside = np.all((numerators >= 0) & (numerators <= denominators), axis=1)
+        if np.any(scale > _MAX_SCALE) or not np.all(inside):
+            # fall back to adding the points one by one
+            for num_row, den_row, phase in zip(
+                numerators.tolist(), denominators.tolist(), phases
+            ):
+                res[[Fraction(n, d) for n, d in zip(num_row, den_row)]] = phase
+            return res
+        # pylint: disable=protected-access
+        res._scale = [int(s) for s in scale]
+        res._coords = numerators * (scale // denominators)
+        res._codes = res._phase_table.codes(phases)
+        res._size = len(res._codes)
+        res._rebuild_index()
+        if len(res._index) != res._size:
+            raise ValueError("The coordinates of the points are not unique.")
+        return res
+
+    def items(self):
+        return _ItemsView(self)
+
+    def values(self):
+        return _ValuesView(self)
+
+    def within(self, bounds):
+        """
+        Returns a dictionary of the points inside the closed region given by a list of ``(low, high)`` boundaries for each dimension. The points stored as integers are selected without creating the coordinates of the other points.
+        """
+        coords = self._coords[: self._size]
+        mask = np.ones(self._size, dtype=bool)
+        for i, ((low, high), scale) in enumerate(zip(bounds, self._scale)):
+            mask &= coords[:, i] >= math.ceil(Fraction(low) * scale)
+            mask &= coords[:, i] <= math.floor(Fraction(high) * scale)
+        phases = list(self._phase_table)
+        res = {
+            self._to_coordinate(row): phases[code]
+            for row, code in zip(
+                coords[mask].tolist(), self._codes[: self._size][mask].tolist()
+            )
+        }
+        res.update(
+            (coord, phase)
+            for coord, phase in self._extra.items()
+            if all(low <= c <= high for c, (low, high) in zip(coord, bounds))
+        )
+        return res
+
+    def snapshot(self):
+        """
+        Returns the state of the store, from which a copy is created with :meth:`from_snapshot`. Only the arrays are copied when taking the snapshot, and the hash index of the copy is created by :meth:`from_snapshot`, which can be called in another thread.
+        """
+        state = self.__getstate__()
+        state["_scale"] = list(self._scale)
+        state["_phase_table"] = self._phase_table.copy()
+        state["_extra"] = dict(self._extra)
+        return state
+
+    @classmethod
+    def from_snapshot(cls, state):
+        """
+        Creates a copy of a store from the state returned by :meth:`snapshot`.
+        """
+        res = cls.__new__(cls)
+        res.__setstate__(state)
+        return res
+
+    def copy(self):
+        """
+        Returns a copy of the store.
+        """
+        return PointStore(self._dim, self)
+
+    @property
+    def phase_table(self):
+        """
+        The :class:`.PhaseTable` containing the phases of the points.
+        """
+        return self._phase_table
+
+    @property
+    def dim(self):
+        """
+        Dimension of the coordinates.
+        """
+        return self._dim
+
+    def to_arrays(self):
+        """
+        Returns the points as arrays.
+
+        Returns
+        -------
+        tuple(numpy.ndarray, numpy.ndarray, list):
+            The relative coordinates as a float array of shape ``(N, dim)``, the integer phase code of each point, and the list of phases. The code of each phase is its index in this list.
+        """
+        positions = self._coords[: self._size] / np.array(self._scale, dtype=float)
+        codes = self._codes[: self._size]
+        if self._extra:
+            positions = np.concatenate(
+                [positions, np.array(list(self._extra), dtype=float)]
+            )
+            codes = np.concatenate(
+                [codes, self._phase_table.codes(self._extra.values())]
+            ).astype(np.int64)
+        return positions, codes.copy(), list(self._phase_table)
+
+    def fraction_arrays(self):
+        """
+        Returns the exact coordinates of the points which are stored as integers, and the phase codes. Points stored separately are not included.
+
+        Returns
+        -------
+        tuple(numpy.ndarray, numpy.ndarray, numpy.ndarray, list):
+            The numerators and denominators of the coordinates in lowest terms, as integer arrays of shape ``(N, dim)``, the integer phase code of each point, and the list of phases.
+        """
+        numerators = self._coords[: self._size]
+        scale = np.array(self._scale, dtype=np.int64)
+        divisor = np.gcd(numerators, scale)
+        return (
+            numerators // divisor,
+            scale // divisor,
+            self._codes[: self._size].copy(),
+            list(self._phase_table),
+        )
+
+    @property
+    def extra_points(self):
+        """
+        Dictionary of the points which are not stored in the integer array.
+        """
+        return self._extra
+
+    def _find_row(self, coord):
+        key = self._to_key(coord)
+        if key is None:
+            return None
+        return self._index.get(key)
+
+    def _to_key(self, coord):
+        """
+        Returns the integer coordinates for the given coordinate, or ``None`` if it cannot be represented with the current denominators.
+        """
+        if len(coord) != self._dim:
+            return None
+        key = []
+        for c, s in zip(coord, self._scale):
+            value = Fraction(c) * s
+            if value.denominator != 1 or not 0 <= value <= s:
+                return None
+            key.append(value.numerator)
+        return tuple(key)
+
+    def _to_coordinate(self, row):
+        return Coordinate([Fraction(n, s) for n, s in zip(row, self._scale)])
+
+    def _rescale_for(self, coord):
+        """
+        Increases the denominators such that the given coordinate can be represented, and returns its integer coordinates. If this is not possible, ``None`` is returned and the denominators are not changed.
+        """
+        coord = [Fraction(c) for c in coord]
+        if not all(0 <= c <= 1 for c in coord):
+            return None
+        new_scale = [
+            s * c.denominator // math.gcd(s, c.denominator)
+            for s, c in zip(self._scale, coord)
+        ]
+        if max(new_scale) > _MAX_SCALE:
+            return None
+        factors = np.array(
+            [new // old for new, old in zip(new_scale, self._scale)], dtype=np.int64
+        )
+        self._coords[: self._size] *= factors
+        self._scale = new_scale
+        self._rebuild_index()
+        return tuple((c * s).numerator for c, s in zip(coord, new_scale))
+
+    def _rebuild_index(self):
+        self._index = {
+            tuple(row): i for i, row in enumerate(self._coords[: self._size].tolist())
+        }
+
+    def _reserve(self, size):
+        capacity = len(self._codes)
+        if size <= capacity:
+            return
+        new_capacity = max(size, 2 * capacity, 16)
+        coords = np.zeros((new_capacity, self._dim), dtype=np.int64)
+        coords[: self._size] = self._coords[: self._size]
+        codes = np.zeros(new_capacity, dtype=np.int64)
+        codes[: self._size] = self._codes[: self._size]
+        self._coords = coords
+        self._codes = codes
+
+    def _copy_from(self, other):
+        # pylint: disable=protected-access
+        self._scale = list(other._scale)
+        self._coords = other._coords[: other._size].copy()
+        self._codes = other._codes[: other._size].copy()
+        self._size = other._size
+        self._index = dict(other._index)
+        self._phase_table = other._phase_table.copy()
+        self._extra = dict(other._extra)
+
+
+class _ItemsView(ty.ItemsView[Coordinate, ty.Any]):
+    def __iter__(self):
+        store = self._mapping
+        phases = list(store.phase_table)
+        size = store._size  # pylint: disable=protected-access
+        rows = store._coords[:size].tolist()  # pylint: disable=protected-access
+        codes = store._codes[:size].tolist()  # pylint: disable=protected-access
+        to_coordinate = store._to_coordinate  # pylint: disable=protected-access
+        for row, code in zip(rows, codes):
+            yield to_coordinate(row), phases[code]
+        yield from store.extra_points.items()
+
+
+class _ValuesView(ty.ValuesView[ty.Any]):
+    def __iter__(self):
+        store = self._mapping
+        phases = list(store.phase_table)
+        size = store._size  # pylint: disable=protected-access
+        for code in store._codes[:size].tolist():  # pylint: disable=protected-access
+            yield phases[code]
+        yield from store.extra_points.values()
@@ -0,0 +1,89 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+
+import os
+import weakref
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+from fsc.export import export
+
+
+@export
+class WorkerPool:
+    """
+    Evaluates phase functions in an executor, limiting the number of evaluations which run at the same time. The pool can be shared by several calculations which run concurrently with :func:`.run_async` on the same event loop, such that they share the same workers. Evaluations are started in the order in which they are requested, regardless of the calculation they belong to. The pool can also be re-used on different event loops, for example in subsequent calls to :func:`asyncio.run`. In that case, ``max_workers`` limits the evaluations of each event loop separately.
+
+    The pool can be used as a context manager, which shuts down the executor if it was created by the pool.
+
+    Parameters
+    ----------
+    executor: concurrent.futures.Executor
+        The executor which runs the evaluations. By default, a :py:class:`ProcessPoolExecutor <concurrent.futures.ProcessPoolExecutor>` with ``max_workers`` processes is created.
+    max_workers: int
+        Maximum number of evaluations which run at the same time. By default, the number of processors is used.
+    """
+
+    def __init__(self, executor=None, *, max_workers=None):
+        if max_workers is None:
+            max_workers = os.cpu_count() or 1
+        if max_workers < 1:
+            raise ValueError(
+                "The number of workers must be at least 1, got {}.".format(max_workers)
+            )
+        self._max_workers = max_workers
+        self._owns_executor = executor is None
+        if executor is None:
+            executor = ProcessPoolExecutor(max_workers=max_workers)
+        self._executor = executor
+        # One semaphore per event loop, because a semaphore can only be used
+        # by the loop on which it was first used.
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+    @property
+    def max_workers(self):
+        """
+        Maximum number of evaluations which run at the same time.
+        """
+        return self._max_workers
+
+    def wrap(self, fct):
+        """
+        Returns a coroutine function which evaluates ``fct`` in the pool, and can be passed to :func:`.run_async` or :func:`.run`. For the default process pool, ``fct`` must be picklable.
+        """
+
+        async def inner(pos):
+            return await self.evaluate(fct, pos)
+
+        return inner
+
+    async def evaluate(self, fct, *args):
+        """
+        Evaluates ``fct`` with the given arguments in the executor, waiting until a worker is available.
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            semaphore = self._semaphores[loop]
+        except KeyError:
+            semaphore = self._semaphores[loop] = asyncio.Semaphore(self._max_workers)
+        async with semaphore:
+            return await loop.run_in_executor(self._executor, fct, *args)
+
+    def shutdown(self, wait=True):
+        """
+        Shuts down the executor if it was created by the pool.
+        """
+        if self._owns_executor:
+            self._executor.shutdown(wait=wait)
@@ -0,0 +1,43 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+
+import heapq
+import asyncio
+import itertools
+
+
+class PriorityLimiter:
+    """
+    Limits the number of tasks which run concurrently. Waiting tasks are started in the order of their priority, where lower values are started first, and tasks of equal priority in the order in which they arrived.
+    """
+
+    def __init__(self, max_running):
+        self._max_running = max_running
+        self._running = 0
+        self._waiting = []
+        self._counter = itertools.count()
+
+    async def acquire(self, priority):
+        if self._running < self._max_running and not self._waiting:
+            self._running += 1
+            return
+        fut = asyncio.get_event_loop().create_future()
+        heapq.heappush(self._waiting, (priority, next(self._counter), fut))
+        # The slot is passed on directly by 'release', so 'self._running'
+        # does not need to be changed here.
+        try:
+            await fut
+        except asyncio.CancelledError:
+            # If the slot was already passed on to this task, it is passed
+            # on again.
+            if fut.done() and not fut.cancelled():
+                self.release()
+            raise
+
+    def release(self):
+        while self._waiting:
+            _, _, fut = heapq.heappop(self._waiting)
+            if not fut.done():
+                fut.set_result(None)
+                return
+        self._running -= 1
@@ -0,0 +1,136 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+
+import copy
+
+from fsc.export import export
+
+from ._box_index import restore_boxes
+from ._coordinate import Coordinate
+from ._known_regions import relative_bounds
+from ._run import _RunImpl, CALCULATION_OPTIONS, check_options
+from ._logging_setup import LOGGER
+
+
+@export
+def refine(result, fct, region, num_steps=1, **kwargs):
+    """Refine an existing result in a given region.
+
+    The boxes of undefined phase which intersect the region are split further, until they are smaller than the smallest boxes of the result by a factor ``2 ** num_steps``. Only the boxes close to the region are restored, and the other boxes are taken over unchanged. The input result is not modified.
+
+    The boxes close to the region are found with the box index of the result, which is kept for further calls with the same result. Apart from the copies of the points and the set of boxes, which are needed to leave the input result unchanged, the cost is proportional to the number of boxes close to the region.
+
+    Parameters
+    ----------
+    result: Result
+        The result which is refined, for example loaded from a file.
+    fct:
+        The function which evaluates the phase at a given point. Can be either a synchronous or asynchronous (async def) function.
+    region:
+        The region which is refined, as a list of ``(low, high)`` boundaries for each dimension.
+    num_steps: int
+        The number of times the smallest boxes of the result can be split further.
+    kwargs:
+        Further options of the calculation, as described in :func:`.run`. The options ``mesh``, ``method``, ``tree``, ``init_result``, ``load`` and ``load_quiet`` are not available, because the boxes are taken from the ``result``.
+
+    Returns
+    -------
+    Result:
+        Contains the refined boxes, and all points of the input result and the new evaluations.
+    """
+    check_options(kwargs, CALCULATION_OPTIONS)
+    bounds = relative_bounds(region, result.limits)
+    if not result.boxes:
+        raise ValueError("Cannot refine a result which does not contain any boxes.")
+
+    # The boxes which can be split, and their neighbours, need to be
+    # restored. Their neighbours are contained in the bounding box of the
+    # boxes intersecting the region.
+    index = result._get_box_index()  # pylint: disable=protected-access
+    inside = index.intersecting(bounds)
+    if inside:
+        nearby = index.intersecting(_bounding_box(inside))
+        points = result.points.within(_bounding_box(nearby))
+    else:
+        nearby, points = [], dict()
+    LOGGER.debug(
+        f"Restoring {len(nearby)} of {len(result.boxes)} boxes for refinement."
+    )
+
+    return _RunImpl(
+        fct=fct,
+        limits=result.limits,
+        init_points=result.points,
+        init_inferred=getattr(result, "inferred_points", None),
+        init_indicators=getattr(result, "indicators", None),
+        start_boxes=restore_boxes(nearby, points=points),
+        unchanged_boxes=result.boxes.difference(nearby),
+        min_size=_get_min_size(index.sizes, num_steps),
+        split_region=bounds,
+        **kwargs,
+    ).execute()
+
+
+@export
+def continue_run(result, fct, num_steps=1, **kwargs):
+    """Continue the refinement of an existing result.
+
+    The calculation starts directly from the boxes of the result, which can be split further until they are smaller than the smallest boxes of the result by a factor ``2 ** num_steps``. For example, a result calculated with ``num_steps=6`` is continued to the result of ``num_steps=8`` by passing ``num_steps=2``. In contrast to passing the result as ``init_result`` to :func:`.run`, the previous splits are not repeated. If the result contains a refinement tree, a copy of it is extended with the new splits. The input result is not modified.
+
+    Parameters
+    ----------
+    result: Result
+        The result which is continued, for example loaded from a file.
+    fct:
+        The function which evaluates the phase at a given point. Can be either a synchronous or asynchronous (async def) function.
+    num_steps: int
+        The number of times the smallest boxes of the result can be split further.
+    kwargs:
+        Further options of the calculation, as described in :func:`.run`. The options ``mesh``, ``method``, ``tree``, ``init_result``, ``load`` and ``load_quiet`` are not available, because the boxes are taken from the ``result``.
+
+    Returns
+    -------
+    Result:
+        Contains the refined boxes, and all points of the input result and the new evaluations.
+    """
+    check_options(kwargs, CALCULATION_OPTIONS)
+    boxes = list(result.boxes)
+    if not boxes:
+        raise ValueError("Cannot continue a result which does not contain any boxes.")
+    tree = getattr(result, "tree", None)
+    return _RunImpl(
+        fct=fct,
+        limits=result.limits,
+        tree=False if tree is None else copy.deepcopy(tree),
+        init_points=result.points,
+        init_inferred=getattr(result, "inferred_points", None),
+        init_indicators=getattr(result, "indicators", None),
+        start_boxes=restore_boxes(boxes, points=result.points),
+        min_size=_get_min_size({tuple(box.size) for box in boxes}, num_steps),
+        **kwargs,
+    ).execute()
+
+
+def _get_min_size(sizes, num_steps):
+    """
+    Returns the size of the smallest boxes after splitting boxes of the smallest of the given sizes ``num_steps`` times.
+    """
+    sizes = list(sizes)
+    dim = len(sizes[0])
+    return Coordinate(
+        [min(size[i] for size in sizes) / 2 ** num_steps for i in range(dim)]
+    )
+
+
+def _bounding_box(boxes):
+    """
+    Returns the boundaries of the smallest region containing all given boxes.
+    """
+    dim = len(boxes[0].size)
+    return [
+        (
+            min(box.corner[i] for box in boxes),
+            max(box.corner[i] + box.size[i] for box in boxes),
+        )
+        for i in range(dim)
+    ]
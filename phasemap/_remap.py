@@ -0,0 +1,59 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+
+from fractions import Fraction
+
+from ._coordinate import Coordinate
+
+# Relative tolerance (in units of the smallest box size) within which a
+# remapped point is considered to lie on the lattice.
+_LATTICE_TOLERANCE = 1e-9
+
+
+def remap_coordinates(coords, old_limits, new_limits, min_size):
+    """
+    Converts relative coordinates from the ``old_limits`` to the ``new_limits``. Coordinates which lie on the lattice of the smallest boxes (up to floating-point errors in the limits) are snapped exactly onto it, such that they can be used as cached function evaluations. Coordinates outside of the new limits are dropped.
+
+    Parameters
+    ----------
+    coords:
+        The relative coordinates in the ``old_limits``.
+    old_limits:
+        Boundaries of the region to which the given coordinates are relative.
+    new_limits:
+        Boundaries of the region to which the returned coordinates are relative.
+    min_size: Coordinate
+        The size of the smallest boxes, relative to the ``new_limits``.
+
+    Returns
+    -------
+    dict:
+        Mapping of the old coordinates to the new ones.
+    """
+    old_low, old_size = _to_fractions(old_limits)
+    new_low, new_size = _to_fractions(new_limits)
+    num_cells = [1 / s for s in min_size]
+    res = dict()
+    for coord in coords:
+        new_coord = []
+        for c, o_low, o_size, n_low, n_size, s, n in zip(
+            coord, old_low, old_size, new_low, new_size, min_size, num_cells
+        ):
+            rel = (o_low + Fraction(c) * o_size - n_low) / n_size
+            index = rel / s
+            nearest = round(index)
+            if abs(index - nearest) < _LATTICE_TOLERANCE:
+                rel = nearest * s
+                index = nearest
+            if not 0 <= index <= n:
+                break
+            new_coord.append(rel)
+        else:
+            res[coord] = Coordinate(new_coord)
+    return res
+
+
+def _to_fractions(limits):
+    low = [Fraction(l) for l, _ in limits]
+    size = [Fraction(h) - l for l, (_, h) in zip(low, limits)]
+    return low, size
@@ -3,17 +3,201 @@
 
 import types
 
+import numpy as np
+
+from ._box_index import ArrayBoxIndex, compact_boxes, restore_boxes
+from ._point_store import PointStore
+from ._grid import grid_phases, grid_dtype, paint_boxes
+from ._logging_setup import LOGGER
+
 
 class Result(types.SimpleNamespace):
     """
     Container class for the result of a :func:`.run` calculation. Contains the boxes, points and limits of the calculation.
+
+    The ``inferred_points`` are the subset of the ``points`` whose phase was taken from a known region instead of being calculated, and the ``indicators`` map points to the indicator returned alongside their phase. If the calculation recorded the split history, it is stored in the ``tree``.
+
+    The ``points`` are stored in a :class:`.PointStore`, which behaves like a dictionary mapping the relative coordinates to the phases, and gives access to the points as arrays. The phases are stored as integer codes into the ``phase_table``.
     """
 
+    # Cache for the box lookup, not part of the namespace contents.
+    __slots__ = ("_box_index_cache",)
+
     def __init__(
-        self, *, points, boxes, limits
+        self,
+        *,
+        points,
+        boxes,
+        limits,
+        inferred_points=None,
+        indicators=None,
+        tree=None,
     ):  # pylint: disable=useless-super-delegation
+        if not isinstance(points, PointStore):
+            points = PointStore(len(limits), points)
         super().__init__(
             points=points,
             boxes=set(boxes),
             limits=[tuple(low_high) for low_high in limits],
+            inferred_points=set() if inferred_points is None else inferred_points,
+            indicators=dict() if indicators is None else indicators,
+            tree=tree,
         )
+        self._box_index_cache = None
+
+    def __reduce__(self):
+        return (_result_from_namespace, (dict(self.__dict__),))
+
+    @property
+    def phase_table(self):
+        """
+        The :class:`.PhaseTable` which assigns integer codes to the phases of the points.
+        """
+        return self.points.phase_table
+
+    def phase_at(self, positions):
+        """
+        Returns the phase at the given positions, as determined by the boxes containing them. Positions outside the limits, or inside boxes of undefined phase, are assigned ``PHASE_UNDEFINED``.
+
+        The spatial index used for the lookup is created on the first call, and re-created only when boxes are added, removed or replaced. Changes of the box phases are taken into account on every call.
+
+        Parameters
+        ----------
+        positions: array_like
+            Array of shape ``(N, dim)`` containing the absolute positions.
+
+        Returns
+        -------
+        numpy.ndarray:
+            Object array of length ``N`` containing the phases.
+        """
+        positions = np.asarray(positions, dtype=float)
+        if positions.ndim != 2 or positions.shape[1] != len(self.limits):
+            raise ValueError(
+                "Positions must have shape (N, {}), got {}.".format(
+                    len(self.limits), positions.shape
+                )
+            )
+        limits = np.array(self.limits, dtype=float)
+        relative = (positions - limits[:, 0]) / (limits[:, 1] - limits[:, 0])
+        return self._get_box_index().phase_at(relative)
+
+    def to_grid(self, shape, *, out=None, chunk_size=None):
+        """
+        Paints the boxes into a dense grid of integer phase codes. The grid covers the limits with ``shape`` equal cells, and each cell gets the phase of the box containing its center. Cells in boxes of undefined phase are set to ``-1``.
+
+        Parameters
+        ----------
+        shape: tuple(int)
+            Number of grid cells in each dimension.
+        out: numpy.ndarray
+            Array of the given shape into which the grid is written, for example a memory-mapped array. By default, a new array is created.
+        chunk_size: int
+            Number of grid slices along the first dimension which are painted at once.
+
+        Returns
+        -------
+        tuple(numpy.ndarray, list):
+            The grid, and the list of phases. The code of each phase is its index in this list.
+        """
+        shape = tuple(int(n) for n in shape)
+        if len(shape) != len(self.limits):
+            raise ValueError(
+                "Length of 'shape' {} does not match the dimension {} of the 'limits'.".format(
+                    len(shape), len(self.limits)
+                )
+            )
+        phases = grid_phases(self.boxes)
+        if out is None:
+            out = np.empty(shape, dtype=grid_dtype(phases))
+        elif out.shape != shape:
+            raise ValueError(
+                "Shape {} of 'out' does not match the grid shape {}.".format(
+                    out.shape, shape
+                )
+            )
+        paint_boxes(self.boxes, phases, out=out, chunk_size=chunk_size)
+        return out, phases
+
+    def compact(self):
+        """
+        Returns a copy of the result where sibling boxes with the same defined phase are merged, repeatedly up to the largest possible boxes. Complete groups of ``2 ** dim`` siblings are merged into their parent box. Because splitting a box of undefined phase always creates at least one child of undefined phase, pairs of siblings which are the two halves of a box split along one dimension are also merged, which creates non-cubic boxes. The phase of every position stays the same, but saving, plotting and point lookups become cheaper. The reduction in the number of boxes is logged.
+
+        Returns
+        -------
+        Result:
+            The compacted result.
+        """
+        boxes = compact_boxes(self.boxes)
+        if self.boxes:
+            LOGGER.info(
+                f"Compacted {len(self.boxes)} boxes to {len(boxes)} boxes "
+                f"({1 - len(boxes) / len(self.boxes):.1%} reduction)."
+            )
+        return Result(
+            points=self.points.copy(),
+            boxes=boxes,
+            limits=self.limits,
+            inferred_points=set(getattr(self, "inferred_points", ())),
+            indicators=dict(getattr(self, "indicators", ())),
+        )
+
+    def truncate(self, num_steps):
+        """
+        Returns the result after the given number of steps, extracted from the refinement tree. The boxes are those which exist after at most ``num_steps`` splits. The points are those which lie on the grid of the smallest boxes after ``num_steps`` splits, and the phases of the boxes are determined from these points. Because this grid can contain points which were evaluated in later steps, some boxes can have undefined phase where a calculation with ``num_steps`` would assign a phase.
+
+        Parameters
+        ----------
+        num_steps: int
+            The number of steps after which the result is extracted.
+
+        Returns
+        -------
+        Result:
+            The truncated result, which does not contain a refinement tree.
+        """
+        tree = getattr(self, "tree", None)
+        if tree is None:
+            raise ValueError(
+                "The result does not contain a refinement tree. Use 'tree=True' in 'run' to create it."
+            )
+        min_size = tree.max_size / 2 ** num_steps
+        points = {
+            coord: phase
+            for coord, phase in self.points.items()
+            if all((c / s).denominator == 1 for c, s in zip(coord, min_size))
+        }
+        indicators = getattr(self, "indicators", dict())
+        return Result(
+            points=points,
+            boxes=restore_boxes(tree.boxes(num_steps), points=points),
+            limits=self.limits,
+            inferred_points={
+                coord
+                for coord in getattr(self, "inferred_points", ())
+                if coord in points
+            },
+            indicators={
+                coord: indicators[coord] for coord in points if coord in indicators
+            },
+        )
+
+    def _get_box_index(self):
+        """
+        Returns the index for the box lookup. The index is re-used as long as the result contains the same box objects, which cannot be re-used for other boxes because the index keeps them alive. The phases are read again on every call, because they can change without changing the boxes.
+        """
+        box_ids = {id(box) for box in self.boxes}
+        if self._box_index_cache is None or self._box_index_cache[0] != box_ids:
+            self._box_index_cache = (box_ids, ArrayBoxIndex(self.boxes))
+        else:
+            self._box_index_cache[1].update_phases()
+        return self._box_index_cache[1]
+
+
+def _result_from_namespace(namespace):
+    res = Result.__new__(Result)
+    res.__dict__.update(namespace)
+    if not isinstance(res.points, PointStore):
+        res.points = PointStore(len(res.limits), res.points)
+    res._box_index_cache = None  # pylint: disable=protected-access
+    return res
@@ -1,6 +1,7 @@
 # © 2015-2018, ETH Zurich, Institut für Theoretische Physik
 # Author: Dominik Gresch <greschd@gmx.ch>
 
+import os
 import copy
 import asyncio
 import numbers
@@ -10,15 +11,53 @@ from collections import ChainMap
 
 import numpy as np
 from fsc.export import export
-from fsc.async_tools import PeriodicTask
 
 from . import io as _io
 from ._box import Box, PHASE_UNDEFINED
-from ._cache import FuncCache
+from ._box_index import restore_boxes, is_dyadic_partition, box_intersects
+from ._boundary import BoundaryTracker
+from ._cache import FuncCache, NOT_FOUND
+from ._checkpoint import BackgroundSaver, snapshot_result
+from ._evaluation import guard_evaluation
 from ._coordinate import Coordinate
 from ._result import Result
+from ._point_store import PointStore
+from ._symmetry import get_canonicalize
+from ._remap import remap_coordinates
+from ._known_regions import KnownRegions
+from ._priority import PriorityLimiter
+from ._tree import RefinementTree
 from ._logging_setup import LOGGER
 
+# Default number of concurrent splits per processor, if the splits are
+# prioritized by an indicator.
+_PRIORITIZED_SPLITS_PER_CPU = 8
+
+# Options of the calculation which are documented in 'run', and passed on
+# unchanged by the functions which start a calculation.
+CALCULATION_OPTIONS = frozenset(
+    [
+        "all_corners",
+        "anisotropic",
+        "symmetries",
+        "known_regions",
+        "has_indicator",
+        "concurrent_splits",
+        "batch_size",
+        "batch_timeout",
+        "timeout",
+        "on_error",
+        "max_retries",
+        "retry_delay",
+        "error_phase",
+        "straggler_quantile",
+        "save_file",
+        "serializer",
+        "save_interval",
+        "save_fraction",
+    ]
+)
+
 
 @export
 def run(  # pylint: disable=too-many-arguments
@@ -33,6 +72,23 @@ def run(  # pylint: disable=too-many-arguments
     load_quiet=True,
     serializer="auto",
     save_interval=5.0,
+    *,
+    anisotropic=False,
+    method="split",
+    symmetries=(),
+    known_regions=(),
+    has_indicator=False,
+    concurrent_splits=None,
+    batch_size=None,
+    batch_timeout=0.1,
+    timeout=None,
+    on_error="raise",
+    max_retries=3,
+    retry_delay=1.0,
+    error_phase=None,
+    straggler_quantile=None,
+    tree=False,
+    save_fraction=0.1,
 ):
     """Run the PhaseMap algorithm.
 
@@ -51,23 +107,126 @@ def run(  # pylint: disable=too-many-arguments
     all_corners: bool
         Determines whether all corners of a box should be calculated, or only the vertices and middle point of the parent box.
     init_result: Result
-        Input result, which is used to cache function evaluations.
+        Input result, which is used to cache function evaluations. The result can have different ``limits``, ``mesh`` and ``num_steps``. Its points are converted to the current limits, and points outside of the limits are dropped. Points which lie on the grid of the smallest boxes are re-used as function evaluations. The remaining points are not stored in the result, but only added to the initial boxes which contain them, such that boxes containing a phase transition of the input result are refined.
     save_file: str
         Path of the file where the intermediate results should be stored. A format string can also be passed, and will be formatted with an incrementing index.
     load: bool
-        Determines whether the initial result is loaded from the ``save_file``.
+        Determines whether the initial result is loaded from the ``save_file``. If the boxes of the loaded result are compatible with the given ``mesh`` and ``num_steps``, the calculation is resumed directly from these boxes instead of repeating all previous splits.
     load_quiet: bool
         Determines if the error is suppressed when the initial result cannot be loaded from the ``save_file``.
     serializer: module
         Serializer used to save and load the result.
     save_interval: float
         Minimum time between saving the result.
+    anisotropic: bool
+        Determines whether boxes are split only along the dimensions in which the phase changes between their corners. This reduces the number of evaluations in high-dimensional phase diagrams, at the cost of creating boxes with different sizes along each dimension.
+    method: str
+        The refinement method. With ``"split"``, each box of undefined phase is split recursively. With ``"boundary"``, the phase boundaries are instead followed on the grid of the smallest boxes, which needs fewer evaluations for smooth boundaries in two or three dimensions. Boundaries which do not cross the edges of the initial mesh, or the diagonals from the center of the initial boxes to their corners, can be missed by the ``"boundary"`` method.
+    symmetries: list
+        Symmetries of the phase diagram, which are used to avoid evaluating the function at points which are related by symmetry. An integer denotes a mirror symmetry along that axis, at the center of the limits. A sequence of integers denotes a permutation of the axes, where the ``i``-th axis is mapped to the axis ``symmetries[i]``. A callable is passed the relative coordinate (in the range [0, 1]) as a tuple of :class:`fractions.Fraction`, and must return the transformed relative coordinate. The function is evaluated only at one representative of each set of points related by the symmetries.
+    known_regions: list
+        Regions where the phase is known in advance, as a list of ``(region, phase)`` tuples. The region is either a list of ``(low, high)`` boundaries for each dimension, or a callable which is passed a position and returns whether the position is inside the region. The function is not evaluated at points inside these regions, and boxes which lie entirely inside a region given by boundaries are not split. The points whose phase was taken from a known region are stored in the ``inferred_points`` of the result.
+    has_indicator: bool
+        Determines whether the function returns a tuple ``(phase, indicator)`` instead of only the phase. The indicator is a real number whose absolute value measures the distance to a phase transition, for example a band gap. The indicators are stored in the ``indicators`` of the result, and boxes are split in the order of the smallest absolute value of the indicators at their points. In this way, boxes close to a transition are refined first.
+    concurrent_splits: int
+        Maximum number of boxes which are split at the same time. By default, there is no limit unless ``has_indicator`` is set. In that case, the splits are limited to eight per processor (and at least ``batch_size``), such that waiting boxes are split in the order of their indicators while the evaluations still run in parallel. With ``concurrent_splits=1``, the boxes are split strictly in the order of their indicators.
+    batch_size: int
+        If given, ``fct`` is called with a list of positions and must return the list of phases. Evaluations which are requested at nearly the same time are collected into batches of at most ``batch_size`` positions, which reduces the overhead of backends with a high cost per call.
+    batch_timeout: float
+        Maximum time in seconds that an evaluation waits for other evaluations to fill its batch. Used only if ``batch_size`` is given.
+    timeout: float
+        Maximum time in seconds for a single evaluation of ``fct``. An evaluation which takes longer is cancelled and counts as failed. Timeouts are only possible for asynchronous functions.
+    on_error: str
+        Determines what happens if an evaluation fails. With ``"raise"``, the exception aborts the calculation. With ``"retry"``, the evaluation is retried up to ``max_retries`` times before the exception is raised. With ``"mark"``, the evaluation is also retried, but the point is then assigned the ``error_phase`` instead of aborting the calculation.
+    max_retries: int
+        Maximum number of times a failed evaluation is retried, for the ``"retry"`` and ``"mark"`` error policies.
+    retry_delay: float
+        Time in seconds before the first retry of an evaluation. The delay is doubled for each further retry.
+    error_phase:
+        The phase assigned to points whose evaluation failed, with the ``"mark"`` error policy.
+    straggler_quantile: float
+        If given, an evaluation which runs longer than this quantile of the durations of previous evaluations (for example ``0.9``) is started a second time, and the result which is available first is used. This reduces the time spent waiting for slow workers.
+    tree: bool
+        Determines whether the split history is recorded in a :class:`.RefinementTree`, which is stored as the ``tree`` of the result. The tree can be used to locate points, and to extract the result after fewer steps with :meth:`.Result.truncate`. It is not stored when the result is saved.
+    save_fraction: float
+        Maximum fraction of the wall time spent writing the intermediate results. The results are written in a background thread, from a copy taken when saving starts. If writing takes long, the time between saves is increased beyond the ``save_interval``.
 
     Returns
     -------
     Result:
         Contains the resulting boxes and points, and the given 'limits'.
     """
+    return _run_until_complete(
+        run_async(
+            fct,
+            limits,
+            mesh=mesh,
+            num_steps=num_steps,
+            all_corners=all_corners,
+            init_result=init_result,
+            save_file=save_file,
+            load=load,
+            load_quiet=load_quiet,
+            serializer=serializer,
+            save_interval=save_interval,
+            anisotropic=anisotropic,
+            method=method,
+            symmetries=symmetries,
+            known_regions=known_regions,
+            has_indicator=has_indicator,
+            concurrent_splits=concurrent_splits,
+            batch_size=batch_size,
+            batch_timeout=batch_timeout,
+            timeout=timeout,
+            on_error=on_error,
+            max_retries=max_retries,
+            retry_delay=retry_delay,
+            error_phase=error_phase,
+            straggler_quantile=straggler_quantile,
+            tree=tree,
+            save_fraction=save_fraction,
+        )
+    )
+
+
+@export
+async def run_async(  # pylint: disable=too-many-arguments
+    fct,
+    limits,
+    mesh=5,
+    num_steps=5,
+    all_corners=False,
+    init_result=None,
+    save_file=None,
+    load=False,
+    load_quiet=True,
+    serializer="auto",
+    save_interval=5.0,
+    *,
+    anisotropic=False,
+    method="split",
+    symmetries=(),
+    known_regions=(),
+    has_indicator=False,
+    concurrent_splits=None,
+    batch_size=None,
+    batch_timeout=0.1,
+    timeout=None,
+    on_error="raise",
+    max_retries=3,
+    retry_delay=1.0,
+    error_phase=None,
+    straggler_quantile=None,
+    tree=False,
+    save_fraction=0.1,
+):
+    """Run the PhaseMap algorithm on the caller's event loop.
+
+    This is the coroutine version of :func:`.run`, which can be used when an event loop is already running, for example in a Jupyter notebook or an asynchronous application. Several calculations can be run concurrently on the same event loop, for example with :func:`asyncio.gather`. To share the workers which evaluate the phase functions between the calculations, use a :class:`.WorkerPool`.
+
+    The parameters and the returned :class:`.Result` are the same as for :func:`.run`.
+    """
+    init_boxes = None
     if save_file is not None and load:
         if init_result is not None:
             raise ValueError(
@@ -75,32 +234,93 @@ def run(  # pylint: disable=too-many-arguments
             )
         try:
             init_result = _io.load(save_file, serializer=serializer)
+            init_boxes = init_result.boxes
         except OSError as err:
             if not load_quiet:
                 raise err
 
     if init_result is not None:
-        if not np.allclose(limits, init_result.limits):
+        if len(init_result.limits) != len(limits):
             raise ValueError(
-                "Limits {} of the 'init_result' do not match the given limits {}".format(
-                    init_result.limits, limits
+                "Dimension {} of the 'init_result' does not match the dimension {} of the 'limits'.".format(
+                    len(init_result.limits), len(limits)
                 )
             )
+        init_limits = init_result.limits
         init_points = init_result.points
+        init_inferred = getattr(init_result, "inferred_points", None)
+        init_indicators = getattr(init_result, "indicators", None)
     else:
+        init_limits = None
         init_points = None
+        init_inferred = None
+        init_indicators = None
 
-    return _RunImpl(
+    return await _RunImpl(
         fct=fct,
         limits=limits,
         mesh=mesh,
         num_steps=num_steps,
-        all_corners=all_corners,
         init_points=init_points,
+        init_inferred=init_inferred,
+        init_indicators=init_indicators,
+        init_boxes=init_boxes,
+        init_limits=init_limits,
+        all_corners=all_corners,
+        anisotropic=anisotropic,
+        method=method,
+        symmetries=symmetries,
+        known_regions=known_regions,
+        has_indicator=has_indicator,
+        concurrent_splits=concurrent_splits,
+        batch_size=batch_size,
+        batch_timeout=batch_timeout,
+        timeout=timeout,
+        on_error=on_error,
+        max_retries=max_retries,
+        retry_delay=retry_delay,
+        error_phase=error_phase,
+        straggler_quantile=straggler_quantile,
+        tree=tree,
         save_file=save_file,
         serializer=serializer,
         save_interval=save_interval,
-    ).execute()
+        save_fraction=save_fraction,
+    ).execute_async()
+
+
+def check_options(options, allowed):
+    """
+    Checks that the given keyword arguments, which are passed on to the calculation, are in the ``allowed`` options.
+    """
+    for name in options:
+        if name not in allowed:
+            raise TypeError("Unexpected keyword argument '{}'.".format(name))
+
+
+def _run_until_complete(coro):
+    """
+    Runs the coroutine on the current event loop, which must not be running already.
+    """
+    loop = _get_event_loop()
+    if loop.is_running():
+        coro.close()
+        raise RuntimeError(
+            "The calculation cannot be run synchronously because the event loop is already running. Use 'run_async' instead."
+        )
+    return loop.run_until_complete(coro)
+
+
+def _get_event_loop():
+    """
+    Returns the current event loop. A new event loop is created if there is none, for example after :func:`asyncio.run`.
+    """
+    try:
+        return asyncio.get_event_loop()
+    except RuntimeError:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        return loop
 
 
 class _RunImpl:
@@ -111,39 +331,167 @@ class _RunImpl:
         mesh=5,
         num_steps=5,
         all_corners=False,
+        anisotropic=False,
+        method="split",
+        symmetries=(),
+        known_regions=(),
+        has_indicator=False,
+        concurrent_splits=None,
+        batch_size=None,
+        batch_timeout=0.1,
+        timeout=None,
+        on_error="raise",
+        max_retries=3,
+        retry_delay=1.0,
+        error_phase=None,
+        straggler_quantile=None,
+        tree=False,
         init_points=None,
+        init_inferred=None,
+        init_indicators=None,
+        init_boxes=None,
+        init_limits=None,
+        start_boxes=None,
+        unchanged_boxes=(),
+        min_size=None,
+        split_region=None,
         save_file=None,
         serializer="auto",
         save_interval=5.0,
+        save_fraction=0.1,
     ):
         self._save_file = save_file
         self._serializer = serializer
         self._save_interval = save_interval
+        self._save_fraction = save_fraction
         self._save_count = 0
         self._squares_need_saving = False
         self._init_dimensions(limits=limits, mesh=mesh, num_steps=num_steps)
+        if min_size is not None:
+            self._min_size = Coordinate(min_size)
+        self._split_region = split_region
         self._all_corners = all_corners
+        self._anisotropic = anisotropic
+        if method not in ("split", "boundary"):
+            raise ValueError(
+                "Invalid method '{}', must be 'split' or 'boundary'.".format(method)
+            )
+        if method == "boundary" and anisotropic:
+            raise ValueError(
+                "The 'boundary' method cannot be combined with anisotropic splitting."
+            )
 
+        self._known_regions = KnownRegions(
+            known_regions,
+            limits=limits,
+            coordinate_to_position=self._coordinate_to_position,
+        )
+        # Points of an 'init_result' with different limits which do not lie
+        # on the lattice of the smallest boxes. They are not re-used as
+        # evaluations, but only added to the initial boxes.
+        self._off_lattice_points = None
+        if init_limits is not None and not np.allclose(init_limits, limits):
+            (
+                init_points,
+                init_inferred,
+                init_indicators,
+                self._off_lattice_points,
+            ) = self._remap_init_data(
+                old_limits=init_limits,
+                points=init_points,
+                inferred=init_inferred,
+                indicators=init_indicators,
+            )
+            # The boxes cannot be reused, because they do not match the
+            # new limits.
+            init_boxes = None
+        self._indicators = copy.deepcopy(init_indicators) or dict()
+        if concurrent_splits is None and has_indicator:
+            # The splits need to be limited for the priority to have an
+            # effect, but enough of them must run at the same time to keep
+            # parallel evaluations busy.
+            concurrent_splits = max(
+                batch_size or 1, _PRIORITIZED_SPLITS_PER_CPU * (os.cpu_count() or 1)
+            )
+        if concurrent_splits is None:
+            self._split_limiter = None
+        else:
+            self._split_limiter = PriorityLimiter(concurrent_splits)
+        points = PointStore(self._dim, init_points or ())
+        if batch_size is None:
+            func = lambda coord: fct(self._coordinate_to_position(coord))
+        else:
+            func = lambda coords: fct([self._coordinate_to_position(c) for c in coords])
+        if on_error == "mark" and error_phase is None:
+            raise ValueError("The 'error_phase' must be given for the 'mark' policy.")
+        error = (error_phase, None) if has_indicator else error_phase
+        if batch_size is None:
+            error_result = lambda coord: error
+        else:
+            error_result = lambda coords: [error] * len(coords)
+        func = guard_evaluation(
+            func,
+            timeout=timeout,
+            on_error=on_error,
+            max_retries=max_retries,
+            retry_delay=retry_delay,
+            error_result=error_result,
+            straggler_quantile=straggler_quantile,
+        )
         self._func = FuncCache(
-            lambda coord: fct(self._coordinate_to_position(coord)),
-            data=copy.deepcopy(init_points),
+            func,
+            data=points,
+            canonicalize=get_canonicalize(symmetries, limits),
+            known=self._known_regions.phase_at if self._known_regions else None,
+            inferred=copy.deepcopy(init_inferred),
+            indicators=self._indicators if has_indicator else None,
+            intern=points.phase_table.intern,
+            batch_size=batch_size,
+            batch_timeout=batch_timeout,
         )
+        if start_boxes is None:
+            start_boxes = self._restore_boxes(init_boxes)
+        # Restored boxes are refined further by splitting, because their
+        # boundaries have already been located.
+        self._track_boundaries = method == "boundary" and start_boxes is None
+        split_all = start_boxes is None
+        if start_boxes is None:
+            start_boxes = self._get_initial_boxes()
+        if isinstance(tree, RefinementTree):
+            # Continue recording into an existing tree, whose leaves are
+            # the start boxes.
+            tree.replace_boxes(list(start_boxes) + list(unchanged_boxes))
+            self._tree = tree
+        elif tree:
+            self._tree = RefinementTree(
+                list(start_boxes) + list(unchanged_boxes), max_size=self._max_size
+            )
+        else:
+            self._tree = None
         self.result = Result(
-            boxes=set(self._get_initial_boxes()),
+            boxes=set(start_boxes),
             # Note: 'points' needs to be the same object, not a copy. Otherwise
             # it will not update when the '_func' is called.
             points=self._func.data,
             limits=limits,
+            inferred_points=self._func.inferred,
+            indicators=self._indicators,
+            tree=self._tree,
         )
 
-        self._loop = asyncio.get_event_loop()
+        self._loop = _get_event_loop()
         self._split_futures_done = dict()
         self._split_futures_pending = dict()
         self._split_futures = ChainMap(
             self._split_futures_pending, self._split_futures_done
         )
-        for sqr in self.result.boxes:
-            self._schedule_split_box(sqr)
+        if not self._track_boundaries:
+            for sqr in self.result.boxes:
+                if split_all or sqr.phase is None or sqr.phase is PHASE_UNDEFINED:
+                    self._schedule_split_box(sqr)
+        # Boxes which are not split are only added to the result, without
+        # restoring their neighbours and points.
+        self.result.boxes.update(unchanged_boxes)
 
     @property
     def needs_saving(self):
@@ -155,13 +503,27 @@ class _RunImpl:
         self._func.needs_saving = value
 
     def execute(self):
-        self._loop.run_until_complete(self._run())
+        return _run_until_complete(self.execute_async())
+
+    async def execute_async(self):
+        await self._run()
         return self.result
 
     async def _run(self):
-        async with PeriodicTask(self._save, delay=self._save_interval):
+        async with BackgroundSaver(
+            self._snapshot,
+            interval=self._save_interval,
+            max_fraction=self._save_fraction,
+        ):
+            if self._track_boundaries:
+                await self._create_boundary_boxes()
             while not self._check_done():
-                await asyncio.sleep(0.0)
+                # New splits are scheduled only by running splits, so the
+                # pending splits are checked again when one of them is done.
+                await asyncio.wait(
+                    list(self._split_futures_pending.values()),
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
 
     def _check_done(self):
         done_tasks = [
@@ -183,6 +545,7 @@ class _RunImpl:
         return not self._split_futures_pending
 
     def _init_dimensions(self, limits, mesh, num_steps):
+        self._limits = limits
         self._limit_corner = np.array([low for low, high in limits])
         self._limit_size = np.array([high - low for low, high in limits])
         self._dim = len(limits)
@@ -191,6 +554,7 @@ class _RunImpl:
 
         self._max_size = Coordinate([Fraction(1, m - 1) for m in self._mesh])
         self._min_size = self._max_size / 2 ** num_steps
+        self._num_steps = num_steps
 
     def _validate_mesh(self, mesh):
         if isinstance(mesh, numbers.Integral):
@@ -209,44 +573,173 @@ class _RunImpl:
     def _coordinate_to_position(self, coord):
         return self._limit_corner + coord * self._limit_size
 
+    def _restore_boxes(self, init_boxes):
+        if init_boxes is not None and is_dyadic_partition(
+            init_boxes,
+            max_size=self._max_size,
+            min_size=self._min_size,
+            points=self._func.data,
+        ):
+            LOGGER.debug(f"Restoring {len(init_boxes)} boxes.")
+            return restore_boxes(init_boxes, points=self._func.data)
+        return None
+
     def _get_initial_boxes(self):
         corners = itertools.product(
             *[[i * s for i in range(m - 1)] for s, m in zip(self._max_size, self._mesh)]
         )
         boxes = [Box(corner=c, size=self._max_size) for c in corners]
+        if self._off_lattice_points is not None:
+            # The points of an 'init_result' with different limits are added
+            # to the boxes they are in, such that boxes containing a phase
+            # transition are refined.
+            return restore_boxes(
+                boxes, points=ChainMap(self._off_lattice_points, self._func.data)
+            )
         for i, sq1 in enumerate(boxes):
             for sq2 in boxes[i + 1 :]:
                 sq1.process_possible_neighbour(sq2)
         return boxes
 
+    def _remap_init_data(self, old_limits, points, inferred, indicators):
+        """
+        Converts the points of an initial result with different limits to the current limits. Points outside of the current limits are dropped. Points which do not lie on the lattice of the smallest boxes are returned separately, and their inferred state and indicators are dropped.
+        """
+        mapping = remap_coordinates(
+            points,
+            old_limits=old_limits,
+            new_limits=self._limits,
+            min_size=self._min_size,
+        )
+        new_points = dict()
+        off_lattice_points = dict()
+        for old, new in mapping.items():
+            if all((c / s).denominator == 1 for c, s in zip(new, self._min_size)):
+                new_points[new] = points[old]
+            else:
+                off_lattice_points[new] = points[old]
+        LOGGER.debug(
+            f"Re-using {len(new_points)} of {len(points)} points of the initial result, and {len(off_lattice_points)} points for the initial boxes."
+        )
+        new_inferred = {
+            mapping[c] for c in inferred or () if mapping.get(c) in new_points
+        }
+        new_indicators = {
+            mapping[c]: value
+            for c, value in (indicators or dict()).items()
+            if mapping.get(c) in new_points
+        }
+        return new_points, new_inferred, new_indicators, off_lattice_points
+
+    async def _create_boundary_boxes(self):
+        """
+        Replaces the initial boxes with boxes which are refined along the phase boundaries. Boxes which do not contain any evaluated point are assigned the phase at their center, and boxes whose phase is still undefined are split further.
+        """
+        tracker = BoundaryTracker(
+            self._func, mesh=self._mesh, num_steps=self._num_steps
+        )
+        on_split = None if self._tree is None else self._tree.split
+        boxes = restore_boxes(
+            await tracker.get_boxes(on_split=on_split), points=self._func.data
+        )
+        if self._tree is not None:
+            self._tree.replace_boxes(boxes)
+        LOGGER.debug(f"Created {len(boxes)} boxes along the phase boundaries.")
+        self.result.boxes.clear()
+        self.result.boxes.update(boxes)
+        self.needs_saving = True
+
+        empty_boxes = [box for box in boxes if box.phase is None]
+        centers = [box.corner + box.size / 2 for box in empty_boxes]
+        phases = await asyncio.gather(*[self._func(c) for c in centers])
+        for box, center, phase in zip(empty_boxes, centers, phases):
+            self._add_points(box, [center], [phase])
+        for box in boxes:
+            if box.phase is PHASE_UNDEFINED:
+                self._schedule_split_box(box)
+
     def _schedule_split_box(self, box):
         if box in self._split_futures:
             return
         if np.all(box.size <= self._min_size):
             return
-        fut = asyncio.ensure_future(self._split_box(box), loop=self._loop)
+        if self._split_region is not None and not box_intersects(
+            box, self._split_region
+        ):
+            return
+        known_phase = self._known_regions.box_phase(box)
+        if known_phase is not NOT_FOUND:
+            if box.phase is None:
+                box.phase = known_phase
+            return
+        if self._split_limiter is None:
+            coro = self._split_box(box)
+        else:
+            coro = self._limited_split_box(box)
+        fut = asyncio.ensure_future(coro, loop=self._loop)
         self._split_futures[box] = fut
 
+    async def _limited_split_box(self, box):
+        await self._split_limiter.acquire(priority=self._split_priority(box))
+        try:
+            await self._split_box(box)
+        finally:
+            self._split_limiter.release()
+
+    def _split_priority(self, box):
+        """
+        Returns the smallest absolute value of the indicators at the points of the box. Boxes without indicators are split first.
+        """
+        values = [
+            abs(self._indicators[coord])
+            for coord in box._points  # pylint: disable=protected-access
+            if coord in self._indicators
+        ]
+        return min(values, default=-float("inf"))
+
     async def _split_box(self, box):
         LOGGER.debug(f"Splitting {box}.")
-        if self._all_corners:
-            coordinate_stencil = np.array(
-                list(itertools.product([0, Fraction(1, 2), 1], repeat=self._dim))
-            )
+        if self._anisotropic:
+            coords, phases, split_axes = await self._evaluate_anisotropic(box)
         else:
-            coordinate_stencil = np.array(
-                [[Fraction(1, 2)] * self._dim]
-                + list(itertools.product([0, 1], repeat=self._dim))
-            )
-        coords = box.corner + coordinate_stencil * box.size
-        phases = await asyncio.gather(*[self._func(c) for c in coords])
+            # Boxes merged by 'Result.compact' can already have the minimum
+            # size along some dimensions.
+            split_axes = [
+                i for i in range(self._dim) if box.size[i] > self._min_size[i]
+            ]
+            if self._all_corners:
+                coordinate_stencil = np.array(
+                    list(itertools.product([0, Fraction(1, 2), 1], repeat=self._dim))
+                )
+            else:
+                coordinate_stencil = np.array(
+                    [[Fraction(1, 2)] * self._dim]
+                    + list(itertools.product([0, 1], repeat=self._dim))
+                )
+            coords = box.corner + coordinate_stencil * box.size
+            phases = await asyncio.gather(*[self._func(c) for c in coords])
+        if not split_axes:
+            if coords:
+                self._add_points(box, coords, phases)
+            return
         corner_stencil = np.array(
-            list(itertools.product([0, Fraction(1, 2)], repeat=self._dim))
+            list(
+                itertools.product(
+                    *[
+                        [0, Fraction(1, 2)] if i in split_axes else [0]
+                        for i in range(self._dim)
+                    ]
+                )
+            )
+        )
+        new_size = Coordinate(
+            [s / 2 if i in split_axes else s for i, s in enumerate(box.size)]
         )
-        new_size = box.size / 2
         new_corners = box.corner + corner_stencil * box.size
         # create new boxes
         new_boxes = [Box(corner=c, size=new_size) for c in new_corners]
+        if self._tree is not None:
+            self._tree.split(box, new_boxes)
         old_neighbours = list(box._neighbours)  # pylint: disable=protected-access
         self.result.boxes.update(new_boxes)
         # add points to new boxes and neighbours
@@ -272,14 +765,82 @@ class _RunImpl:
         box.delete_from_neighbours()
         self.needs_saving = True
 
-    def _save(self):
-        if self._save_file is None:
-            return
-        if self.needs_saving:
-            _io.save(
-                self.result,
-                self._save_file.format(self._save_count),
-                serializer=self._serializer,
+    def _add_points(self, box, coords, phases):
+        """
+        Adds points to a box which cannot be split further, and to its neighbours.
+        """
+        for sqr in [box] + list(box._neighbours):  # pylint: disable=protected-access
+            for c, p in zip(coords, phases):
+                sqr.add_point(coord=c, phase=p)
+            if sqr.phase is PHASE_UNDEFINED:
+                self._schedule_split_box(sqr)
+        self.needs_saving = True
+
+    async def _evaluate_anisotropic(self, box):
+        """
+        Determines the axes along which the box is split, evaluating the center and corners of the box if needed. The box is split along the axes in which its evaluated points show a phase change between two points that differ only along that axis, if it is large enough along them. If the points do not show such a phase change, all axes are considered. The resulting list of axes is empty if the phase changes only along axes where the box already has the minimum size.
+        """
+        known_points = box._points  # pylint: disable=protected-access
+        changing_axes = _changing_axes(known_points.keys(), known_points.values())
+        if changing_axes and all(
+            box.size[i] <= self._min_size[i] for i in changing_axes
+        ):
+            return [], [], []
+
+        half = Fraction(1, 2)
+        coordinate_stencil = np.array(
+            [[half] * self._dim] + list(itertools.product([0, 1], repeat=self._dim))
+        )
+        coords = list(box.corner + coordinate_stencil * box.size)
+        phases = await asyncio.gather(*[self._func(c) for c in coords])
+
+        changing_axes = _changing_axes(
+            coords + list(known_points.keys()), phases + list(known_points.values())
+        ) or list(range(self._dim))
+        split_axes = [i for i in changing_axes if box.size[i] > self._min_size[i]]
+
+        if self._all_corners:
+            extra_stencil = np.array(
+                list(
+                    itertools.product(
+                        *[
+                            [0, half, 1] if i in split_axes else [0, 1]
+                            for i in range(self._dim)
+                        ]
+                    )
+                )
             )
-            self._save_count += 1
-            self.needs_saving = False
+            extra_coords = list(box.corner + extra_stencil * box.size)
+            coords += extra_coords
+            phases += await asyncio.gather(*[self._func(c) for c in extra_coords])
+        return coords, phases, split_axes
+
+    def _snapshot(self):
+        """
+        Takes a copy of the result if it needs to be saved, and returns the function which saves it. The function is called in a background thread.
+        """
+        if self._save_file is None or not self.needs_saving:
+            return None
+        create_snapshot = snapshot_result(self.result)
+        file_path = self._save_file.format(self._save_count)
+        serializer = self._serializer
+        self._save_count += 1
+        self.needs_saving = False
+        return lambda: _io.save(create_snapshot(), file_path, serializer=serializer)
+
+
+def _changing_axes(coords, phases):
+    """
+    Returns the axes along which the phase changes between two points which differ only in the coordinate along that axis.
+    """
+    coords = [tuple(c) for c in coords]
+    phases = list(phases)
+    res = []
+    for i in range(len(coords[0]) if coords else 0):
+        phases_on_line = dict()
+        for coord, phase in zip(coords, phases):
+            key = coord[:i] + coord[i + 1 :]
+            if phases_on_line.setdefault(key, phase) != phase:
+                res.append(i)
+                break
+    return res
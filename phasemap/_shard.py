@@ -0,0 +1,176 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+
+import numbers
+import itertools
+from fractions import Fraction
+from concurrent.futures import ProcessPoolExecutor
+
+from fsc.export import export
+
+from ._box import Box
+from ._coordinate import Coordinate
+from ._run import run, _RunImpl, CALCULATION_OPTIONS, check_options
+from ._merge import merge
+from ._result import Result
+from ._logging_setup import LOGGER
+
+# Options which are only used for the final refinement of the merged result,
+# and not passed to the calculations of the shards.
+_FINAL_OPTIONS = frozenset(
+    ["symmetries", "save_file", "serializer", "save_interval", "save_fraction"]
+)
+
+
+@export
+def run_sharded(  # pylint: disable=too-many-arguments
+    fct, limits, *, shards=2, processes=None, mesh=5, num_steps=5, **kwargs
+):
+    """Run the PhaseMap algorithm on separate subdomains in parallel.
+
+    The ``limits`` are split into subdomains ("shards") along the lines of the initial mesh, and each shard is calculated with :func:`.run` in a separate process. The results of the shards are then combined with :func:`.merge`, and boxes at the edges of the shards which become undefined due to points evaluated by a neighbouring shard are refined further in the current process.
+
+    Parameters
+    ----------
+    fct:
+        The function which evaluates the phase at a given point. Since it is sent to other processes, it must be picklable.
+    limits:
+        Boundaries of the region where the phase diagram is evaluated.
+    shards:
+        Number of shards, either as an integer (number of shards along the first dimension) or a list of integers (one for each dimension).
+    processes: int
+        Number of processes which are used. By default, the number of processors on the machine is used. If ``processes`` is 1, all shards are calculated in the current process.
+    mesh:
+        Size of the initial grid, either as an integer, or a list of integers (one for each dimension).
+    num_steps: int
+        The maximum number of times each box is split.
+    kwargs:
+        Further options of the calculation, as described in :func:`.run`. Since the ``symmetries`` are defined relative to the full ``limits``, they are only used when refining the boxes at the edges of the shards. The result is also saved to the ``save_file`` only during this last step.
+
+    Returns
+    -------
+    Result:
+        Contains the resulting boxes and points, and the given 'limits'.
+    """
+    check_options(kwargs, CALCULATION_OPTIONS)
+    dim = len(limits)
+    if isinstance(mesh, numbers.Integral):
+        mesh = [mesh] * dim
+    if isinstance(shards, numbers.Integral):
+        shards = [shards] + [1] * (dim - 1)
+    if len(mesh) != dim or len(shards) != dim:
+        raise ValueError(
+            "Lengths of 'mesh' and 'shards' must match the dimension {} of the 'limits'.".format(
+                dim
+            )
+        )
+    if any(m < 2 for m in mesh):
+        raise ValueError("Mesh must be >= 2 for each dimension.")
+    if any(not 1 <= s <= m - 1 for s, m in zip(shards, mesh)):
+        raise ValueError(
+            "The number of shards in each dimension must be between 1 and the number of initial mesh cells."
+        )
+
+    cell_ranges = itertools.product(
+        *[_split_cells(m - 1, s) for m, s in zip(mesh, shards)]
+    )
+    shard_specs = [
+        dict(
+            limits=[
+                (
+                    low + (high - low) * start / (m - 1),
+                    low + (high - low) * stop / (m - 1),
+                )
+                for (low, high), (start, stop), m in zip(limits, ranges, mesh)
+            ],
+            mesh=[stop - start + 1 for start, stop in ranges],
+            ranges=ranges,
+        )
+        for ranges in cell_ranges
+    ]
+    LOGGER.info(f"Running {len(shard_specs)} shards.")
+
+    shard_options = {
+        key: value for key, value in kwargs.items() if key not in _FINAL_OPTIONS
+    }
+    run_kwargs = [
+        dict(
+            fct=fct,
+            limits=spec["limits"],
+            mesh=spec["mesh"],
+            num_steps=num_steps,
+            **shard_options,
+        )
+        for spec in shard_specs
+    ]
+    if processes == 1:
+        shard_results = [run(**kwargs) for kwargs in run_kwargs]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = [executor.submit(run, **kwargs) for kwargs in run_kwargs]
+            shard_results = [fut.result() for fut in futures]
+
+    merged = merge(
+        [
+            _to_global_result(
+                shard_res, ranges=spec["ranges"], mesh=mesh, limits=limits
+            )
+            for spec, shard_res in zip(shard_specs, shard_results)
+        ]
+    )
+    # Restoring the merged boxes refines the boxes at the shard edges which
+    # have become undefined through points of the neighbouring shards.
+    return _RunImpl(
+        fct=fct,
+        limits=limits,
+        mesh=mesh,
+        num_steps=num_steps,
+        init_points=merged.points,
+        init_boxes=merged.boxes,
+        init_inferred=merged.inferred_points,
+        init_indicators=merged.indicators,
+        **kwargs,
+    ).execute()
+
+
+def _to_global_result(shard_res, ranges, mesh, limits):
+    """
+    Converts the result of a shard to the relative coordinates of the full limits.
+    """
+    offset = [Fraction(start, m - 1) for (start, _), m in zip(ranges, mesh)]
+    scale = [Fraction(stop - start, m - 1) for (start, stop), m in zip(ranges, mesh)]
+    points = {
+        _to_global(coord, offset, scale): phase
+        for coord, phase in shard_res.points.items()
+    }
+    inferred_points = {
+        _to_global(coord, offset, scale) for coord in shard_res.inferred_points
+    }
+    indicators = {
+        _to_global(coord, offset, scale): indicator
+        for coord, indicator in shard_res.indicators.items()
+    }
+    boxes = []
+    for box in shard_res.boxes:
+        new_box = Box(
+            corner=_to_global(box.corner, offset, scale),
+            size=[s * sc for s, sc in zip(box.size, scale)],
+        )
+        new_box.phase = box.phase
+        boxes.append(new_box)
+    return Result(
+        points=points,
+        boxes=boxes,
+        limits=limits,
+        inferred_points=inferred_points,
+        indicators=indicators,
+    )
+
+
+def _split_cells(num_cells, num_shards):
+    bounds = [round(i * num_cells / num_shards) for i in range(num_shards + 1)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _to_global(coord, offset, scale):
+    return Coordinate([o + c * s for c, o, s in zip(coord, offset, scale)])
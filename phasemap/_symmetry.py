@@ -0,0 +1,67 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+
+import numbers
+from fractions import Fraction
+
+import numpy as np
+
+from ._coordinate import Coordinate
+
+
+def get_canonicalize(symmetries, limits):
+    """
+    Returns a function which maps a (relative) coordinate to the canonical representative of its orbit under the group generated by the given symmetries, or ``None`` if no symmetries are given.
+
+    Parameters
+    ----------
+    symmetries:
+        List of symmetry operations. An integer denotes a mirror symmetry along that axis, at the center of the limits. A sequence of integers denotes a permutation of the axes, where the ``i``-th axis is mapped to the axis ``symmetry[i]``. A callable is passed the relative coordinate (in the range [0, 1]) as a tuple of :class:`fractions.Fraction`, and must return the transformed relative coordinate.
+    limits:
+        Boundaries of the region where the phase diagram is evaluated.
+    """
+    if not symmetries:
+        return None
+    transformations = [_get_transformation(sym, limits) for sym in symmetries]
+
+    def canonicalize(coord):
+        coord = tuple(coord)
+        orbit = {coord}
+        new_coords = [coord]
+        while new_coords:
+            current = new_coords.pop()
+            for trafo in transformations:
+                transformed = tuple(Fraction(x) for x in trafo(current))
+                if transformed not in orbit:
+                    orbit.add(transformed)
+                    new_coords.append(transformed)
+        return Coordinate(min(orbit))
+
+    return canonicalize
+
+
+def _get_transformation(symmetry, limits):
+    dim = len(limits)
+    if callable(symmetry):
+        return symmetry
+    if isinstance(symmetry, numbers.Integral):
+        axis = int(symmetry)
+        if not 0 <= axis < dim:
+            raise ValueError(
+                "Mirror axis {} is out of range for dimension {}.".format(axis, dim)
+            )
+        return lambda coord: coord[:axis] + (1 - coord[axis],) + coord[axis + 1 :]
+    permutation = [int(i) for i in symmetry]
+    if sorted(permutation) != list(range(dim)):
+        raise ValueError(
+            "Symmetry {} is not a permutation of the {} axes.".format(symmetry, dim)
+        )
+    for i, j in enumerate(permutation):
+        if not np.allclose(limits[i], limits[j]):
+            raise ValueError(
+                "Permutation {} maps axes {} and {} with different limits.".format(
+                    symmetry, i, j
+                )
+            )
+    inverse = np.argsort(permutation)
+    return lambda coord: tuple(coord[k] for k in inverse)
@@ -0,0 +1,133 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+
+import copy
+
+from ._coordinate import Coordinate
+
+
+class TreeNode:
+    """
+    Node of the :class:`.RefinementTree`.
+
+    Attributes
+    ----------
+    box: Box
+        The box described by the node. For nodes which have been split, the phase of the box is the phase it had when it was split.
+    children: list(TreeNode)
+        The nodes of the boxes created by splitting the box, or an empty list if the box was not split.
+    depth: int
+        The number of splits needed to create the box from a box of the initial mesh.
+    """
+
+    __slots__ = ("box", "children", "depth")
+
+    def __init__(self, box, depth):
+        self.box = box
+        self.children = []
+        self.depth = depth
+
+    def __repr__(self):
+        return "TreeNode(box={0.box}, depth={0.depth}, children={1})".format(
+            self, len(self.children)
+        )
+
+
+class RefinementTree:
+    """
+    Tree describing how the boxes of a calculation were split. The roots are the boxes the calculation started with, and the children of each node are the boxes created by splitting it.
+
+    Parameters
+    ----------
+    boxes:
+        The boxes the calculation starts with.
+    max_size: Coordinate
+        The size of the boxes in the initial mesh, used to determine the depth of the nodes.
+    """
+
+    def __init__(self, boxes, max_size):
+        self.max_size = Coordinate(max_size)
+        self.roots = [TreeNode(box, depth=self._depth(box)) for box in boxes]
+        self._leaves = {node.box: node for node in self.roots}
+
+    def __getstate__(self):
+        # The leaves are not stored to avoid pickling each box twice.
+        return dict(max_size=self.max_size, roots=self.roots)
+
+    def __setstate__(self, state):
+        self.max_size = state["max_size"]
+        self.roots = state["roots"]
+        self._leaves = {
+            node.box: node for node in self.iter_nodes() if not node.children
+        }
+
+    def _depth(self, box):
+        return max(
+            max((m / s).numerator.bit_length() - 1, 0)
+            for m, s in zip(self.max_size, box.size)
+        )
+
+    def split(self, box, new_boxes):
+        """
+        Adds the boxes created by splitting ``box`` as its children.
+        """
+        node = self._leaves.pop(box)
+        for new_box in new_boxes:
+            child = TreeNode(new_box, depth=self._depth(new_box))
+            node.children.append(child)
+            self._leaves[new_box] = child
+
+    def replace_boxes(self, boxes):
+        """
+        Replaces the boxes of the leaves with the given boxes, which are equal to the existing ones. This is used when the boxes are restored after being created.
+        """
+        for box in boxes:
+            self._leaves[box].box = box
+
+    def iter_nodes(self):
+        """
+        Iterates over all nodes of the tree, parents before their children.
+        """
+        stack = list(reversed(self.roots))
+        while stack:
+            node = stack.pop()
+            yield node
+            stack.extend(reversed(node.children))
+
+    def boxes(self, num_steps=None):
+        """
+        Returns the boxes after at most ``num_steps`` splits, as copies which keep the phase of the box at the time it was split. If ``num_steps`` is not given, the current leaf boxes are returned.
+        """
+        res = []
+        stack = list(self.roots)
+        while stack:
+            node = stack.pop()
+            if node.children and (num_steps is None or node.depth < num_steps):
+                stack.extend(node.children)
+            else:
+                res.append(_copy_box(node.box))
+        return res
+
+    def locate(self, coord):
+        """
+        Returns the leaf node whose box contains the given relative coordinate, or ``None`` if the coordinate is outside of the tree. The lookup descends from the roots, and therefore needs a number of steps which is logarithmic in the number of boxes.
+        """
+        candidates = self.roots
+        node = None
+        while candidates:
+            for candidate in candidates:
+                if candidate.box.contains_coord(coord):
+                    node = candidate
+                    candidates = candidate.children
+                    break
+            else:
+                break
+        return node
+
+
+def _copy_box(box):
+    new_box = copy.copy(box)
+    # pylint: disable=protected-access
+    new_box._neighbours = set()
+    new_box._points = dict(box._points)
+    return new_box
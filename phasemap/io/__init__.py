@@ -3,3 +3,5 @@
 """This module contains functions for saving and loading PhaseMap objects."""
 
 from ._save_load import *
+from ._grid import *
+from . import msgpack_ext
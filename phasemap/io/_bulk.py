@@ -0,0 +1,213 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+"""
+Bulk conversion of PhaseMap objects to and from the plain JSON / msgpack - compatible types. The format is the same as with the per-object :func:`.encode` and :func:`.decode` hooks, but a :class:`.Result` is converted in a single pass over its points and boxes.
+"""
+
+# pylint: disable=protected-access
+
+from fractions import Fraction
+
+import numpy as np
+
+from .._box import Box
+from .._coordinate import Coordinate
+from .._result import Result
+from .._point_store import PointStore
+from ._encoding import decode
+
+
+def to_plain(obj):
+    """
+    Converts a :class:`.Result` to plain types. Other objects, and the phases, are returned unchanged and left to the :func:`.encode` hook of the serializer.
+    """
+    if not isinstance(obj, Result):
+        return obj
+    fractions = dict()
+    res = dict(
+        __result__=True,
+        points=_points_to_plain(obj.points, fractions),
+        boxes=[_box_to_plain(box, fractions) for box in obj.boxes],
+        limits=obj.limits,
+    )
+    # Only stored if present, to keep the format of other results unchanged.
+    inferred_points = getattr(obj, "inferred_points", None)
+    if inferred_points:
+        res["inferred_points"] = [
+            _coord_to_plain(coord, fractions) for coord in inferred_points
+        ]
+    indicators = getattr(obj, "indicators", None)
+    if indicators:
+        res["indicators"] = [
+            (_coord_to_plain(coord, fractions), indicator)
+            for coord, indicator in indicators.items()
+        ]
+    return res
+
+
+def _fraction_to_plain(numerator, denominator, fractions):
+    key = (numerator, denominator)
+    try:
+        return fractions[key]
+    except KeyError:
+        res = fractions[key] = dict(__fraction__=True, n=numerator, d=denominator)
+        return res
+
+
+def _coord_to_plain(coord, fractions):
+    coord = [Fraction(c) for c in coord]
+    return dict(
+        __coord__=True,
+        c=[_fraction_to_plain(c.numerator, c.denominator, fractions) for c in coord],
+    )
+
+
+def _points_to_plain(points, fractions):
+    if not isinstance(points, PointStore):
+        return [
+            (_coord_to_plain(coord, fractions), phase)
+            for coord, phase in points.items()
+        ]
+    numerators, denominators, codes, phases = points.fraction_arrays()
+    res = [
+        (
+            dict(
+                __coord__=True,
+                c=[
+                    _fraction_to_plain(n, d, fractions)
+                    for n, d in zip(num_row, den_row)
+                ],
+            ),
+            phases[code],
+        )
+        for num_row, den_row, code in zip(
+            numerators.tolist(), denominators.tolist(), codes.tolist()
+        )
+    ]
+    res.extend(
+        (_coord_to_plain(coord, fractions), phase)
+        for coord, phase in points.extra_points.items()
+    )
+    return res
+
+
+def _box_to_plain(box, fractions):
+    return dict(
+        __box__=True,
+        corner=_coord_to_plain(box.corner, fractions),
+        phase=box.phase,
+        size=_coord_to_plain(box.size, fractions),
+    )
+
+
+# -----------------------------------------------------------------------#
+
+
+def from_plain(obj):
+    """
+    Converts an object loaded without an object hook to the PhaseMap types. A :class:`.Result` is converted in bulk, with a fallback to the :func:`.decode` hook for entries which are not in the expected format.
+    """
+    if isinstance(obj, dict) and _markers(obj) == ["__result__"]:
+        return _result_from_plain(obj)
+    return decode_nested(obj)
+
+
+def _markers(obj):
+    return [key for key in obj if isinstance(key, str) and key.startswith("__")]
+
+
+def decode_nested(obj):
+    """
+    Applies the :func:`.decode` hook to all nested dictionaries, from the inside out.
+    """
+    if isinstance(obj, dict):
+        return decode({key: decode_nested(value) for key, value in obj.items()})
+    if isinstance(obj, list):
+        return [decode_nested(value) for value in obj]
+    return obj
+
+
+def _result_from_plain(obj):
+    dim = len(obj["limits"])
+    coords = _CoordinateCache()
+    return Result(
+        points=_points_from_plain(obj["points"], dim),
+        boxes=[_box_from_plain(box, coords) for box in obj["boxes"]],
+        limits=obj["limits"],
+        inferred_points={coords.get(coord) for coord in obj.get("inferred_points", ())},
+        indicators={
+            coords.get(coord): decode_nested(indicator)
+            for coord, indicator in obj.get("indicators", ())
+        },
+    )
+
+
+def _points_from_plain(points, dim):
+    """
+    Creates the :class:`.PointStore` from the integer arrays of the numerators and denominators, without creating the individual coordinates.
+    """
+    try:
+        numerators = np.array(
+            [[c["n"] for c in coord["c"]] for coord, _ in points], dtype=np.int64
+        ).reshape(len(points), dim)
+        denominators = np.array(
+            [[c["d"] for c in coord["c"]] for coord, _ in points], dtype=np.int64
+        ).reshape(len(points), dim)
+    except (KeyError, TypeError, ValueError, OverflowError):
+        return PointStore(dim, decode_nested(points))
+    phases = [decode_nested(phase) for _, phase in points]
+    return PointStore.from_fractions(numerators, denominators, phases)
+
+
+def _box_from_plain(obj, coords):
+    if _markers(obj) != ["__box__"]:
+        return decode_nested(obj)
+    return make_box(
+        coords.get(obj["corner"]), coords.get(obj["size"]), decode_nested(obj["phase"])
+    )
+
+
+def make_box(corner, size, phase):
+    """
+    Creates a box from the given coordinates, which are used without copying. This means the coordinates can be shared between boxes, which is possible because they are immutable.
+    """
+    box = Box.__new__(Box)
+    box.corner = corner
+    box.phase = phase
+    box.size = size
+    box._neighbours = set()
+    box._points = dict()
+    box._hash = hash((corner, size))
+    return box
+
+
+class _CoordinateCache:
+    """
+    Creates coordinates from their plain representation, re-using equal coordinates and fractions.
+    """
+
+    def __init__(self):
+        self._fractions = dict()
+        self._coords = dict()
+
+    def get(self, obj):
+        """
+        Returns the coordinate for the given plain object.
+        """
+        try:
+            key = tuple((c["n"], c["d"]) for c in obj["c"])
+        except (KeyError, TypeError):
+            return decode_nested(obj)
+        try:
+            return self._coords[key]
+        except KeyError:
+            res = self._coords[key] = Coordinate([self._fraction(n, d) for n, d in key])
+            return res
+
+    def _fraction(self, numerator, denominator):
+        key = (numerator, denominator)
+        try:
+            return self._fractions[key]
+        except KeyError:
+            res = self._fractions[key] = Fraction(numerator, denominator)
+            return res
@@ -15,6 +15,7 @@ from fsc.export import export
 from .._box import Box, Sentinel
 from .._coordinate import Coordinate
 from .._result import Result
+from .._point_store import PointStore
 
 
 @export
@@ -53,12 +54,43 @@ def _encode_iterable(obj):
 
 @encode.register(Result)
 def _encode_result(obj):
-    return dict(
+    res = dict(
         __result__=True,
-        points=obj.points.items(),
+        points=_encode_points(obj.points),
         boxes=obj.boxes,
         limits=obj.limits,
     )
+    # Only stored if present, to keep the format of other results unchanged.
+    inferred_points = getattr(obj, "inferred_points", None)
+    if inferred_points:
+        res["inferred_points"] = inferred_points
+    indicators = getattr(obj, "indicators", None)
+    if indicators:
+        res["indicators"] = indicators.items()
+    return res
+
+
+def _encode_points(points):
+    """
+    Returns the ``(coordinate, phase)`` pairs of the points. For a :class:`.PointStore`, the encoded coordinates are created directly from its integer arrays, in the same format as for individual coordinates.
+    """
+    if not isinstance(points, PointStore):
+        return points.items()
+    numerators, denominators, codes, phases = points.fraction_arrays()
+    res = [
+        (
+            dict(
+                __coord__=True,
+                c=[dict(__fraction__=True, n=n, d=d) for n, d in zip(num_row, den_row)],
+            ),
+            phases[code],
+        )
+        for num_row, den_row, code in zip(
+            numerators.tolist(), denominators.tolist(), codes.tolist()
+        )
+    ]
+    res.extend(points.extra_points.items())
+    return res
 
 
 @encode.register(Coordinate)
@@ -102,6 +134,8 @@ def decode_result(obj):
         points=dict(obj["points"]),
         boxes=obj["boxes"],
         limits=obj["limits"],
+        inferred_points=set(obj.get("inferred_points", ())),
+        indicators=dict(obj.get("indicators", ())),
     )
 
 
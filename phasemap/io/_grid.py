@@ -0,0 +1,39 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+
+import numpy as np
+from fsc.export import export
+
+from .._grid import grid_phases, grid_dtype
+
+
+@export
+def save_grid(result, file_path, shape, *, chunk_size=64):
+    """
+    Saves the result as a dense grid of integer phase codes to a ``.npy`` file. The grid is written in chunks to a memory-mapped file, such that it does not need to fit into memory. See :meth:`.Result.to_grid` for a description of the grid.
+
+    Parameters
+    ----------
+    result: Result
+        The result which is saved.
+    file_path: str
+        Path of the ``.npy`` file.
+    shape: tuple(int)
+        Number of grid cells in each dimension.
+    chunk_size: int
+        Number of grid slices along the first dimension which are painted at once.
+
+    Returns
+    -------
+    list:
+        The list of phases. The code of each phase is its index in this list.
+    """
+    shape = tuple(int(n) for n in shape)
+    out = np.lib.format.open_memmap(
+        file_path, mode="w+", dtype=grid_dtype(grid_phases(result.boxes)), shape=shape
+    )
+    try:
+        _, phases = result.to_grid(shape, out=out, chunk_size=chunk_size)
+    finally:
+        del out
+    return phases
@@ -1,15 +1,138 @@
 # © 2015-2018, ETH Zurich, Institut für Theoretische Physik
 # Author: Dominik Gresch <greschd@gmx.ch>
 
+import gc
+import os
+import json
+import contextlib
 import pickle
+import tempfile
+import threading
 
+import msgpack
 from fsc.iohelper import SerializerDispatch
 
-from . import _encoding
+from . import _encoding, msgpack_ext
+from ._bulk import to_plain, from_plain
 
 __all__ = ["save", "load"]
 
 IO_HANDLER = SerializerDispatch(_encoding, exclude=[pickle])
+# The compact extension types are only used if they are passed explicitly as
+# serializer. Files with the 'msgpack' extension are written in the plain
+# msgpack format, which can also be read by other programs.
+IO_HANDLER.serializer_specs[msgpack_ext] = IO_HANDLER.serializer_specs[
+    msgpack
+]._replace(encode_kwargs=dict(), decode_kwargs=dict())
 
-save = IO_HANDLER.save  # pylint: disable=invalid-name
-load = IO_HANDLER.load  # pylint: disable=invalid-name
+SERIALIZERS = (json, msgpack, msgpack_ext)
+
+
+def save(obj, file_path, serializer="auto", *, compact=False):
+    """
+    Saves an object to the given file. The saving is atomic, by first writing to a temporary file which is then moved to the ``file_path``.
+
+    Parameters
+    ----------
+    obj:
+        The object to save.
+    file_path: str
+        Path to the file.
+    serializer:
+        The serializer used, either :mod:`json`, :mod:`msgpack`, or the compact :mod:`phasemap.io.msgpack_ext`. By default, the serializer is determined from the file extension, falling back to :mod:`json`. Files with the ``.msgpack`` extension are written in the plain :mod:`msgpack` format, and the compact format of :mod:`phasemap.io.msgpack_ext` is used only if it is passed explicitly.
+    compact: bool
+        Determines whether a :class:`.Result` is compacted with :meth:`.Result.compact` before saving.
+    """
+    if compact:
+        obj = obj.compact()
+    if serializer == "auto":
+        serializer = _get_serializer(file_path, use_default=True)
+    if serializer not in SERIALIZERS:
+        raise ValueError("Invalid serializer '{}'.".format(serializer))
+    # The object is converted to plain types in bulk, and then serialized in
+    # a single call which uses the C implementation of the serializer.
+    if serializer is msgpack_ext:
+        content = msgpack_ext.packb(obj)
+    elif serializer is json:
+        content = json.dumps(to_plain(obj), default=_encoding.encode).encode("utf-8")
+    else:
+        content = msgpack.packb(to_plain(obj), default=_encoding.encode)
+    _write_atomic(content, file_path)
+
+
+def load(file_path, serializer="auto"):
+    """
+    Loads an object from the given file.
+
+    Parameters
+    ----------
+    file_path: str
+        Path to the file.
+    serializer:
+        The serializer used, either :mod:`json`, :mod:`msgpack`, or :mod:`phasemap.io.msgpack_ext`. By default, the serializer is determined from the file extension. Both msgpack serializers can read files written by either of them.
+    """
+    if serializer == "auto":
+        serializer = _get_serializer(file_path)
+    with open(file_path, "rb") as f:
+        content = f.read()
+    if serializer not in SERIALIZERS:
+        raise ValueError("Invalid serializer '{}'.".format(serializer))
+    with _gc_paused():
+        if serializer is json:
+            return from_plain(json.loads(content))
+        return msgpack_ext.unpackb(content)
+
+
+_GC_LOCK = threading.Lock()
+_GC_PAUSES = 0
+_GC_WAS_ENABLED = False
+
+
+@contextlib.contextmanager
+def _gc_paused():
+    """
+    Disables the garbage collector while many objects without reference cycles are created, where it would only slow down their creation. Since this affects the whole process, it is only used in :func:`load`, and not in :func:`save` which also runs in the background while the calculation continues. Concurrent pauses are counted, such that the collector is enabled again only after the last one ends.
+    """
+    global _GC_PAUSES, _GC_WAS_ENABLED  # pylint: disable=global-statement
+    with _GC_LOCK:
+        if _GC_PAUSES == 0:
+            _GC_WAS_ENABLED = gc.isenabled()
+            gc.disable()
+        _GC_PAUSES += 1
+    try:
+        yield
+    finally:
+        with _GC_LOCK:
+            _GC_PAUSES -= 1
+            if _GC_PAUSES == 0 and _GC_WAS_ENABLED:
+                gc.enable()
+
+
+def _get_serializer(file_path, use_default=False):
+    _, file_ext = os.path.splitext(file_path)
+    try:
+        return IO_HANDLER.ext_mapping[file_ext.lower().lstrip(".")]
+    except KeyError as exc:
+        if use_default:
+            return json
+        raise ValueError(
+            "Could not guess serializer from file ending '{}'.".format(file_ext)
+        ) from exc
+
+
+def _write_atomic(content, file_path):
+    """
+    Writes the content to a temporary file in the same directory, which is then moved to ``file_path``.
+    """
+    dirname = os.path.dirname(os.path.abspath(file_path))
+    if not os.path.isdir(dirname):
+        raise ValueError("Directory {} does not exist.".format(dirname))
+    with tempfile.NamedTemporaryFile(dir=dirname, delete=False, mode="wb") as f:
+        tmp_path = f.name
+        try:
+            f.write(content)
+        except Exception:
+            f.close()
+            os.remove(tmp_path)
+            raise
+    os.replace(tmp_path, file_path)
@@ -0,0 +1,192 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+"""
+Compact :mod:`msgpack` serializer for PhaseMap objects. Fractions, coordinates, boxes and sentinels are stored as msgpack extension types with packed integer payloads, and the points of a :class:`.Result` are stored as flat integer arrays. The module has the same interface as :mod:`msgpack`, such that it can be passed as ``serializer`` to :func:`.save` and :func:`.load`. Files written in the plain :mod:`msgpack` format can also be loaded.
+"""
+
+# pylint: disable=protected-access
+
+from fractions import Fraction
+from functools import singledispatch
+
+import numpy as np
+import msgpack
+
+from .._box import Box, Sentinel
+from .._coordinate import Coordinate
+from .._result import Result
+from .._point_store import PointStore
+from .._phase_table import PhaseTable
+from ._encoding import encode
+from ._bulk import from_plain, decode_nested, make_box
+
+__all__ = ["packb", "unpackb", "dump", "load"]
+
+FRACTION = 1
+COORDINATE = 2
+BOX = 3
+SENTINEL = 4
+RESULT = 5
+
+
+def packb(obj):
+    """
+    Serializes the object to bytes.
+    """
+    return msgpack.packb(obj, default=_encode_ext)
+
+
+def unpackb(data):
+    """
+    Deserializes an object from bytes.
+    """
+    return from_plain(msgpack.unpackb(data, ext_hook=_ExtDecoder()))
+
+
+def dump(obj, stream):
+    """
+    Serializes the object to the given binary stream.
+    """
+    stream.write(packb(obj))
+
+
+def load(stream):
+    """
+    Deserializes an object from the given binary stream.
+    """
+    return unpackb(stream.read())
+
+
+@singledispatch
+def _encode_ext(obj):
+    return encode(obj)
+
+
+def _pack_integers(integers):
+    """
+    Packs the integers. Integers which do not fit in 64 bits are stored as strings.
+    """
+    return msgpack.packb(integers, default=str)
+
+
+@_encode_ext.register(Fraction)
+def _(obj):
+    return msgpack.ExtType(FRACTION, _pack_integers([obj.numerator, obj.denominator]))
+
+
+@_encode_ext.register(Coordinate)
+def _(obj):
+    return msgpack.ExtType(
+        COORDINATE,
+        _pack_integers([x for c in obj for x in (c.numerator, c.denominator)]),
+    )
+
+
+@_encode_ext.register(Box)
+def _(obj):
+    return msgpack.ExtType(BOX, packb([obj.corner, obj.size, obj.phase]))
+
+
+@_encode_ext.register(Sentinel)
+def _(obj):
+    return msgpack.ExtType(SENTINEL, msgpack.packb(obj._value))
+
+
+@_encode_ext.register(Result)
+def _(obj):
+    points = obj.points
+    if not isinstance(points, PointStore):
+        points = PointStore(len(obj.limits), points)
+    numerators, denominators, codes, phases = points.fraction_arrays()
+    return msgpack.ExtType(
+        RESULT,
+        packb(
+            dict(
+                limits=obj.limits,
+                numerators=numerators.ravel().tolist(),
+                denominators=denominators.ravel().tolist(),
+                codes=codes.tolist(),
+                phases=phases,
+                extra_points=list(points.extra_points.items()),
+                boxes=list(obj.boxes),
+                inferred_points=list(getattr(obj, "inferred_points", ())),
+                indicators=list(getattr(obj, "indicators", dict()).items()),
+            )
+        ),
+    )
+
+
+class _ExtDecoder:
+    """
+    Decodes the extension types. Equal coordinates are decoded to the same object, which is possible because they are immutable.
+    """
+
+    def __init__(self):
+        self._coords = dict()
+        self._fractions = dict()
+        self._decoders = {
+            FRACTION: self._decode_fraction,
+            COORDINATE: self._decode_coordinate,
+            BOX: self._decode_box,
+            SENTINEL: self._decode_sentinel,
+            RESULT: self._decode_result,
+        }
+
+    def __call__(self, code, data):
+        try:
+            decoder = self._decoders[code]
+        except KeyError:
+            return msgpack.ExtType(code, data)
+        return decoder(data)
+
+    def _unpackb(self, data):
+        return msgpack.unpackb(data, ext_hook=self)
+
+    def _fraction(self, numerator, denominator):
+        key = (numerator, denominator)
+        try:
+            return self._fractions[key]
+        except KeyError:
+            res = self._fractions[key] = Fraction(int(numerator), int(denominator))
+            return res
+
+    def _decode_fraction(self, data):
+        return self._fraction(*msgpack.unpackb(data))
+
+    def _decode_coordinate(self, data):
+        try:
+            return self._coords[data]
+        except KeyError:
+            integers = msgpack.unpackb(data)
+            res = self._coords[data] = Coordinate(
+                [self._fraction(n, d) for n, d in zip(integers[::2], integers[1::2])]
+            )
+            return res
+
+    def _decode_box(self, data):
+        corner, size, phase = decode_nested(self._unpackb(data))
+        return make_box(corner, size, phase)
+
+    @staticmethod
+    def _decode_sentinel(data):
+        return Sentinel(msgpack.unpackb(data))
+
+    def _decode_result(self, data):
+        obj = self._unpackb(data)
+        dim = len(obj["limits"])
+        phases = decode_nested(obj["phases"])
+        points = PointStore.from_fractions(
+            np.array(obj["numerators"], dtype=np.int64).reshape(-1, dim),
+            np.array(obj["denominators"], dtype=np.int64).reshape(-1, dim),
+            [phases[code] for code in obj["codes"]],
+            phase_table=PhaseTable(phases),
+        )
+        for coord, phase in decode_nested(obj["extra_points"]):
+            points[coord] = phase
+        return Result(
+            points=points,
+            boxes=obj["boxes"],
+            limits=obj["limits"],
+            inferred_points=set(decode_nested(obj["inferred_points"])),
+            indicators=dict(decode_nested(obj["indicators"])),
+        )
@@ -16,6 +16,7 @@ from matplotlib.colorbar import ColorbarBase
 from matplotlib.colors import Normalize, ListedColormap
 
 from ._box import PHASE_UNDEFINED
+from ._phase_table import PhaseTable
 
 
 @decorator.decorator
@@ -60,7 +61,14 @@ def _plot(func, result, *, ax=None, add_cbar=True, **kwargs):
 @export
 @_plot
 def boxes(
-    result, *, ax=None, scale_val=None, plot_undefined=False, cmap=None, **kwargs
+    result,
+    *,
+    ax=None,
+    scale_val=None,
+    plot_undefined=False,
+    cmap=None,
+    num_steps=None,
+    **kwargs
 ):
     """
     Plots the phase diagram as a collection of boxes, which are colored according to the estimate of the phase in a given box.
@@ -79,6 +87,8 @@ def boxes(
         Specifies whether the boxes of undefined phase should be plotted (in white).
     cmap:
         The colormap which is used to plot the phases. The colormap should take values normalized to [0, 1] and return a 4-tuple specifying the RGBA value (again normalized to [0, 1].
+    num_steps: int
+        If given, the boxes are drawn at a coarser level of detail, as they were after ``num_steps`` splits. This requires the result to contain a refinement tree, see :meth:`.Result.truncate`.
     kwargs:
         Keyword arguments passed to :py:class:`matplotlib.patches.Rectangle`.
     """
@@ -87,8 +97,13 @@ def boxes(
         cmap = plt.get_cmap()
 
     all_vals = sorted(set(result.points.values())) or [0]
-    sqrs = [s for s in result.boxes if s.phase not in (None, PHASE_UNDEFINED)]
-    vals = [s.phase for s in sqrs]
+    if num_steps is None:
+        all_boxes = result.boxes
+    else:
+        all_boxes = result.truncate(num_steps).boxes
+    sqrs = [s for s in all_boxes if s.phase not in (None, PHASE_UNDEFINED)]
+    phase_table = PhaseTable()
+    codes = phase_table.codes(s.phase for s in sqrs)
 
     norm = Normalize()
     if scale_val is None:
@@ -96,7 +111,8 @@ def boxes(
     else:
         norm.autoscale(scale_val)
 
-    box_colors = cmap([norm(v) for v in vals])
+    # The colors are computed once for each phase.
+    box_colors = np.asarray(cmap([norm(v) for v in phase_table]))[codes]
 
     rect_properties = ChainMap(kwargs, dict(lw=0))
     for color, box in zip(box_colors, sqrs):
@@ -109,7 +125,7 @@ def boxes(
             )
         )
     if plot_undefined:
-        for box in [b for b in result.boxes if b.phase is PHASE_UNDEFINED]:
+        for box in [b for b in all_boxes if b.phase is PHASE_UNDEFINED]:
             ax.add_patch(
                 Rectangle(
                     xy=box.corner,
@@ -146,8 +162,9 @@ def points(result, *, ax=None, scale_val=None, cmap=None, **kwargs):
         # don't do this in the signature, otherwise it gets set at import time
         cmap = plt.get_cmap()
 
-    pts = result.points
-    all_vals = sorted(set(pts.values())) or [0]
+    positions, codes, phases = result.points.to_arrays()
+    present_codes = np.unique(codes)
+    all_vals = sorted(set(phases[code] for code in present_codes)) or [0]
 
     norm = Normalize()
     if scale_val is None:
@@ -155,15 +172,11 @@ def points(result, *, ax=None, scale_val=None, cmap=None, **kwargs):
     else:
         norm.autoscale(scale_val)
 
-    point_colors = defaultdict(list)
-    for coord, phase in pts.items():
-        point_colors[cmap(norm(phase))].append(coord)
+    color_codes = defaultdict(list)
+    for code in present_codes:
+        color_codes[cmap(norm(phases[code]))].append(code)
 
-    for color, coordinates in point_colors.items():
-        ax.scatter(
-            *np.array(coordinates).T,  # pylint: disable=not-an-iterable
-            color=color,
-            **kwargs
-        )
+    for color, group in color_codes.items():
+        ax.scatter(*positions[np.isin(codes, group)].T, color=color, **kwargs)
 
     return ax, cmap, norm, all_vals
@@ -0,0 +1,90 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+"""Tests for the boundary-tracking refinement method."""
+
+import os
+import tempfile
+
+import numpy as np
+import pytest
+from phases import phase1, phase2, phase3
+
+import phasemap as pm
+from phasemap._box import PHASE_UNDEFINED
+
+
+def _grid_positions(limits, num_cells):
+    # positions in the center of the smallest boxes, to avoid ambiguities
+    # at the box boundaries
+    grid = (np.arange(num_cells) + 0.5) / num_cells
+    relative = np.array(np.meshgrid(*[grid] * len(limits))).reshape(len(limits), -1).T
+    limits_arr = np.array(limits, dtype=float)
+    return limits_arr[:, 0] + relative * (limits_arr[:, 1] - limits_arr[:, 0])
+
+
+@pytest.mark.parametrize("num_steps", [1, 2, 4])
+@pytest.mark.parametrize("mesh", [2, 3, 5])
+@pytest.mark.parametrize(
+    "phase, limits",
+    [
+        (phase1, [(-1, 1), (-1, 1)]),
+        (phase2, [(0, 1), (0, 1)]),
+        (phase3, [(0, 1), (0, 1)]),
+        (phase1, [(-1, 1), (-1, 1), (-1, 1)]),
+    ],
+)
+def test_same_as_split(phase, limits, mesh, num_steps):
+    if len(limits) == 3 and num_steps > 2:
+        pytest.skip("Too slow in three dimensions.")
+    res_split = pm.run(phase, limits, mesh=mesh, num_steps=num_steps)
+    res = pm.run(phase, limits, mesh=mesh, num_steps=num_steps, method="boundary")
+    assert len(res.points) <= len(res_split.points)
+    assert len(res.boxes) <= len(res_split.boxes)
+    assert sum(np.prod(b.size) for b in res.boxes) == 1
+
+    positions = _grid_positions(limits, (mesh - 1) * 2 ** num_steps)
+    assert np.all(res.phase_at(positions) == res_split.phase_at(positions))
+
+
+def test_num_steps_zero():
+    res = pm.run(phase1, [(-1, 1), (-1, 1)], mesh=3, num_steps=0, method="boundary")
+    assert len(res.boxes) == 4
+    assert len(res.points) == 9
+    assert all(b.phase is not None for b in res.boxes)
+
+
+def test_boundary_boxes_min_size():
+    num_steps = 3
+    res = pm.run(
+        phase1, [(-1, 1), (-1, 1)], mesh=3, num_steps=num_steps, method="boundary"
+    )
+    min_size = 1 / (2 * 2 ** num_steps)
+    for box in res.boxes:
+        if box.phase is PHASE_UNDEFINED:
+            assert np.all(box.size == min_size)
+
+
+def test_load(results_equal):
+    kwargs = dict(
+        fct=phase1, limits=[(-1, 1), (-1, 1)], mesh=3, num_steps=3, method="boundary"
+    )
+    with tempfile.TemporaryDirectory() as dirname:
+        save_file = os.path.join(dirname, "res.json")
+        res = pm.run(save_file=save_file, **kwargs)
+        res_loaded = pm.run(
+            fct=lambda x: 1 / 0,
+            save_file=save_file,
+            load=True,
+            **{key: val for key, val in kwargs.items() if key != "fct"},
+        )
+    results_equal(res, res_loaded)
+
+
+def test_invalid_method():
+    with pytest.raises(ValueError):
+        pm.run(phase1, [(-1, 1), (-1, 1)], method="invalid")
+
+
+def test_anisotropic_invalid():
+    with pytest.raises(ValueError):
+        pm.run(phase1, [(-1, 1), (-1, 1)], method="boundary", anisotropic=True)
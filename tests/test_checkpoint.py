@@ -0,0 +1,98 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+
+import asyncio
+import threading
+
+import pytest
+from phases import phase1
+
+import phasemap as pm
+from phasemap._box import PHASE_UNDEFINED
+from phasemap import _checkpoint as checkpoint
+from phasemap._checkpoint import BackgroundSaver, snapshot_result
+
+
+def _run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def test_non_blocking():
+    started = threading.Event()
+    release = threading.Event()
+    writes = []
+
+    def snapshot():
+        def write():
+            started.set()
+            # Only finishes if the event loop keeps running while writing.
+            assert release.wait(timeout=10)
+            writes.append(True)
+
+        return write
+
+    async def run():
+        async with BackgroundSaver(snapshot, interval=10.0):
+            while not started.is_set():
+                await asyncio.sleep(0.001)
+            await asyncio.sleep(0)
+            assert not writes
+            release.set()
+
+    _run(run())
+    # initial and final checkpoint
+    assert len(writes) == 2
+
+
+def test_adaptive_interval(monkeypatch):
+    writes = []
+
+    def snapshot():
+        return lambda: writes.append(True)
+
+    # Each write counts as taking 0.3s, and must then be followed by at least
+    # 0.9s without writing.
+    monkeypatch.setattr(checkpoint, "_timed", lambda func: (func(), 0.3)[1])
+
+    async def run():
+        async with BackgroundSaver(snapshot, interval=0.0, max_fraction=0.25):
+            await asyncio.sleep(0.3)
+
+    _run(run())
+    # initial and final checkpoint
+    assert len(writes) == 2
+
+
+def test_write_error():
+    def snapshot():
+        def write():
+            raise OSError("Cannot write.")
+
+        return write
+
+    async def run():
+        async with BackgroundSaver(snapshot, interval=0.0):
+            await asyncio.sleep(0.1)
+
+    with pytest.raises(OSError):
+        _run(run())
+
+
+def test_invalid_fraction():
+    with pytest.raises(ValueError):
+        BackgroundSaver(lambda: None, interval=1.0, max_fraction=0)
+
+
+def test_snapshot_result():
+    res = pm.run(phase1, [(-1, 1)] * 2, num_steps=2, mesh=3)
+    create_snapshot = snapshot_result(res)
+    num_points = len(res.points)
+    phases = {box: box.phase for box in res.boxes}
+
+    res.points[(0, 0)] = "new"
+    for box in res.boxes:
+        box.phase = PHASE_UNDEFINED
+    snapshot = create_snapshot()
+    assert len(snapshot.points) == num_points
+    assert snapshot.points[(0, 0)] != "new"
+    assert {box: box.phase for box in snapshot.boxes} == phases
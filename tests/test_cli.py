@@ -0,0 +1,43 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+"""Tests for the 'phasemap' command."""
+
+import os
+import tempfile
+
+import pytest
+from phases import phase1
+
+import phasemap as pm
+from phasemap._cli import main
+
+ARGS = ["phases:phase1", "-l", "-1", "1", "-l", "-1", "1", "-m", "3"]
+
+
+@pytest.mark.parametrize("workers", [0, 2])
+def test_run(results_equal, capsys, workers):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        save_file = os.path.join(tmpdir, "res.json")
+        main(ARGS + ["-n", "2", "-w", str(workers), "-o", save_file])
+        res = pm.io.load(save_file)
+    results_equal(res, pm.run(phase1, [(-1, 1), (-1, 1)], mesh=3, num_steps=2))
+    output = capsys.readouterr().out
+    assert f"Evaluations:          {len(res.points)} (0 re-used)" in output
+    assert "Throughput:" in output
+
+
+def test_resume(capsys):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        save_file = os.path.join(tmpdir, "res.msgpack")
+        main(ARGS + ["-n", "1", "-w", "0", "-o", save_file])
+        num_points = len(pm.io.load(save_file).points)
+        capsys.readouterr()
+        main(ARGS + ["-n", "2", "-w", "0", "-o", save_file])
+        assert f"({num_points} re-used)" in capsys.readouterr().out
+        main(ARGS + ["-n", "2", "-w", "0", "-o", save_file, "--no-resume"])
+        assert "(0 re-used)" in capsys.readouterr().out
+
+
+def test_invalid_function():
+    with pytest.raises(SystemExit):
+        main(["phase1", "-l", "0", "1"])
@@ -0,0 +1,139 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+
+import time
+import asyncio
+from collections import Counter
+
+import pytest
+from phases import phase1
+
+import phasemap as pm
+from phasemap._evaluation import guard_evaluation
+
+LIMITS = [(-1, 1)] * 2
+
+
+def _flaky(num_failures):
+    """
+    Creates a phase function which fails the first ``num_failures`` times it is called for each position.
+    """
+    calls = Counter()
+
+    async def func(pos):
+        key = tuple(pos)
+        calls[key] += 1
+        if calls[key] <= num_failures:
+            raise ValueError("Evaluation failed.")
+        return phase1(pos)
+
+    return func
+
+
+@pytest.mark.parametrize("on_error", ["retry", "mark"])
+def test_retry(results_equal, on_error):
+    res = pm.run(
+        _flaky(2),
+        LIMITS,
+        num_steps=2,
+        mesh=3,
+        on_error=on_error,
+        max_retries=2,
+        retry_delay=0.0,
+        error_phase=-1,
+    )
+    assert results_equal(res, pm.run(phase1, LIMITS, num_steps=2, mesh=3))
+
+
+@pytest.mark.parametrize("max_retries", [0, 1])
+def test_raise(max_retries):
+    with pytest.raises(ValueError):
+        pm.run(_flaky(2), LIMITS, num_steps=2, mesh=3, retry_delay=0.0)
+    with pytest.raises(ValueError):
+        pm.run(
+            _flaky(2),
+            LIMITS,
+            num_steps=2,
+            mesh=3,
+            on_error="retry",
+            max_retries=max_retries,
+            retry_delay=0.0,
+        )
+
+
+def test_mark():
+    def func(pos):
+        if pos[0] > 0.5:
+            raise ValueError("Evaluation failed.")
+        return phase1(pos)
+
+    res = pm.run(
+        func,
+        LIMITS,
+        num_steps=2,
+        mesh=3,
+        on_error="mark",
+        max_retries=0,
+        error_phase="error",
+    )
+    for coord, phase in res.points.items():
+        if coord[0] > 0.75:
+            assert phase == "error"
+        else:
+            assert phase == phase1(-1 + 2 * coord.astype(float))
+
+
+def test_mark_requires_error_phase():
+    with pytest.raises(ValueError):
+        pm.run(phase1, LIMITS, on_error="mark")
+
+
+def test_timeout(results_equal):
+    calls = Counter()
+
+    async def func(pos):
+        key = tuple(pos)
+        calls[key] += 1
+        if calls[key] == 1 and pos[0] > 0.5:
+            await asyncio.sleep(10)
+        return phase1(pos)
+
+    start = time.time()
+    res = pm.run(
+        func,
+        LIMITS,
+        num_steps=2,
+        mesh=3,
+        timeout=0.05,
+        on_error="retry",
+        max_retries=1,
+        retry_delay=0.0,
+    )
+    assert time.time() - start < 5
+    assert results_equal(res, pm.run(phase1, LIMITS, num_steps=2, mesh=3))
+
+
+def test_straggler():
+    calls = Counter()
+
+    async def func(x):
+        calls[x] += 1
+        await asyncio.sleep(5 if x == "slow" and calls[x] == 1 else 0.01)
+        return x
+
+    async def run():
+        guarded = guard_evaluation(func, straggler_quantile=0.9)
+        assert await asyncio.gather(*[guarded(i) for i in range(10)]) == list(range(10))
+        start = time.time()
+        assert await guarded("slow") == "slow"
+        assert time.time() - start < 1
+        assert calls["slow"] == 2
+
+    asyncio.get_event_loop().run_until_complete(run())
+
+
+def test_invalid_policy():
+    with pytest.raises(ValueError):
+        guard_evaluation(phase1, on_error="ignore")
+    with pytest.raises(ValueError):
+        guard_evaluation(phase1, straggler_quantile=1.5)
@@ -33,3 +33,43 @@ def test_func_cache(func):
             await func_error(10)
 
     asyncio.get_event_loop().run_until_complete(run())
+
+
+def test_func_cache_canonicalize():
+    calls = []
+
+    def func(x):
+        calls.append(x)
+        return x ** 2
+
+    async def run():
+        func_cache = FuncCache(func, canonicalize=abs)
+        for x in range(-5, 6):
+            assert x ** 2 == await func_cache(x)
+        assert sorted(calls) == list(range(6))
+        assert sorted(func_cache.data) == list(range(-5, 6))
+
+        func_error = FuncCache(error, data=func_cache.data, canonicalize=abs)
+        assert await func_error(-3) == 9
+        with pytest.raises(ValueError):
+            await func_error(-10)
+
+    asyncio.get_event_loop().run_until_complete(run())
+
+
+def test_func_cache_intern():
+    interned = dict()
+
+    def func(x):
+        return [x % 2]
+
+    async def run():
+        func_cache = FuncCache(
+            func, intern=lambda res: interned.setdefault(tuple(res), res)
+        )
+        results = [await func_cache(x) for x in range(6)]
+        assert results[0] is results[2] is results[4]
+        assert results[1] is results[3] is results[5]
+        assert await func_cache(4) is results[0]
+
+    asyncio.get_event_loop().run_until_complete(run())
@@ -0,0 +1,100 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+"""Tests for phase functions which return an indicator alongside the phase."""
+
+import os
+import asyncio
+import tempfile
+
+import pytest
+
+import phasemap as pm
+
+LIMITS = [(0, 1), (0, 1)]
+
+
+def two_transitions(pos):
+    """
+    Phase diagram with two transitions, where the indicator is small only close to the first one.
+    """
+    x = pos[0]
+    phase = int(x > 0.25) + int(x > 0.75)
+    if x < 0.5:
+        return phase, abs(x - 0.25)
+    return phase, 1 + abs(x - 0.75)
+
+
+@pytest.mark.parametrize("concurrent_splits", [None, 1, 3])
+def test_same_result(results_equal, concurrent_splits):
+    res = pm.run(
+        two_transitions,
+        LIMITS,
+        mesh=3,
+        num_steps=3,
+        has_indicator=True,
+        concurrent_splits=concurrent_splits,
+    )
+    res_phase = pm.run(lambda pos: two_transitions(pos)[0], LIMITS, mesh=3, num_steps=3)
+    results_equal(res, res_phase)
+    assert res.indicators == {coord: two_transitions(coord)[1] for coord in res.points}
+
+
+def test_priority():
+    calls = []
+
+    def func(pos):
+        calls.append(pos[0])
+        return two_transitions(pos)
+
+    pm.run(func, LIMITS, mesh=3, num_steps=3, has_indicator=True, concurrent_splits=1)
+    # After the initial boxes are split, the transition with the small
+    # indicator is refined completely before the other transition.
+    last_left = max(i for i, x in enumerate(calls) if x < 0.5)
+    late_right = [i for i, x in enumerate(calls) if x > 0.5 and i > last_left]
+    assert len(late_right) > len(calls) / 3
+    assert all(x > 0.5 for x in calls[last_left + 1 :])
+
+
+def test_parallel_by_default():
+    """
+    Check that prioritizing the splits does not prevent evaluating the points in parallel.
+    """
+    running = 0
+    max_running = 0
+
+    async def func(pos):
+        nonlocal running, max_running
+        running += 1
+        max_running = max(max_running, running)
+        await asyncio.sleep(0.001)
+        running -= 1
+        return two_transitions(pos)
+
+    pm.run(func, LIMITS, mesh=3, num_steps=3, has_indicator=True)
+    assert max_running > 1
+
+
+def test_save_load():
+    res = pm.run(two_transitions, LIMITS, mesh=3, num_steps=2, has_indicator=True)
+    with tempfile.TemporaryDirectory() as dirname:
+        save_file = os.path.join(dirname, "res.json")
+        pm.io.save(res, save_file)
+        res_loaded = pm.io.load(save_file)
+    assert res_loaded.indicators == res.indicators
+
+
+def test_init_result():
+    def error(pos):
+        raise ValueError(pos)
+
+    kwargs = dict(limits=LIMITS, mesh=3, num_steps=2, has_indicator=True)
+    res = pm.run(two_transitions, **kwargs)
+    res_restart = pm.run(error, init_result=res, **kwargs)
+    assert res_restart.indicators == res.indicators
+
+
+def test_symmetry():
+    kwargs = dict(limits=LIMITS, mesh=3, num_steps=2, has_indicator=True)
+    res = pm.run(two_transitions, **kwargs)
+    res_sym = pm.run(two_transitions, symmetries=[1], **kwargs)
+    assert res_sym.indicators == res.indicators
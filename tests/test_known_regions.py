@@ -0,0 +1,82 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+"""Tests for skipping evaluations in regions of known phase."""
+
+import os
+import tempfile
+
+import numpy as np
+import pytest
+
+import phasemap as pm
+
+LIMITS = [(0, 2), (0, 1)]
+
+
+def step(pos):
+    return int(pos[0] > 0.6)
+
+
+def _counting(func):
+    calls = []
+
+    def inner(pos):
+        calls.append(tuple(pos))
+        return func(pos)
+
+    return inner, calls
+
+
+@pytest.mark.parametrize("method", ["split", "boundary"])
+@pytest.mark.parametrize(
+    "region", [[(1, 2), (0, 1)], lambda pos: pos[0] >= 1], ids=["box", "predicate"]
+)
+def test_known_region(results_equal, region, method):
+    kwargs = dict(limits=LIMITS, mesh=3, num_steps=3, method=method)
+    res = pm.run(step, **kwargs)
+    func, calls = _counting(step)
+    res_known = pm.run(func, known_regions=[(region, 1)], **kwargs)
+
+    assert all(pos[0] < 1 for pos in calls)
+    assert len(calls) < len(res.points)
+    assert res_known.inferred_points
+    for coord in res_known.points:
+        assert (coord in res_known.inferred_points) == (coord[0] >= 1 / 2)
+    assert sum(np.prod(b.size) for b in res_known.boxes) == 1
+    positions = np.random.RandomState(0).uniform(size=(100, 2)) * [2, 1]
+    positions = positions[np.abs(positions[:, 0] - 0.6) > 0.1]
+    assert np.all(res_known.phase_at(positions) == res.phase_at(positions))
+
+
+def test_boxes_not_split():
+    res = pm.run(
+        step, LIMITS, mesh=3, num_steps=3, known_regions=[([(1, 2), (0, 1)], 1)]
+    )
+    inside = [b for b in res.boxes if b.corner[0] >= 1 / 2]
+    assert len(inside) == 2
+    assert all(b.phase == 1 for b in inside)
+
+
+def test_save_load():
+    res = pm.run(
+        step, LIMITS, mesh=3, num_steps=2, known_regions=[([(1, 2), (0, 1)], 1)]
+    )
+    with tempfile.TemporaryDirectory() as dirname:
+        save_file = os.path.join(dirname, "res.json")
+        pm.io.save(res, save_file)
+        res_loaded = pm.io.load(save_file)
+    assert res_loaded.inferred_points == res.inferred_points
+
+
+def test_init_result():
+    kwargs = dict(limits=LIMITS, mesh=3, num_steps=2)
+    res = pm.run(step, known_regions=[([(1, 2), (0, 1)], 1)], **kwargs)
+    func, calls = _counting(step)
+    res_restart = pm.run(func, init_result=res, **kwargs)
+    assert not calls or all(pos[0] >= 1 for pos in calls)
+    assert res.inferred_points <= res_restart.inferred_points
+
+
+def test_invalid_dimension():
+    with pytest.raises(ValueError):
+        pm.run(step, LIMITS, known_regions=[([(1, 2)], 1)])
@@ -0,0 +1,51 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+"""Tests for merging multiple results."""
+
+import pytest
+from phases import phase1, phase2
+
+import phasemap as pm
+from phasemap._box import PHASE_UNDEFINED
+
+
+@pytest.mark.parametrize(
+    "phase, limits", [(phase1, [(-1, 1), (-1, 1)]), (phase2, [(0, 1), (0, 1)])]
+)
+@pytest.mark.parametrize("reverse", [True, False])
+def test_merge_num_steps(results_equal, phase, limits, reverse):
+    results = [
+        pm.run(phase, limits, mesh=3, num_steps=num_steps) for num_steps in [1, 2, 3]
+    ]
+    if reverse:
+        results = results[::-1]
+    results_equal(pm.merge(results), pm.run(phase, limits, mesh=3, num_steps=3))
+
+
+def test_merge_single(results_equal):
+    res = pm.run(phase1, [(-1, 1), (-1, 1)], mesh=3, num_steps=2)
+    results_equal(pm.merge([res]), res)
+    assert not pm.find_conflicts([res])
+
+
+def test_merge_conflicts():
+    res1 = pm.run(phase1, [(-1, 1), (-1, 1)], mesh=3, num_steps=2)
+    res2 = pm.run(phase1, [(-1, 1), (-1, 1)], mesh=3, num_steps=2)
+    coord = next(c for c, p in res2.points.items() if p == 0)
+    res2.points[coord] = 5
+
+    merged = pm.merge([res1, res2])
+    assert pm.find_conflicts([res1, res2]) == {coord: [0, 5]}
+    assert merged.points[coord] == 0
+    containing = [b for b in merged.boxes if b.contains_coord(coord)]
+    assert containing
+    assert all(b.phase is PHASE_UNDEFINED for b in containing)
+
+
+def test_merge_limits_mismatch():
+    res1 = pm.run(phase1, [(-1, 1), (-1, 1)], mesh=3, num_steps=1)
+    res2 = pm.run(phase1, [(-1, 1), (-1, 2)], mesh=3, num_steps=1)
+    with pytest.raises(ValueError):
+        pm.merge([res1, res2])
+    with pytest.raises(ValueError):
+        pm.find_conflicts([res1, res2])
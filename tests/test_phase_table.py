@@ -0,0 +1,48 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+
+import pickle
+
+from phases import phase1
+
+import phasemap as pm
+from phasemap._box import PHASE_UNDEFINED
+from phasemap._phase_table import PhaseTable
+
+
+def test_codes():
+    table = PhaseTable([0, 1])
+    assert table.code(1) == 1
+    assert table.code("a") == 2
+    assert table.code(True) == 3
+    assert table.code([1, 2]) == 4
+    assert table.code([1, 2]) == 4
+    assert list(table.codes([1, "a", [1, 2], 2])) == [1, 2, 4, 5]
+    assert list(table) == [0, 1, "a", True, [1, 2], 2]
+    assert table[2] == "a"
+
+    copied = pickle.loads(pickle.dumps(table.copy()))
+    assert list(copied) == list(table)
+    assert copied.code(True) == 3
+
+
+def test_intern():
+    table = PhaseTable()
+    phase = (1, "a")
+    assert table.intern((1, "a")) == phase
+    assert table.intern(phase) is table.intern((1, "a"))
+
+
+def test_result_phases_interned():
+    def func(pos):
+        # create a new phase object for each evaluation
+        return ("phase", phase1(pos))
+
+    res = pm.run(func, limits=[(-1, 1)] * 2, num_steps=2, mesh=3)
+    table = res.phase_table
+    assert len(table) == len(set(res.points.values()))
+    table_ids = {id(phase) for phase in table}
+    assert all(id(phase) in table_ids for phase in res.points.values())
+    for box in res.boxes:
+        if box.phase is not PHASE_UNDEFINED:
+            assert id(box.phase) in table_ids
@@ -1,8 +1,12 @@
 # © 2015-2018, ETH Zurich, Institut für Theoretische Physik
 # Author: Dominik Gresch <greschd@gmx.ch>
 """Tests for the plot functions."""
+
 # pylint: disable=redefined-outer-name,unused-wildcard-import
 
+import sys
+import subprocess
+
 import pytest
 import matplotlib
 
@@ -25,3 +29,19 @@ def test_plots(assert_image_equal, plot_fct, scale_val):
     )
     plot_fct(res, scale_val=scale_val)
     assert_image_equal()
+
+
+def test_lazy_import():
+    """
+    Check that matplotlib is imported only when the plot module is used.
+    """
+    subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys; import phasemap as pm; "
+            "assert 'matplotlib' not in sys.modules; "
+            "pm.plot.boxes; assert 'matplotlib' in sys.modules",
+        ],
+        check=True,
+    )
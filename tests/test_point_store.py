@@ -0,0 +1,127 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+
+import copy
+import pickle
+from fractions import Fraction
+
+import numpy as np
+from phases import phase1
+
+import phasemap as pm
+from phasemap._coordinate import Coordinate
+from phasemap._point_store import PointStore
+
+
+def test_mapping():
+    points = {
+        Coordinate([0, 1]): 1,
+        Coordinate([Fraction(1, 2), Fraction(1, 4)]): 2,
+        Coordinate([Fraction(1, 3), 0]): "a",
+        # stored separately: outside of the unit cube, and too fine
+        Coordinate([2, 0]): [1],
+        Coordinate([Fraction(1, 10 ** 30), 0]): 5,
+    }
+    store = PointStore(2, points)
+    assert len(store) == len(points)
+    assert store == points
+    assert dict(store.items()) == points
+    assert sorted(map(str, store.values())) == sorted(map(str, points.values()))
+    for coord, phase in points.items():
+        assert coord in store
+        assert store[tuple(coord)] == phase
+    assert (Fraction(1, 5), 0) not in store
+
+    store[(Fraction(1, 2), Fraction(1, 4))] = 3
+    del store[(0, 1)]
+    del store[(2, 0)]
+    assert store == {
+        Coordinate([Fraction(1, 2), Fraction(1, 4)]): 3,
+        Coordinate([Fraction(1, 3), 0]): "a",
+        Coordinate([Fraction(1, 10 ** 30), 0]): 5,
+    }
+
+
+def test_phase_types():
+    store = PointStore(1)
+    store[(0,)] = 1
+    store[(1,)] = True
+    store[(Fraction(1, 2),)] = 1.0
+    assert [type(p) for p in store.values()] == [int, bool, float]
+
+
+def test_growth():
+    store = PointStore(2)
+    points = {}
+    for i in range(1, 8):
+        size = Fraction(1, 2 ** i)
+        for j in range(2 ** i + 1):
+            coord = Coordinate([j * size, 1 - j * size])
+            store[coord] = j % 3
+            points[coord] = j % 3
+    assert store == points
+
+    positions, codes, phases = store.to_arrays()
+    assert positions.shape == (len(points), 2)
+    for pos, code in zip(positions, codes):
+        assert points[Coordinate([Fraction(x) for x in pos])] == phases[code]
+
+
+def test_copy_pickle():
+    store = PointStore(2, {(0, 0): 1, (Fraction(1, 2), 1): 2})
+    for other in [
+        store.copy(),
+        copy.deepcopy(store),
+        pickle.loads(pickle.dumps(store)),
+    ]:
+        assert other == store
+        other[(1, 1)] = 3
+        assert (1, 1) not in store
+        assert other[(1, 1)] == 3
+
+
+def test_result_points():
+    res = pm.run(phase1, limits=[(-1, 1)] * 2, num_steps=2, mesh=3)
+    assert isinstance(res.points, PointStore)
+    numerators, denominators, codes, phases = res.points.fraction_arrays()
+    assert np.all(np.gcd(numerators, denominators) == 1)
+    for num_row, den_row, code in zip(numerators, denominators, codes):
+        coord = tuple(Fraction(int(n), int(d)) for n, d in zip(num_row, den_row))
+        assert res.points[coord] == phases[code]
+
+
+def test_from_fractions():
+    points = {
+        Coordinate([0, 1]): 1,
+        Coordinate([Fraction(1, 2), Fraction(1, 4)]): 2,
+        Coordinate([Fraction(1, 3), 0]): "a",
+    }
+    numerators = [[c.numerator for c in coord] for coord in points]
+    denominators = [[c.denominator for c in coord] for coord in points]
+    store = PointStore.from_fractions(numerators, denominators, list(points.values()))
+    assert store == points
+    assert list(store.phase_table) == [1, 2, "a"]
+
+    # points outside the unit cube are stored separately
+    store = PointStore.from_fractions(
+        numerators + [[2, 0]], denominators + [[1, 1]], list(points.values()) + [3]
+    )
+    assert store == {**points, Coordinate([2, 0]): 3}
+    assert store.extra_points == {Coordinate([2, 0]): 3}
+
+
+def test_within():
+    res = pm.run(phase1, limits=[(-1, 1)] * 2, num_steps=3, mesh=3)
+    store = res.points.copy()
+    store[(2, 0)] = 3
+    bounds = [(Fraction(1, 3), Fraction(3, 4)), (0, Fraction(1, 2))]
+    assert store.within(bounds) == {
+        coord: phase
+        for coord, phase in store.items()
+        if all(low <= c <= high for c, (low, high) in zip(coord, bounds))
+    }
+    assert store.within([(1, 2), (0, 0)]) == {
+        coord: phase
+        for coord, phase in store.items()
+        if coord[1] == 0 and coord[0] >= 1
+    }
@@ -0,0 +1,58 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+
+import asyncio
+
+import pytest
+
+from phasemap._priority import PriorityLimiter
+
+
+def _run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def test_priority_order():
+    started = []
+
+    async def run():
+        limiter = PriorityLimiter(1)
+        await limiter.acquire(0)
+
+        async def task(priority):
+            await limiter.acquire(priority)
+            started.append(priority)
+            limiter.release()
+
+        tasks = [asyncio.ensure_future(task(p)) for p in [2, 0, 1]]
+        await asyncio.sleep(0)
+        limiter.release()
+        await asyncio.gather(*tasks)
+
+    _run(run())
+    assert started == [0, 1, 2]
+
+
+@pytest.mark.parametrize("release_first", [False, True])
+def test_cancel_waiting(release_first):
+    """
+    Check that the slot is not lost when a waiting task is cancelled, also if the slot was already passed on to it.
+    """
+
+    async def run():
+        limiter = PriorityLimiter(1)
+        await limiter.acquire(0)
+        waiting = asyncio.ensure_future(limiter.acquire(0))
+        await asyncio.sleep(0)
+        if release_first:
+            limiter.release()
+            waiting.cancel()
+        else:
+            waiting.cancel()
+            await asyncio.sleep(0)
+            limiter.release()
+        with pytest.raises(asyncio.CancelledError):
+            await waiting
+        await asyncio.wait_for(limiter.acquire(0), timeout=1)
+
+    _run(run())
@@ -0,0 +1,142 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+
+import json
+import tempfile
+
+import pytest
+from phases import phase1, phase2, phase3
+
+import phasemap as pm
+from phasemap._known_regions import relative_bounds
+
+
+def _inside(box, bounds):
+    return all(
+        low <= c and c + s <= high
+        for c, s, (low, high) in zip(box.corner, box.size, bounds)
+    )
+
+
+def _outside(box, bounds):
+    return any(
+        c + s < low or c > high
+        for c, s, (low, high) in zip(box.corner, box.size, bounds)
+    )
+
+
+@pytest.mark.parametrize(
+    "phase, limits, region",
+    [
+        (phase1, [(-1, 1)] * 2, [(0, 1), (0, 1)]),
+        (phase2, [(0, 1)] * 2, [(0.5, 1), (0.5, 1)]),
+    ],
+)
+def test_refine(phase, limits, region):
+    res = pm.run(phase, limits, mesh=3, num_steps=2)
+    num_boxes = len(res.boxes)
+    calls = []
+
+    def func(pos):
+        calls.append(pos)
+        return phase(pos)
+
+    refined = pm.refine(res, func, region=region, num_steps=2)
+    reference = pm.run(phase, limits, mesh=3, num_steps=4)
+    assert len(res.boxes) == num_boxes
+
+    # Inside the region, the result is the same as when running with more
+    # steps, but only the points near the region are calculated.
+    bounds = relative_bounds(region, limits)
+    assert {b for b in refined.boxes if _inside(b, bounds)} == {
+        b for b in reference.boxes if _inside(b, bounds)
+    }
+    assert len(calls) < len(reference.points) - len(res.points)
+    assert set(res.points.items()) <= set(refined.points.items())
+
+    outside = {b for b in res.boxes if _outside(b, bounds)}
+    assert outside <= refined.boxes
+
+
+def test_refine_loaded():
+    res = pm.run(phase1, [(-1, 1)] * 2, mesh=3, num_steps=2)
+    with tempfile.NamedTemporaryFile() as tmpf:
+        pm.io.save(res, tmpf.name, serializer=json)
+        loaded = pm.io.load(tmpf.name, serializer=json)
+    refined = pm.refine(loaded, phase1, region=[(0, 1), (0, 1)], num_steps=1)
+    refined_direct = pm.refine(res, phase1, region=[(0, 1), (0, 1)], num_steps=1)
+    assert refined.boxes == refined_direct.boxes
+    assert refined.points == refined_direct.points
+
+
+def test_refine_empty_region():
+    res = pm.run(phase1, [(-1, 1)] * 2, mesh=3, num_steps=2)
+
+    def error(pos):
+        raise ValueError(pos)
+
+    refined = pm.refine(res, error, region=[(2, 3), (2, 3)], num_steps=2)
+    assert refined.boxes == res.boxes
+
+
+@pytest.mark.parametrize(
+    "phase, limits",
+    [(phase1, [(-1, 1)] * 2), (phase2, [(0, 1)] * 2), (phase3, [(0, 1)] * 2)],
+)
+def test_continue_run(phase, limits):
+    res = pm.run(phase, limits, mesh=3, num_steps=2, tree=True)
+    num_leaves = len(res.tree.boxes())
+    calls = []
+
+    def func(pos):
+        calls.append(pos)
+        return phase(pos)
+
+    continued = pm.continue_run(res, func, num_steps=2)
+    reference = pm.run(phase, limits, mesh=3, num_steps=4, tree=True)
+    assert continued.boxes == reference.boxes
+    assert continued.points.keys() == reference.points.keys()
+    assert len(calls) == len(reference.points) - len(res.points)
+
+    # The tree of the input is copied and extended.
+    assert len(res.tree.boxes()) == num_leaves
+    assert set(continued.tree.boxes()) == reference.boxes
+    assert set(continued.truncate(3).boxes) == set(reference.truncate(3).boxes)
+
+
+def test_continue_run_loaded():
+    res = pm.run(phase1, [(-1, 1)] * 2, mesh=3, num_steps=2)
+    with tempfile.NamedTemporaryFile() as tmpf:
+        pm.io.save(res, tmpf.name, serializer=json)
+        loaded = pm.io.load(tmpf.name, serializer=json)
+    continued = pm.continue_run(loaded, phase1, num_steps=1)
+    reference = pm.run(phase1, [(-1, 1)] * 2, mesh=3, num_steps=3)
+    assert continued.boxes == reference.boxes
+    assert continued.points == reference.points
+
+
+def test_refine_box_index():
+    """
+    Check that the boxes near the region are found with the box index of the result.
+    """
+    res = pm.run(phase1, [(-1, 1)] * 2, mesh=3, num_steps=3)
+    region = [(0, 0.3), (-0.2, 0.5)]
+    bounds = relative_bounds(region, res.limits)
+    index = res._get_box_index()  # pylint: disable=protected-access
+    assert set(index.intersecting(bounds)) == {
+        b for b in res.boxes if not _outside(b, bounds)
+    }
+    refined = pm.refine(res, phase1, region=region, num_steps=1)
+    assert res._get_box_index() is index  # pylint: disable=protected-access
+    reference = pm.run(phase1, [(-1, 1)] * 2, mesh=3, num_steps=4)
+    assert {b for b in refined.boxes if _inside(b, bounds)} == {
+        b for b in reference.boxes if _inside(b, bounds)
+    }
+
+
+@pytest.mark.parametrize("func", [pm.refine, pm.continue_run])
+def test_invalid_option(func):
+    res = pm.run(phase1, [(-1, 1)] * 2, mesh=3, num_steps=2)
+    kwargs = dict(region=[(0, 1), (0, 1)]) if func is pm.refine else dict()
+    with pytest.raises(TypeError):
+        func(res, phase1, mesh=5, **kwargs)
@@ -0,0 +1,129 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+"""Tests for the methods of the Result class."""
+
+from fractions import Fraction
+
+import numpy as np
+import pytest
+from phases import phase1, phase2
+
+import phasemap as pm
+from phasemap._box import Box, PHASE_UNDEFINED
+from phasemap._result import Result
+
+
+@pytest.mark.parametrize(
+    "phase, limits", [(phase1, [(-1, 1), (-1, 1)]), (phase2, [(0, 1), (0, 2)])]
+)
+def test_phase_at(phase, limits):
+    res = pm.run(phase, limits, num_steps=3, mesh=3)
+    # positions in the center of the smallest boxes, to avoid ambiguities
+    # at the box boundaries
+    num_cells = 2 * 2 ** 3
+    grid = (np.arange(num_cells) + 0.5) / num_cells
+    relative = np.array(np.meshgrid(grid, grid)).reshape(2, -1).T
+    limits_arr = np.array(limits, dtype=float)
+    positions = limits_arr[:, 0] + relative * (limits_arr[:, 1] - limits_arr[:, 0])
+
+    phases = res.phase_at(positions)
+    assert phases.shape == (len(positions),)
+    for rel, phase_val in zip(relative, phases):
+        (box,) = [b for b in res.boxes if b.contains_coord(rel)]
+        if box.phase is None:
+            assert phase_val is PHASE_UNDEFINED
+        else:
+            assert phase_val == box.phase
+
+
+def test_phase_at_outside():
+    res = pm.run(phase1, [(-1, 1), (-1, 1)], num_steps=2, mesh=3)
+    phases = res.phase_at([[-1.5, 0], [0, 1.01], [1, 1], [-1, -1]])
+    assert phases[0] is PHASE_UNDEFINED
+    assert phases[1] is PHASE_UNDEFINED
+    assert list(phases[2:]) == [1, 1]
+
+
+def test_phase_at_box_changes():
+    """
+    Check that the box lookup reflects changes of the phases, and boxes which are replaced without changing the number of boxes.
+    """
+    res = pm.run(phase1, [(-1, 1), (-1, 1)], num_steps=2, mesh=3)
+    position = [[-0.9, -0.9]]
+    assert list(res.phase_at(position)) == [1]
+    (box,) = [b for b in res.boxes if b.contains_coord([0.05, 0.05])]
+    box.phase = "changed"
+    assert list(res.phase_at(position)) == ["changed"]
+
+    new_box = Box(corner=box.corner, size=box.size)
+    new_box.phase = "replaced"
+    res.boxes.remove(box)
+    res.boxes.add(new_box)
+    assert list(res.phase_at(position)) == ["replaced"]
+
+
+def test_phase_at_fine_boxes():
+    """
+    Check the lookup of boxes whose number of cells does not fit into an int64.
+    """
+    dim = 5
+    fine_size = [Fraction(1, 2 ** 13)] * dim
+    coarse = Box(corner=[Fraction(1, 2)] * dim, size=[Fraction(1, 2)] * dim)
+    coarse.phase = "coarse"
+    fine = Box(corner=[Fraction(3, 2 ** 13)] * dim, size=fine_size)
+    fine.phase = "fine"
+    res = Result(points={}, boxes=[coarse, fine], limits=[(0, 1)] * dim)
+    phases = res.phase_at(
+        [[3.5 / 2 ** 13] * dim, [0.75] * dim, [2.5 / 2 ** 13] * dim, [1] * dim]
+    )
+    assert list(phases) == ["fine", "coarse", PHASE_UNDEFINED, "coarse"]
+
+
+def test_phase_at_invalid_shape():
+    res = pm.run(phase1, [(-1, 1), (-1, 1)], num_steps=1, mesh=3)
+    with pytest.raises(ValueError):
+        res.phase_at([0, 0])
+
+
+@pytest.mark.parametrize("shape", [(16, 16), (7, 23), (1, 5)])
+@pytest.mark.parametrize("chunk_size", [None, 3])
+def test_to_grid(shape, chunk_size):
+    limits = [(-1, 1), (-1, 1)]
+    res = pm.run(phase1, limits, num_steps=3, mesh=3)
+    grid, phases = res.to_grid(shape, chunk_size=chunk_size)
+    assert grid.shape == shape
+
+    centers = [(np.arange(n) + 0.5) / n * 2 - 1 for n in shape]
+    positions = np.array(np.meshgrid(*centers, indexing="ij")).reshape(2, -1).T
+    expected = res.phase_at(positions).reshape(shape)
+    decoded = np.array(phases + [PHASE_UNDEFINED], dtype=object)[grid]
+    assert np.all(decoded == expected)
+
+
+def test_to_grid_3d():
+    res = pm.run(phase1, [(-1, 1)] * 3, num_steps=1, mesh=3)
+    grid, phases = res.to_grid((4, 5, 6))
+    assert grid.shape == (4, 5, 6)
+    assert set(np.unique(grid)) <= set(range(-1, len(phases)))
+
+
+@pytest.mark.parametrize("mesh", [2, 3, 5])
+def test_compact(mesh):
+    res = pm.run(phase1, [(-1, 1), (-1, 1)], num_steps=4, mesh=mesh)
+    res_compact = res.compact()
+    assert len(res_compact.boxes) < len(res.boxes)
+    assert sum(np.prod(b.size) for b in res_compact.boxes) == 1
+    assert res_compact.points == res.points
+    assert len(res_compact.compact().boxes) == len(res_compact.boxes)
+
+    num_cells = (mesh - 1) * 2 ** 4
+    grid = (np.arange(num_cells) + 0.5) / num_cells * 2 - 1
+    positions = np.array(np.meshgrid(grid, grid)).reshape(2, -1).T
+    assert np.all(res_compact.phase_at(positions) == res.phase_at(positions))
+
+
+def test_compact_3d():
+    res = pm.run(phase1, [(-1, 1)] * 3, num_steps=2, mesh=3)
+    res_compact = res.compact()
+    assert len(res_compact.boxes) < len(res.boxes)
+    assert sum(np.prod(b.size) for b in res_compact.boxes) == 1
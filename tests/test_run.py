@@ -1,15 +1,23 @@
 # © 2015-2018, ETH Zurich, Institut für Theoretische Physik
 # Author: Dominik Gresch <greschd@gmx.ch>
 
+import os
 import json
 import asyncio
 import tempfile
+from fractions import Fraction
 from collections import Counter
 
 import pytest
+import numpy as np
 from phases import phase1, phase2, phase3
 
 import phasemap as pm
+from phasemap._run import _RunImpl
+from phasemap._box import Box, PHASE_UNDEFINED
+from phasemap._box_index import is_dyadic_partition
+from phasemap._remap import remap_coordinates
+from phasemap._coordinate import Coordinate
 
 
 @pytest.mark.parametrize("num_steps", [0, 1, 3])
@@ -59,6 +67,111 @@ def test_load(results_equal):
         results_equal(res1, res2)
 
 
+@pytest.mark.parametrize("mesh", [2, 3])
+@pytest.mark.parametrize("num_steps_1, num_steps_2", [(1, 3), (2, 2), (2, 4)])
+def test_load_restores_boxes(
+    results_equal, monkeypatch, mesh, num_steps_1, num_steps_2
+):
+    res = pm.run(phase1, limits=[(-1, 1)] * 2, num_steps=num_steps_2, mesh=mesh)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        save_file = os.path.join(tmpdir, "res.json")
+        pm.run(
+            phase1,
+            limits=[(-1, 1)] * 2,
+            num_steps=num_steps_1,
+            mesh=mesh,
+            save_file=save_file,
+        )
+
+        def error(self):
+            raise ValueError("Initial boxes should not be re-created.")
+
+        monkeypatch.setattr(_RunImpl, "_get_initial_boxes", error)
+        res_restored = pm.run(
+            phase1,
+            limits=[(-1, 1)] * 2,
+            num_steps=num_steps_2,
+            mesh=mesh,
+            save_file=save_file,
+            load=True,
+        )
+    results_equal(res, res_restored)
+
+
+def test_load_incompatible_mesh(boxes_equal):
+    res = pm.run(phase1, limits=[(-1, 1)] * 2, num_steps=2, mesh=4)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        save_file = os.path.join(tmpdir, "res.json")
+        pm.run(phase1, limits=[(-1, 1)] * 2, num_steps=2, mesh=3, save_file=save_file)
+        res_restored = pm.run(
+            phase1,
+            limits=[(-1, 1)] * 2,
+            num_steps=2,
+            mesh=4,
+            save_file=save_file,
+            load=True,
+        )
+    boxes_equal(res.boxes, res_restored.boxes)
+
+
+@pytest.mark.parametrize("mesh_1, mesh_2", [(3, 5), (5, 3), (2, 3)])
+def test_load_mismatched_mesh(boxes_equal, mesh_1, mesh_2):
+    res = pm.run(phase1, limits=[(-1, 1)] * 2, num_steps=2, mesh=mesh_2)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        save_file = os.path.join(tmpdir, "res.json")
+        pm.run(
+            phase1, limits=[(-1, 1)] * 2, num_steps=2, mesh=mesh_1, save_file=save_file
+        )
+        res_restored = pm.run(
+            phase1,
+            limits=[(-1, 1)] * 2,
+            num_steps=2,
+            mesh=mesh_2,
+            save_file=save_file,
+            load=True,
+        )
+    boxes_equal(res.boxes, res_restored.boxes)
+
+
+def test_dyadic_partition():
+    half = Fraction(1, 2)
+    max_size = Coordinate([half, half])
+    min_size = max_size / 4
+    quarter = half / 2
+    points = {
+        Coordinate([i * quarter, j * quarter]): 0 for i in range(5) for j in range(5)
+    }
+    boxes = [
+        Box(corner=[i * half, j * half], size=max_size)
+        for i in range(2)
+        for j in range(2)
+    ]
+    kwargs = dict(max_size=max_size, min_size=min_size)
+    assert is_dyadic_partition(boxes, points=points, **kwargs)
+    # the points of the initial mesh are missing
+    assert not is_dyadic_partition(
+        boxes, points=dict(list(points.items())[1:]), **kwargs
+    )
+    # same volume, but the smaller boxes overlap the first box
+    quarter = half / 2
+    overlapping = boxes[:3] + [
+        Box(corner=[i * quarter, j * quarter], size=max_size / 2)
+        for i in range(2)
+        for j in range(2)
+    ]
+    assert not is_dyadic_partition(overlapping, points=points, **kwargs)
+    # larger than the initial boxes, but consisting of complete initial boxes
+    assert is_dyadic_partition(
+        [Box(corner=[0, 0], size=[1, 1])], points=points, **kwargs
+    )
+    # larger than the initial boxes, and not aligned to them
+    unaligned = [
+        Box(corner=[0, 0], size=[quarter, 1]),
+        Box(corner=[quarter, 0], size=[1 - quarter, 1]),
+    ]
+    assert not is_dyadic_partition(unaligned, points=points, **kwargs)
+
+
 def test_load_invalid():
     with pytest.raises(IOError):
         pm.run(
@@ -169,6 +282,24 @@ def test_invalid_mesh(mesh):
         pm.run(phase1, limits=[(0, 1), (0, 1), (0, 1)], mesh=mesh)
 
 
+@pytest.mark.parametrize("option", ["start_boxes", "min_size", "num_step"])
+def test_invalid_option(option):
+    with pytest.raises(TypeError):
+        pm.run(phase1, limits=[(0, 1), (0, 1)], **{option: None})
+
+
+def test_positional_arguments(results_equal):
+    """
+    Check that the parameters of earlier versions can be passed by position.
+    """
+    res = pm.run(phase1, [(-1, 1), (-1, 1)], 3, 2, True)
+    results_equal(
+        res, pm.run(phase1, [(-1, 1), (-1, 1)], mesh=3, num_steps=2, all_corners=True)
+    )
+    res_init = pm.run(phase1, [(-1, 1), (-1, 1)], 3, 2, True, res)
+    results_equal(res, res_init)
+
+
 def test_caching():
     def _call_count(func):
         count = Counter()
@@ -196,3 +327,141 @@ def test_raises():
 
     with pytest.raises(ValueError):
         pm.run(func, limits=[(0, 1)])
+
+
+def test_anisotropic():
+    limits = [(0, 1), (0, 1)]
+
+    def step(coord):
+        return int(coord[0] > 0.3)
+
+    res_iso = pm.run(step, limits, num_steps=4, mesh=3)
+    res = pm.run(step, limits, num_steps=4, mesh=3, anisotropic=True)
+    assert len(res.points) < len(res_iso.points)
+    assert sum(np.prod(b.size) for b in res.boxes) == 1
+    assert any(len(set(b.size)) > 1 for b in res.boxes)
+
+    positions = np.random.RandomState(0).uniform(size=(200, 2))
+    positions = positions[np.abs(positions[:, 0] - 0.3) > 1 / 32]
+    assert list(res.phase_at(positions)) == [step(p) for p in positions]
+
+
+def test_anisotropic_load(results_equal):
+    with tempfile.TemporaryDirectory() as dirname:
+        save_file = os.path.join(dirname, "res.json")
+        kwargs = dict(
+            fct=phase1,
+            limits=[(-1, 1), (-1, 1)],
+            mesh=3,
+            anisotropic=True,
+            save_file=save_file,
+        )
+        pm.run(num_steps=2, **kwargs)
+        res_loaded = pm.run(num_steps=4, load=True, **kwargs)
+    res = pm.run(phase1, [(-1, 1), (-1, 1)], num_steps=4, mesh=3, anisotropic=True)
+    results_equal(res, res_loaded)
+
+
+@pytest.mark.parametrize(
+    "limits_1, mesh_1, num_steps_1, limits_2, mesh_2, num_steps_2",
+    [
+        ([(-1, 1)] * 2, 3, 4, [(0, 1)] * 2, 3, 3),
+        ([(-1, 1)] * 2, 3, 3, [(-1, 1)] * 2, 5, 2),
+        ([(-1, 1)] * 2, 4, 3, [(-0.5, 1)] * 2, 3, 3),
+    ],
+)
+def test_init_result_different_limits(
+    limits_1, mesh_1, num_steps_1, limits_2, mesh_2, num_steps_2
+):
+    res1 = pm.run(phase1, limits=limits_1, mesh=mesh_1, num_steps=num_steps_1)
+
+    calls = []
+
+    def func(pos):
+        calls.append(pos)
+        return phase1(pos)
+
+    res2 = pm.run(
+        func, limits=limits_2, mesh=mesh_2, num_steps=num_steps_2, init_result=res1
+    )
+    res_ref = pm.run(phase1, limits=limits_2, mesh=mesh_2, num_steps=num_steps_2)
+    assert len(calls) < len(res_ref.points)
+
+    low = np.array([l for l, _ in limits_2])
+    size = np.array([h - l for l, h in limits_2])
+    num_cells = (mesh_2 - 1) * 2 ** num_steps_2
+    for coord, phase in res2.points.items():
+        assert all(0 <= c <= 1 for c in coord)
+        # Points off the lattice are not stored as evaluations.
+        assert all((c * num_cells).denominator == 1 for c in coord)
+        assert phase == phase1(low + np.array(coord, dtype=float) * size)
+
+    # The remaining points of 'res1' can only lead to additional refinement.
+    undefined_ref = {b for b in res_ref.boxes if b.phase is PHASE_UNDEFINED}
+    undefined = {b for b in res2.boxes if b.phase is PHASE_UNDEFINED}
+    assert undefined_ref <= undefined
+
+
+@pytest.mark.parametrize("phase", [phase1, phase2])
+def test_init_result_more_steps(phase):
+    """
+    Check that an 'init_result' with the same limits and more steps gives the same boxes as a new calculation.
+    """
+    res1 = pm.run(phase, [(-1, 1)] * 2, mesh=3, num_steps=7)
+    res2 = pm.run(phase, [(-1, 1)] * 2, mesh=3, num_steps=4, init_result=res1)
+    res_ref = pm.run(phase, [(-1, 1)] * 2, mesh=3, num_steps=4)
+    assert {(b, b.phase) for b in res2.boxes} == {(b, b.phase) for b in res_ref.boxes}
+
+
+def test_remap_coordinates():
+    coords = [(Fraction(3, 10),), (Fraction(7, 20),), (Fraction(1, 10),)]
+    res = remap_coordinates(
+        coords,
+        old_limits=[(0, 1)],
+        new_limits=[(0.2, 0.6)],
+        min_size=Coordinate([Fraction(1, 4)]),
+    )
+    # Points on the lattice are snapped, the others are kept approximately.
+    assert set(res) == set(coords[:2])
+    assert tuple(res[coords[0]]) == (Fraction(1, 4),)
+    assert np.isclose(float(res[coords[1]][0]), 0.375)
+
+
+@pytest.mark.parametrize("batch_size", [1, 7, 100])
+def test_batch(results_equal, batch_size):
+    batches = []
+
+    async def func(positions):
+        batches.append(len(positions))
+        await asyncio.sleep(0.0)
+        return [phase1(pos) for pos in positions]
+
+    res = pm.run(
+        func,
+        limits=[(-1, 1)] * 2,
+        num_steps=3,
+        mesh=3,
+        batch_size=batch_size,
+        batch_timeout=0.01,
+    )
+    assert results_equal(res, pm.run(phase1, limits=[(-1, 1)] * 2, num_steps=3, mesh=3))
+    assert max(batches) <= batch_size
+    assert sum(batches) == len(res.points)
+    if batch_size > 1:
+        assert len(batches) < len(res.points) / 2
+
+
+def test_batch_error():
+    async def func(positions):
+        await asyncio.sleep(0.0)
+        raise ValueError("Batch failed.")
+
+    with pytest.raises(ValueError, match="Batch failed."):
+        pm.run(
+            func,
+            limits=[(-1, 1)] * 2,
+            num_steps=2,
+            mesh=3,
+            batch_size=4,
+            batch_timeout=0.01,
+        )
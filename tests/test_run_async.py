@@ -0,0 +1,93 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+"""Tests for running calculations on an existing event loop."""
+
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from phases import phase1, phase2
+
+import phasemap as pm
+
+LIMITS = [(-1, 1), (-1, 1)]
+
+
+def _run(coro):
+    return asyncio.get_event_loop().run_until_complete(coro)
+
+
+def test_run_async(results_equal):
+    res = _run(pm.run_async(phase1, LIMITS, mesh=3, num_steps=3))
+    results_equal(res, pm.run(phase1, LIMITS, mesh=3, num_steps=3))
+
+
+def test_sync_in_running_loop():
+    async def run():
+        pm.run(phase1, LIMITS, mesh=3, num_steps=3)
+
+    with pytest.raises(RuntimeError):
+        _run(run())
+
+
+def test_shared_pool(results_equal):
+    running = 0
+    max_running = 0
+    lock = threading.Lock()
+
+    def slow(fct):
+        def inner(pos):
+            nonlocal running, max_running
+            with lock:
+                running += 1
+                max_running = max(max_running, running)
+            time.sleep(0.001)
+            with lock:
+                running -= 1
+            return fct(pos)
+
+        return inner
+
+    async def run():
+        with ThreadPoolExecutor(max_workers=10) as executor:
+            pool = pm.WorkerPool(executor, max_workers=3)
+            return await asyncio.gather(
+                pm.run_async(pool.wrap(slow(phase1)), LIMITS, mesh=3, num_steps=3),
+                pm.run_async(pool.wrap(slow(phase2)), [(0, 1)] * 2, num_steps=3),
+            )
+
+    res1, res2 = _run(run())
+    assert max_running == 3
+    results_equal(res1, pm.run(phase1, LIMITS, mesh=3, num_steps=3))
+    results_equal(res2, pm.run(phase2, [(0, 1)] * 2, num_steps=3))
+
+
+def test_process_pool(results_equal):
+    with pm.WorkerPool(max_workers=2) as pool:
+        res = pm.run(pool.wrap(phase1), LIMITS, mesh=3, num_steps=3)
+    results_equal(res, pm.run(phase1, LIMITS, mesh=3, num_steps=3))
+
+
+def test_invalid_pool():
+    with pytest.raises(ValueError):
+        pm.WorkerPool(ThreadPoolExecutor(), max_workers=0)
+
+
+def test_pool_several_loops(results_equal):
+    """
+    Check that a pool can be re-used on a different event loop.
+    """
+
+    async def run(pool):
+        return await asyncio.gather(
+            pm.run_async(pool.wrap(phase1), LIMITS, mesh=3, num_steps=3),
+            pm.run_async(pool.wrap(phase2), [(0, 1)] * 2, num_steps=3),
+        )
+
+    with pm.WorkerPool(ThreadPoolExecutor(max_workers=2), max_workers=2) as pool:
+        for _ in range(2):
+            res1, res2 = asyncio.run(run(pool))
+            results_equal(res1, pm.run(phase1, LIMITS, mesh=3, num_steps=3))
+            results_equal(res2, pm.run(phase2, [(0, 1)] * 2, num_steps=3))
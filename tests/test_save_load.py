@@ -3,15 +3,24 @@
 # © 2015-2018, ETH Zurich, Institut für Theoretische Physik
 # Author: Dominik Gresch <greschd@gmx.ch>
 
+import gc
+import os
 import tempfile
 import json
+import pickle
+from fractions import Fraction
 
+import numpy as np
 import pytest
 import msgpack
 
 from phases import phase1, phase3
 
 import phasemap as pm
+from phasemap._box import Box, PHASE_UNDEFINED
+from phasemap._coordinate import Coordinate
+from phasemap.io import msgpack_ext
+from phasemap.io._save_load import IO_HANDLER
 
 
 @pytest.mark.parametrize("num_steps", range(2, 5))
@@ -33,3 +42,156 @@ def test_load(results_equal, sample):
     res_loaded = pm.io.load(sample("res.json"))
     res_new = pm.run(phase3, [(0, 1), (0, 1)], num_steps=5, mesh=2)
     results_equal(res_loaded, res_new)
+
+
+def test_save_grid():
+    res = pm.run(phase1, [(-1, 1), (-1, 1)], num_steps=3, mesh=3)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        file_path = os.path.join(tmpdir, "grid.npy")
+        phases = pm.io.save_grid(res, file_path, shape=(20, 30), chunk_size=7)
+        grid = np.load(file_path)
+    expected_grid, expected_phases = res.to_grid((20, 30))
+    assert phases == expected_phases
+    assert np.all(grid == expected_grid)
+
+
+def test_pickle(results_equal):
+    res = pm.run(phase1, [(-1, 1), (-1, 1)], num_steps=2, mesh=3)
+    results_equal(res, pickle.loads(pickle.dumps(res)))
+
+
+def test_save_compact():
+    def error(pos):
+        raise ValueError(pos)
+
+    kwargs = dict(limits=[(-1, 1), (-1, 1)], num_steps=3, mesh=3)
+    res = pm.run(phase1, **kwargs)
+    with tempfile.TemporaryDirectory() as dirname:
+        save_file = os.path.join(dirname, "res.json")
+        pm.io.save(res, save_file, compact=True)
+        res_loaded = pm.io.load(save_file)
+        assert len(res_loaded.boxes) < len(res.boxes)
+        assert res_loaded.points == res.points
+        # The compacted boxes can be used to resume the calculation.
+        res_resumed = pm.run(error, save_file=save_file, load=True, **kwargs)
+    assert len(res_resumed.boxes) == len(res_loaded.boxes)
+
+
+@pytest.mark.parametrize("serializer", [json, msgpack])
+def test_bulk_format(results_equal, serializer):
+    """
+    Check that the bulk codec writes the same format as the per-object encoding hooks, and reads files written by them.
+    """
+    res = pm.run(
+        lambda pos: (phase1(pos), float(pos[0])),
+        [(-1, 1), (-1, 1)],
+        num_steps=3,
+        mesh=3,
+        has_indicator=True,
+        known_regions=[([(0.5, 1), (-1, 1)], 0)],
+    )
+    assert res.inferred_points
+    with tempfile.TemporaryDirectory() as tmpdir:
+        bulk_file = os.path.join(tmpdir, "bulk")
+        hook_file = os.path.join(tmpdir, "hook")
+        pm.io.save(res, bulk_file, serializer=serializer)
+        IO_HANDLER.save(res, hook_file, serializer=serializer)
+        with open(bulk_file, "rb") as f_bulk, open(hook_file, "rb") as f_hook:
+            assert f_bulk.read() == f_hook.read()
+        res_loaded = pm.io.load(hook_file, serializer=serializer)
+    results_equal(res, res_loaded)
+    assert res_loaded.inferred_points == res.inferred_points
+    assert res_loaded.indicators == res.indicators
+
+
+def test_bulk_other_objects():
+    obj = [Fraction(1, 3), {"a": Coordinate([Fraction(1, 2), 1])}, PHASE_UNDEFINED]
+    with tempfile.TemporaryDirectory() as tmpdir:
+        file_path = os.path.join(tmpdir, "obj.msgpack")
+        pm.io.save(obj, file_path)
+        assert pm.io.load(file_path) == obj
+
+
+def test_gc_state(monkeypatch):
+    """
+    Check that saving does not disable the garbage collector, and loading restores its state.
+    """
+    obj = [Fraction(1, 3), PHASE_UNDEFINED]
+
+    def disable():
+        raise AssertionError("The garbage collector was disabled.")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        file_path = os.path.join(tmpdir, "obj.json")
+        with monkeypatch.context() as patch:
+            patch.setattr(gc, "disable", disable)
+            pm.io.save(obj, file_path)
+        assert gc.isenabled()
+        assert pm.io.load(file_path) == obj
+        assert gc.isenabled()
+        gc.disable()
+        try:
+            pm.io.load(file_path)
+            assert not gc.isenabled()
+        finally:
+            gc.enable()
+
+
+def test_msgpack_ext(results_equal):
+    res = pm.run(
+        lambda pos: (phase1(pos), float(pos[0])),
+        [(-1, 1), (-1, 1)],
+        num_steps=3,
+        mesh=3,
+        has_indicator=True,
+        known_regions=[([(0.5, 1), (-1, 1)], 0)],
+    )
+    res.points[Coordinate([2, 0])] = PHASE_UNDEFINED
+    with tempfile.TemporaryDirectory() as tmpdir:
+        ext_file = os.path.join(tmpdir, "res.msgpack")
+        plain_file = os.path.join(tmpdir, "res_plain.msgpack")
+        pm.io.save(res, ext_file, serializer=msgpack_ext)
+        pm.io.save(res, plain_file)
+        assert os.path.getsize(ext_file) < os.path.getsize(plain_file) / 2
+        for file_path in [ext_file, plain_file]:
+            for serializer in ["auto", msgpack, msgpack_ext]:
+                res_loaded = pm.io.load(file_path, serializer=serializer)
+                results_equal(res, res_loaded)
+                assert res_loaded.inferred_points == res.inferred_points
+                assert res_loaded.indicators == res.indicators
+            results_equal(res, IO_HANDLER.load(file_path, serializer=msgpack_ext))
+
+        # fractions which do not fit in 64 bits can be stored only with the
+        # extension types
+        res.points[Coordinate([Fraction(1, 10 ** 30), 0])] = [Fraction(1, 3)]
+        pm.io.save(res, ext_file, serializer=msgpack_ext)
+        results_equal(res, pm.io.load(ext_file))
+
+
+def test_msgpack_default_plain(results_equal):
+    """
+    Check that files with the 'msgpack' extension are written in the plain msgpack format by default.
+    """
+
+    def ext_hook(code, data):
+        raise AssertionError("Unexpected extension type {}.".format(code))
+
+    res = pm.run(phase1, [(-1, 1), (-1, 1)], num_steps=2, mesh=3)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        file_path = os.path.join(tmpdir, "res.msgpack")
+        pm.io.save(res, file_path)
+        with open(file_path, "rb") as f:
+            obj = msgpack.unpackb(f.read(), ext_hook=ext_hook)
+        assert obj["__result__"]
+        results_equal(res, pm.io.load(file_path))
+
+
+def test_msgpack_ext_objects():
+    obj = [
+        Fraction(1, 3),
+        Fraction(1, 10 ** 30),
+        {"a": Coordinate([Fraction(1, 2), 1])},
+        PHASE_UNDEFINED,
+        Box(corner=[0, Fraction(1, 2)], size=[1, 1]),
+    ]
+    assert msgpack_ext.unpackb(msgpack_ext.packb(obj)) == obj
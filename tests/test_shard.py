@@ -0,0 +1,58 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+"""Tests for running the calculation on multiple shards."""
+
+import pytest
+from phases import phase1, phase2
+
+import phasemap as pm
+
+
+@pytest.mark.parametrize(
+    "phase, limits", [(phase1, [(-1, 1), (-1, 1)]), (phase2, [(0, 1), (0, 1)])]
+)
+@pytest.mark.parametrize(
+    "mesh, shards", [(3, 2), (5, [2, 2]), (4, [3, 1]), (5, [1, 3])]
+)
+def test_sharded_equal(results_equal, phase, limits, mesh, shards):
+    res = pm.run(phase, limits, mesh=mesh, num_steps=3)
+    res_sharded = pm.run_sharded(
+        phase, limits, mesh=mesh, num_steps=3, shards=shards, processes=1
+    )
+    results_equal(res, res_sharded)
+
+
+def test_sharded_processes(results_equal):
+    res = pm.run(phase1, [(-1, 1), (-1, 1)], mesh=5, num_steps=2)
+    res_sharded = pm.run_sharded(
+        phase1, [(-1, 1), (-1, 1)], mesh=5, num_steps=2, shards=[2, 2], processes=2
+    )
+    results_equal(res, res_sharded)
+
+
+@pytest.mark.parametrize("mesh, shards", [(3, 3), (5, [2, 2, 2]), (3, 0)])
+def test_invalid_shards(mesh, shards):
+    with pytest.raises(ValueError):
+        pm.run_sharded(phase1, [(-1, 1), (-1, 1)], mesh=mesh, shards=shards)
+
+
+def test_sharded_options(results_equal):
+    kwargs = dict(
+        mesh=5,
+        num_steps=3,
+        all_corners=True,
+        known_regions=[([(0.5, 1), (-1, 1)], 1)],
+    )
+    res = pm.run(phase1, [(-1, 1), (-1, 1)], **kwargs)
+    res_sharded = pm.run_sharded(
+        phase1, [(-1, 1), (-1, 1)], shards=[2, 2], processes=1, **kwargs
+    )
+    assert res_sharded.inferred_points
+    assert {(b, b.phase) for b in res.boxes} == {
+        (b, b.phase) for b in res_sharded.boxes
+    }
+
+
+def test_sharded_invalid_option():
+    with pytest.raises(TypeError):
+        pm.run_sharded(phase1, [(-1, 1), (-1, 1)], init_result=None)
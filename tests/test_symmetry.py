@@ -0,0 +1,83 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+"""Tests for using symmetries to reduce the number of function evaluations."""
+
+import pytest
+from phases import circle
+
+import phasemap as pm
+
+
+def _counting(func):
+    calls = []
+
+    def inner(pos):
+        calls.append(tuple(pos))
+        return func(*pos)
+
+    return inner, calls
+
+
+@pytest.mark.parametrize("method", ["split", "boundary"])
+@pytest.mark.parametrize(
+    "symmetries, factor", [([0], 2), ([0, 1], 4), ([0, 1, (1, 0)], 8)]
+)
+def test_circle(results_equal, symmetries, factor, method):
+    kwargs = dict(limits=[(-1, 1), (-1, 1)], mesh=3, num_steps=4, method=method)
+    func, calls = _counting(circle)
+    res = pm.run(func, **kwargs)
+    func_sym, calls_sym = _counting(circle)
+    res_sym = pm.run(func_sym, symmetries=symmetries, **kwargs)
+    results_equal(res, res_sym)
+    assert len(set(calls_sym)) == len(calls_sym)
+    assert len(calls_sym) <= len(calls) / factor * 1.5
+
+
+def test_callable(results_equal):
+    def mirror_diagonal(coord):
+        x, y = coord
+        return (1 - y, 1 - x)
+
+    kwargs = dict(limits=[(-1, 1), (-1, 1)], mesh=3, num_steps=3)
+    func, calls = _counting(circle)
+    res = pm.run(func, **kwargs)
+    func_sym, calls_sym = _counting(circle)
+    res_sym = pm.run(func_sym, symmetries=[mirror_diagonal], **kwargs)
+    results_equal(res, res_sym)
+    assert len(calls_sym) < len(calls)
+
+
+def test_init_result():
+    def error(pos):
+        raise ValueError(pos)
+
+    kwargs = dict(limits=[(-1, 1), (-1, 1)], mesh=3, num_steps=2, symmetries=[0])
+    res = pm.run(lambda pos: circle(*pos), **kwargs)
+    # all points which are needed are known, either directly or through
+    # the symmetry
+    pm.run(error, init_result=res, **kwargs)
+
+
+@pytest.mark.parametrize(
+    "symmetries, limits",
+    [
+        ([2], [(-1, 1), (-1, 1)]),
+        ([(0, 0)], [(-1, 1), (-1, 1)]),
+        ([(1, 0)], [(-1, 1), (0, 1)]),
+    ],
+)
+def test_invalid(symmetries, limits):
+    with pytest.raises(ValueError):
+        pm.run(lambda pos: circle(*pos), limits=limits, symmetries=symmetries)
+
+
+def test_mirror_shifted(results_equal):
+    # mirror symmetry at the center of limits which are not centered at zero
+    def phase(pos):
+        x, y = pos
+        return int((x - 1.5) ** 2 + y ** 2 < 1)
+
+    kwargs = dict(limits=[(0, 3), (0, 1)], mesh=4, num_steps=3)
+    res = pm.run(phase, **kwargs)
+    res_sym = pm.run(phase, symmetries=[0], **kwargs)
+    results_equal(res, res_sym)
@@ -0,0 +1,73 @@
+# © 2015-2018, ETH Zurich, Institut für Theoretische Physik
+# Author: Dominik Gresch <greschd@gmx.ch>
+"""Tests for the refinement tree of a calculation."""
+
+import pickle
+
+import numpy as np
+import pytest
+from phases import phase1
+
+import phasemap as pm
+from phasemap._box import PHASE_UNDEFINED
+
+LIMITS = [(-1, 1), (-1, 1)]
+
+
+@pytest.fixture(params=["split", "boundary"])
+def method(request):
+    return request.param
+
+
+@pytest.fixture
+def tree_result(method):
+    return pm.run(phase1, LIMITS, mesh=3, num_steps=4, tree=True, method=method)
+
+
+def test_leaves(boxes_equal, tree_result):
+    boxes_equal(set(tree_result.tree.boxes()), tree_result.boxes)
+    for node in tree_result.tree.iter_nodes():
+        assert len(node.children) in (0, 4)
+        if node.children:
+            assert all(child.depth == node.depth + 1 for child in node.children)
+
+
+@pytest.mark.parametrize("num_steps", range(4))
+def test_truncate(tree_result, method, num_steps):
+    res_truncated = tree_result.truncate(num_steps)
+    assert sum(np.prod(b.size) for b in res_truncated.boxes) == 1
+    assert set(res_truncated.points) <= set(tree_result.points)
+    if method == "boundary":
+        # the boundary method refines different boxes at intermediate steps
+        return
+    res = pm.run(phase1, LIMITS, mesh=3, num_steps=num_steps)
+    assert res_truncated.boxes == res.boxes
+    box_lookup = {b: b for b in res.boxes}
+    for box in res_truncated.boxes:
+        if box.phase is not PHASE_UNDEFINED:
+            assert box.phase == box_lookup[box].phase
+
+
+def test_truncate_without_tree():
+    res = pm.run(phase1, LIMITS, mesh=3, num_steps=2)
+    with pytest.raises(ValueError):
+        res.truncate(1)
+
+
+def test_locate(tree_result):
+    relative = np.random.RandomState(0).uniform(size=(50, 2))
+    phases = tree_result.phase_at(relative * 2 - 1)
+    for coord, phase in zip(relative, phases):
+        node = tree_result.tree.locate(coord)
+        assert not node.children
+        assert node.box.contains_coord(coord)
+        assert node.box.phase == phase or (
+            node.box.phase is PHASE_UNDEFINED and phase is PHASE_UNDEFINED
+        )
+    assert tree_result.tree.locate([1.5, 0.5]) is None
+
+
+def test_pickle(boxes_equal, tree_result):
+    res_loaded = pickle.loads(pickle.dumps(tree_result))
+    boxes_equal(set(res_loaded.tree.boxes()), tree_result.boxes)
+    boxes_equal(res_loaded.truncate(2).boxes, tree_result.truncate(2).boxes)